@@ -1,7 +1,11 @@
 from django.contrib import admin
 from django.contrib.auth.models import Group
+from django.db import transaction
 
-from .models import Category, Location, Post, Comment
+from .constants import SearchLimits
+from .models import Category, Location, Post, Comment, Task
+from .search import search_post_ids
+from .services import move_publication, recount_comments, rescore_posts
 
 admin.site.site_header = 'Панель администратора'
 admin.site.site_title = 'Блог'
@@ -35,7 +39,9 @@ class PostAdmin(admin.ModelAdmin):
         'pub_date',
         'category',
         'location',
-        'is_published'
+        'is_published',
+        'is_visible',
+        'comment_count'
     )
 
     # Поля, которые можно редактировать прямо в списке
@@ -44,13 +50,15 @@ class PostAdmin(admin.ModelAdmin):
     # Фильтры в правой панели
     list_filter = (
         'is_published',
+        'is_visible',
         'category',
         'pub_date',
         'author'
     )
 
-    # Поля для поиска
-    search_fields = ('title', 'text', 'author__username')
+    # Поля для поиска; заголовок и текст ищутся
+    # через полнотекстовый индекс в get_search_results
+    search_fields = ('=author__username',)
 
     # Группировка полей в форме редактирования
     fieldsets = (
@@ -62,12 +70,44 @@ class PostAdmin(admin.ModelAdmin):
         }),
     )
 
+    actions = ('recount_comment_count', 'rescore_hot_score')
+
     # Оптимизация запросов к БД
     def get_queryset(self, request):
         return super().get_queryset(request).select_related('author',
                                                             'category',
                                                             'location')
 
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Поиск по заголовку и тексту через полнотекстовый индекс
+        вместо LIKE-сканирования; search_fields остаются для автора.
+        """
+        found, may_have_duplicates = super().get_search_results(
+            request, queryset, search_term)
+        found_ids = search_post_ids(search_term, SearchLimits.MAX_RESULTS)
+        if found_ids:
+            found |= queryset.filter(pk__in=found_ids)
+        return found, may_have_duplicates
+
+    @admin.action(description='Пересчитать количество комментариев')
+    def recount_comment_count(self, request, queryset):
+        fixed = recount_comments(queryset.values_list('pk', flat=True))
+        self.message_user(request, f'Исправлено счётчиков: {fixed}.')
+
+    @admin.action(description='Пересчитать рейтинг популярности')
+    def rescore_hot_score(self, request, queryset):
+        fixed = rescore_posts(queryset.values_list('pk', flat=True))
+        self.message_user(request, f'Исправлено рейтингов: {fixed}.')
+
+    # Новая дата публикации переносит вес поста в рейтинге.
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # В форме списка (list_editable) поля pub_date нет.
+        if change and 'pub_date' in form.changed_data:
+            move_publication(
+                obj.pk, form.initial.get('pub_date'), obj.pub_date)
+
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
@@ -76,3 +116,36 @@ class CommentAdmin(admin.ModelAdmin):
     search_fields = ('text', 'author__username', 'post__title')
     list_filter = ('is_published', 'created_at', 'author', 'post')
     raw_id_fields = ('author', 'post')
+
+    # Счётчик Post.comment_count и рейтинг популярности пересчитываются
+    # для затронутых постов в той же транзакции, что и изменение
+    # комментариев.
+    def save_model(self, request, obj, form, change):
+        post_ids = {obj.post_id}
+        if change and 'post' in form.changed_data:
+            post_ids.add(form.initial['post'])
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            recount_comments(post_ids)
+            rescore_posts(post_ids)
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            recount_comments([obj.post_id])
+            rescore_posts([obj.post_id])
+
+    def delete_queryset(self, request, queryset):
+        post_ids = set(queryset.values_list('post_id', flat=True))
+        with transaction.atomic():
+            super().delete_queryset(request, queryset)
+            recount_comments(post_ids)
+            rescore_posts(post_ids)
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'status', 'attempts', 'run_after', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = (
+        'locked_at', 'finished_at', 'last_error', 'created_at')
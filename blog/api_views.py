@@ -1,9 +1,112 @@
+from django.conf import settings
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 from rest_framework import viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import CursorPagination
+from rest_framework.response import Response
 
+from .constants import ApiLimits, SearchLimits
+from .exporters import (
+    FORMATS, SINCE_FIELDS, changed_rows, export_rows, iter_export
+)
 from .models import Post
+from .search import search_post_ids
 from .serializers import PostSerializer
 
 
+class PostCursorPagination(CursorPagination):
+    """Курсорная пагинация по (pub_date, id) без COUNT(*) и OFFSET."""
+
+    ordering = ('-pub_date', '-id')
+    page_size = ApiLimits.PAGE_SIZE
+    page_size_query_param = 'page_size'
+    max_page_size = ApiLimits.MAX_PAGE_SIZE
+
+
 class PostViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Post.objects.filter(is_published=True)
+    """
+    Видимые посты.
+    ?fields=id,Заголовок оставляет в ответе только перечисленные поля,
+    ?omit=Текст убирает перечисленные; из базы читаются только
+    нужные для них столбцы. Для списка дополнительно убираются
+    поля из настройки BLOG_API_LIST_OMIT.
+    """
+
+    queryset = Post.published.all()
     serializer_class = PostSerializer
+    pagination_class = PostCursorPagination
+
+    def _split(self, param):
+        """Имена полей из параметра запроса; неизвестные — ошибка 400."""
+        names = [
+            name.strip()
+            for name in self.request.query_params.get(param, '').split(',')
+            if name.strip()
+        ]
+        allowed = self.serializer_class.Meta.fields
+        if any(name not in allowed for name in names):
+            raise ValidationError({param: allowed})
+        return names
+
+    def get_serializer(self, *args, **kwargs):
+        params = self.request.query_params
+        if 'fields' in params:
+            kwargs.setdefault('fields', self._split('fields'))
+        omit = self._split('omit')
+        if self.action == 'list':
+            omit += settings.BLOG_API_LIST_OMIT
+        kwargs.setdefault('omit', omit)
+        return super().get_serializer(*args, **kwargs)
+
+    def get_queryset(self):
+        model_fields = self.get_serializer().get_model_fields()
+        # id и pub_date нужны курсору пагинации.
+        return (
+            super().get_queryset()
+            .select_related(None)
+            .only('id', 'pub_date', *model_fields)
+        )
+
+    @action(detail=False)
+    def search(self, request):
+        """Полнотекстовый поиск: /api/posts/search/?q=... ."""
+        found_ids = search_post_ids(
+            request.query_params.get('q', ''), SearchLimits.MAX_RESULTS)
+        posts = self.get_queryset().in_bulk(found_ids)
+        serializer = self.get_serializer(
+            [posts[pk] for pk in found_ids if pk in posts], many=True)
+        return Response(serializer.data)
+
+    @action(detail=False)
+    def export(self, request):
+        """
+        Потоковая выгрузка всех видимых постов:
+        /api/posts/export/?output=ndjson|csv&since=<ISO 8601>&by=updated_at|pub_date
+        С since по updated_at отдаются и скрытые после since посты
+        (без содержимого), и удалённые (deleted = true).
+        """
+        params = request.query_params
+        output_format = params.get('output', 'ndjson')
+        since_field = params.get('by', 'updated_at')
+        if output_format not in FORMATS:
+            raise ValidationError({'output': list(FORMATS)})
+        if since_field not in SINCE_FIELDS:
+            raise ValidationError({'by': list(SINCE_FIELDS)})
+        since = None
+        if 'since' in params:
+            since = parse_datetime(params['since'])
+            if since is None:
+                raise ValidationError({'since': 'Ожидается дата ISO 8601.'})
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+        if since is not None and since_field == 'updated_at':
+            rows = changed_rows(since)
+        else:
+            rows = export_rows(Post.published.all(), since, since_field)
+        return StreamingHttpResponse(
+            iter_export(rows, output_format),
+            content_type=FORMATS[output_format],
+        )
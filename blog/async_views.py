@@ -0,0 +1,143 @@
+"""
+Асинхронные версии публичных страниц для запуска под ASGI.
+
+Повторяют IndexView, PostDetailView, CategoryPostListView
+и UserProfileView, но читают базу через асинхронный ORM, а кэш страниц —
+через aget/aset. Всё, что нужно шаблону, загружается до рендера:
+шаблоны синхронны и не должны обращаться к базе и кэшу. Поэтому и
+request.user заменяется пользователем, загруженным через auser(),
+а карточки постов берутся из кэша заранее (arender).
+Включаются настройкой BLOG_ASYNC_VIEWS.
+"""
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db.models import Prefetch, Q
+from django.shortcuts import aget_object_or_404, render
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+
+from .cache import (
+    aload_post_cards, asave_post_cards, cache_shared_page, profile_owner
+)
+from .constants import PostLimits
+from .counters import count_views
+from .listings import LISTING_FIELDS, aattach_posts, listing
+from .models import Category, Comment, Post, PostListing
+from .paginators import AsyncPaginator, CursorPaginator
+
+User = get_user_model()
+
+
+async def apaginate(request, queryset, per_page=PostLimits.LATEST_POSTS_COUNT,
+                    count_cache_key=None, fields=None):
+    """Асинхронный аналог views.paginate."""
+    if settings.BLOG_CURSOR_PAGINATION:
+        paginator = CursorPaginator(
+            queryset, per_page, count_cache_key=count_cache_key,
+            fields=fields)
+        return await paginator.aget_page(request.GET.get('cursor'))
+    paginator = await AsyncPaginator.create(queryset, per_page)
+    return await paginator.aget_page(request.GET.get('page'))
+
+
+async def arender(request, template_name, context):
+    """
+    render() для страницы со списком постов context['page_obj'].
+    Карточки загружаются из кэша до рендера, а отрендеренные
+    заново сохраняются после него.
+    """
+    posts = context['page_obj'].object_list
+    await aload_post_cards(posts)
+    response = render(request, template_name, context)
+    await asave_post_cards(posts)
+    return response
+
+
+async def apaginate_listing(request, kind, owner_id):
+    """Асинхронный аналог CursorPaginationMixin.paginate_listing."""
+    page = await apaginate(
+        request, listing(kind, owner_id), fields=LISTING_FIELDS)
+    return await aattach_posts(page)
+
+
+@cache_shared_page
+async def index(request):
+    """Главная страница: опубликованные посты от новых к старым."""
+    request.user = await request.auser()
+    page_obj = await apaginate(
+        request, Post.published.order_by('-pub_date'),
+        count_cache_key='blog:index:count')
+    return await arender(request, 'blog/index.html', {
+        'page_obj': page_obj,
+        'paginator': page_obj.paginator,
+        'is_paginated': page_obj.has_other_pages(),
+    })
+
+
+@count_views
+@cache_shared_page
+async def post_detail(request, post_id):
+    """Пост с комментариями; автор видит и ещё не видимый в ленте пост."""
+    request.user = user = await request.auser()
+    queryset = (
+        Post.objects
+        .select_related('author', 'category', 'location')
+        .prefetch_related(Prefetch(
+            'comments',
+            queryset=Comment.objects.select_related('author')
+        ))
+    )
+    condition = Q(is_visible=True)
+    if user.is_authenticated:
+        condition |= Q(author=user)
+    post = await aget_object_or_404(queryset.filter(condition), pk=post_id)
+    response = render(request, 'blog/detail.html', {
+        'post': post,
+        'object': post,
+        'comments': post.comments.all(),
+    })
+    if not post.is_visible:
+        patch_cache_control(response, private=True)
+    return response
+
+
+@cache_shared_page
+async def category_posts(request, category_slug):
+    """Опубликованные посты опубликованной категории."""
+    request.user = await request.auser()
+    category = await aget_object_or_404(
+        Category, slug=category_slug, is_published=True)
+    page_obj = await apaginate_listing(
+        request, PostListing.Kind.CATEGORY, category.pk)
+    return await arender(request, 'blog/category.html', {
+        'category': category,
+        'page_obj': page_obj,
+    })
+
+
+@cache_shared_page(vary=profile_owner)
+async def profile(request, username):
+    """Профиль: владелец видит все свои посты, остальные — опубликованные."""
+    request.user = user = await request.auser()
+    profile_user = await aget_object_or_404(User, username=username)
+    if user == profile_user:
+        # Шаблон не может догружать связанные объекты в асинхронном коде.
+        page_obj = await apaginate(
+            request,
+            Post.objects.select_related('author', 'category', 'location')
+            .filter(author=profile_user).order_by('-pub_date'))
+    else:
+        page_obj = await apaginate_listing(
+            request, PostListing.Kind.AUTHOR, profile_user.pk)
+
+    full_name = profile_user.get_full_name()
+    profile_user.get_full_name = (
+        lambda: full_name if full_name.strip() else ''
+    )
+    return await arender(request, 'blog/profile.html', {
+        'profile': profile_user,
+        'page_obj': page_obj,
+        'is_owner': user == profile_user,
+        'now': timezone.now(),
+    })
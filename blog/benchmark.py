@@ -0,0 +1,399 @@
+"""
+Замеры маршрутов блога: задержка, число SQL-запросов и выделения памяти.
+
+Каждый маршрут из blog/urls.py и pages/urls.py прогоняется через
+тестовый клиент Django; изменяющие запросы выполняются в транзакции,
+которая откатывается. Анонимные страницы дополнительно нагружаются
+параллельными HTTP-запросами. Результаты сравниваются с бюджетами
+из JSON-файла.
+
+Замер идёт на временной базе с данными Benchmarks.DATASET: время
+ответа зависит от объёма данных, а число запросов — нет, поэтому
+на любой другой базе сравнимы только бюджеты числа запросов.
+Исключение — удаление поста: каскад удаляет комментарии пачками
+по 100, и запросов тем больше, чем больше обсуждение.
+"""
+
+import os
+import statistics
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.servers.basehttp import (
+    ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application)
+from django.db import connection, connections, transaction
+from django.test import Client, override_settings
+from django.test.utils import (
+    CaptureQueriesContext, setup_databases, teardown_databases)
+from django.urls import URLResolver, get_resolver, reverse
+from django.utils import timezone
+
+from .constants import Benchmarks
+from .counters import view_counts
+from .models import Category, Comment, Post
+from .seeding import seed_dataset
+
+Route = namedtuple(
+    'Route', 'name url method data login', defaults=('get', None, None))
+"""Запрос к маршруту name от имени пользователя login (None — аноним)."""
+
+
+class Rollback(Exception):
+    """Откатывает транзакцию изменяющего запроса."""
+
+
+def route_names(urlconf=None):
+    """Имена всех маршрутов blog и pages вместе с пространством имён."""
+    names = set()
+
+    def walk(patterns, namespace):
+        for pattern in patterns:
+            if isinstance(pattern, URLResolver):
+                walk(pattern.url_patterns, pattern.namespace or namespace)
+            elif pattern.name and namespace in ('blog', 'pages'):
+                names.add(f'{namespace}:{pattern.name}')
+
+    walk(get_resolver(urlconf).url_patterns, None)
+    return names
+
+
+@contextmanager
+def benchmark_database(dataset=Benchmarks.DATASET, verbosity=0):
+    """
+    Временная база (как у тестов) с данными seed_dataset(**dataset).
+    База SQLite создаётся в файле, а не в памяти: её должны видеть
+    потоки встроенного сервера нагрузочного прогона.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        replaced = {}
+        for alias in connections:
+            test = connections[alias].settings_dict['TEST']
+            if (connections[alias].vendor == 'sqlite'
+                    and not test.get('NAME') and not test.get('MIRROR')):
+                replaced[alias] = test.get('NAME')
+                test['NAME'] = os.path.join(directory, f'{alias}.sqlite3')
+        old_config = setup_databases(verbosity, interactive=False)
+        try:
+            seed_dataset(**dataset)
+            clear_caches()
+            yield
+        finally:
+            # Просмотры замера не должны попасть в настоящую базу.
+            view_counts.drain()
+            teardown_databases(old_config, verbosity)
+            for alias, name in replaced.items():
+                connections[alias].settings_dict['TEST']['NAME'] = name
+
+
+def sample_objects():
+    """Видимый пост с наибольшим числом комментариев и его комментарий."""
+    comment = (
+        Comment.objects
+        .filter(post__is_visible=True)
+        .select_related('author', 'post__author')
+        .order_by('-post__comment_count', 'pk')
+        .first()
+    )
+    if comment is None:
+        raise LookupError(
+            'Нет видимых постов с комментариями: '
+            'сгенерируйте данные (seed_blog).')
+    return comment.post, comment
+
+
+def build_routes():
+    """Запросы ко всем маршрутам блога и статических страниц."""
+    post, comment = sample_objects()
+    category = Category.objects.filter(is_published=True).first()
+    author = post.author
+    post_kwargs = {'post_id': post.pk}
+    comment_kwargs = {'post_id': post.pk, 'comment_id': comment.pk}
+    post_data = {
+        'title': post.title,
+        'text': post.text,
+        'pub_date': timezone.localtime(post.pub_date).strftime(
+            '%Y-%m-%dT%H:%M'),
+        'category': post.category_id,
+        'location': post.location_id or '',
+        'is_published': 'on',
+    }
+    comment_data = {'text': comment.text}
+    profile_data = {'first_name': '', 'last_name': '', 'email': ''}
+    search = '?' + urlencode({'q': post.title.split()[0]})
+    # Инкрементальная выгрузка последних изменений, а не всей таблицы.
+    since = Post.objects.order_by('-updated_at').values_list(
+        'updated_at', flat=True)[Benchmarks.EXPORT_TAIL:][:1].first()
+    since = '?' + urlencode({'since': (since or post.updated_at).isoformat()})
+
+    def url(name, *args, **kwargs):
+        return reverse(name, args=args, kwargs=kwargs)
+
+    return [
+        Route('blog:index', url('blog:index')),
+        Route('blog:popular', url('blog:popular')),
+        Route('blog:search', url('blog:search') + search),
+        Route('blog:post_detail', url('blog:post_detail', **post_kwargs)),
+        Route('blog:category_posts', url(
+            'blog:category_posts', category_slug=category.slug)),
+        Route('blog:profile', url('blog:profile', author.username)),
+        Route('blog:user_posts', url('blog:user_posts', author.username)),
+        Route('blog:create_post', url('blog:create_post'), login=author),
+        Route('blog:create_post', url('blog:create_post'),
+              'post', post_data, author),
+        Route('blog:edit_post', url('blog:edit_post', **post_kwargs),
+              login=author),
+        Route('blog:edit_post', url('blog:edit_post', **post_kwargs),
+              'post', post_data, author),
+        Route('blog:delete_post', url('blog:delete_post', **post_kwargs),
+              login=author),
+        Route('blog:delete_post', url('blog:delete_post', **post_kwargs),
+              'post', {}, author),
+        Route('blog:add_comment', url('blog:add_comment', **post_kwargs),
+              'post', comment_data, author),
+        Route('blog:edit_comment', url('blog:edit_comment',
+                                       **comment_kwargs),
+              login=comment.author),
+        Route('blog:edit_comment', url('blog:edit_comment',
+                                       **comment_kwargs),
+              'post', comment_data, comment.author),
+        Route('blog:delete_comment', url('blog:delete_comment',
+                                         **comment_kwargs),
+              login=comment.author),
+        Route('blog:delete_comment', url('blog:delete_comment',
+                                         **comment_kwargs),
+              'post', {}, comment.author),
+        Route('blog:edit_profile', url('blog:edit_profile'), login=author),
+        Route('blog:edit_profile', url('blog:edit_profile'),
+              'post', profile_data, author),
+        Route('blog:api-root', url('blog:api-root'),
+              login=author),
+        Route('blog:post-list', url('blog:post-list'),
+              login=author),
+        Route('blog:post-detail', url('blog:post-detail', post.pk),
+              login=author),
+        Route('blog:post-search', url('blog:post-search') + search,
+              login=author),
+        Route('blog:post-export', url('blog:post-export') + since,
+              login=author),
+        Route('pages:about', url('pages:about')),
+        Route('pages:rules', url('pages:rules')),
+    ]
+
+
+def route_key(route):
+    if route.method == 'get':
+        return route.name
+    return f'{route.name} {route.method.upper()}'
+
+
+def clear_caches():
+    caches[settings.BLOG_PAGE_CACHE].clear()
+    caches[settings.BLOG_FRAGMENT_CACHE].clear()
+
+
+def send(client, route):
+    """Выполняет запрос и дочитывает потоковый ответ."""
+    response = getattr(client, route.method)(route.url, route.data)
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+    return response
+
+
+def send_once(client, route):
+    """
+    Запрос с подсчётом SQL. Изменяющий запрос откатывается,
+    поэтому его можно повторять и данные не меняются.
+    """
+    with CaptureQueriesContext(connection) as queries:
+        if route.method == 'get':
+            response = send(client, route)
+        else:
+            try:
+                with transaction.atomic():
+                    response = send(client, route)
+                    raise Rollback
+            except Rollback:
+                pass
+    return response, len(queries)
+
+
+def percentiles(samples):
+    """p50, p95 и p99 в миллисекундах."""
+    if len(samples) == 1:
+        return {key: round(samples[0], 3) for key in ('p50', 'p95', 'p99')}
+    cuts = statistics.quantiles(samples, n=100, method='inclusive')
+    return {
+        'p50': round(cuts[49], 3),
+        'p95': round(cuts[94], 3),
+        'p99': round(cuts[98], 3),
+    }
+
+
+def get_client(clients, user):
+    """Клиент, вошедший как user (анонимный для None)."""
+    if user not in clients:
+        clients[user] = Client()
+        if user is not None:
+            clients[user].force_login(user)
+    return clients[user]
+
+
+def measure_routes(routes, repeat=Benchmarks.REPEAT, warm=False):
+    """
+    Замер каждого маршрута тестовым клиентом.
+    Без warm кэши страниц и фрагментов очищаются перед каждым запросом.
+    """
+    clients = {}
+    report = {}
+    # Тестовый клиент обращается к хосту testserver.
+    with override_settings(
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for route in routes:
+            report[route_key(route)] = measure_route(
+                get_client(clients, route.login), route, repeat, warm)
+    return report
+
+
+def measure_route(client, route, repeat, warm):
+    timings, query_counts = [], []
+    for _ in range(repeat):
+        if not warm:
+            clear_caches()
+        started = time.perf_counter()
+        response, queries = send_once(client, route)
+        timings.append((time.perf_counter() - started) * 1000)
+        query_counts.append(queries)
+    # Память считается отдельным запросом: tracemalloc искажает время.
+    if not warm:
+        clear_caches()
+    tracemalloc.start()
+    try:
+        send_once(client, route)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        'status': response.status_code,
+        'queries': max(query_counts),
+        **percentiles(timings),
+        'peak_kb': round(peak / 1024, 1),
+    }
+
+
+class LiveServer:
+    """Многопоточный WSGI-сервер проекта на свободном порту."""
+
+    def __enter__(self):
+        self.server = ThreadedWSGIServer(
+            ('127.0.0.1', 0), QuietRequestHandler)
+        self.server.set_app(get_internal_wsgi_application())
+        self.thread = threading.Thread(
+            target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        host, port = self.server.server_address
+        return f'http://{host}:{port}'
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def session_cookie(user):
+    """Заголовок Cookie с сессией пользователя для HTTP-запросов."""
+    client = Client()
+    client.force_login(user)
+    name = settings.SESSION_COOKIE_NAME
+    return f'{name}={client.cookies[name].value}'
+
+
+def fetch(url, cookie, timeout):
+    request = Request(url, headers={'Cookie': cookie} if cookie else {})
+    started = time.perf_counter()
+    try:
+        with urlopen(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except HTTPError as error:
+        status = error.code
+    return status, (time.perf_counter() - started) * 1000
+
+
+def load_test(base_url, routes, concurrency=Benchmarks.CONCURRENCY,
+              requests=Benchmarks.REQUESTS, timeout=Benchmarks.TIMEOUT):
+    """
+    Отправляет по requests GET-запросов к каждому маршруту
+    в concurrency потоков. Возвращает перцентили и число ошибок.
+    """
+    cookies = {}
+    report = {}
+    with ThreadPoolExecutor(concurrency) as executor:
+        for route in routes:
+            if route.method != 'get':
+                continue
+            if route.login is not None and route.login not in cookies:
+                cookies[route.login] = session_cookie(route.login)
+            cookie = cookies.get(route.login)
+            started = time.perf_counter()
+            results = list(executor.map(
+                lambda _: fetch(base_url + route.url, cookie, timeout),
+                range(requests)))
+            elapsed = time.perf_counter() - started
+            report[route_key(route)] = {
+                **percentiles([latency for _, latency in results]),
+                'rps': round(requests / elapsed, 1),
+                'errors': sum(status >= 400 for status, _ in results),
+            }
+    return report
+
+
+def check_budgets(report, budgets, metrics=None):
+    """
+    Сравнивает замер с бюджетами вида
+    {"blog:index": {"queries": 6, "p95": 40.0}, ...};
+    если задан metrics — только эти показатели.
+    Возвращает список нарушений.
+    """
+    violations = []
+    for key, limits in budgets.items():
+        measured = report.get(key)
+        if measured is None:
+            violations.append(f'{key}: маршрут не замерялся')
+            continue
+        for metric, limit in limits.items():
+            if metrics is not None and metric not in metrics:
+                continue
+            if measured[metric] > limit:
+                violations.append(
+                    f'{key}: {metric} = {measured[metric]} > {limit}')
+    return violations
+
+
+def record_budgets(report, headroom=Benchmarks.LATENCY_HEADROOM,
+                   floor=Benchmarks.LATENCY_FLOOR):
+    """
+    Бюджеты по текущему замеру: число запросов — как есть,
+    p95 — с запасом headroom на разброс между машинами, но не меньше floor.
+    """
+    return {
+        key: {
+            'queries': measured['queries'],
+            'p95': round(max(measured['p95'] * headroom, floor), 1),
+        }
+        for key, measured in report.items()
+    }
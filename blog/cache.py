@@ -0,0 +1,367 @@
+"""
+Кэш отрендеренных фрагментов и страниц.
+
+Ключ фрагмента включает версии всех объектов, из которых он собран.
+Сигналы сохранения и удаления меняют версию объекта,
+поэтому устаревшие фрагменты просто перестают запрашиваться
+и вытесняются бэкендом кэша по таймауту.
+Страницы кэшируются целиком с версией всего контента сайта в ключе:
+персональные части в кэш не попадают и заполняются для каждого
+запроса (blog.holes).
+"""
+
+import hashlib
+import time
+from functools import partial, wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.utils import translation
+from django.utils.cache import (
+    get_conditional_response, patch_cache_control, patch_vary_headers
+)
+from django.utils.http import http_date, quote_etag
+from django.utils.timezone import get_current_timezone_name, now
+
+from .holes import fill_holes
+
+VERSION_PREFIX = 'blog:version'
+POST_CARD_PREFIX = 'blog:post_card'
+PAGE_PREFIX = 'blog:page'
+NEXT_PUBLICATION_PREFIX = 'blog:next_publication'
+SITE_CONTENT = ('site', 'content')
+
+
+def get_fragment_cache():
+    """Бэкенд кэша для фрагментов (настройка BLOG_FRAGMENT_CACHE)."""
+    return caches[settings.BLOG_FRAGMENT_CACHE]
+
+
+def version_key(kind, pk):
+    return f'{VERSION_PREFIX}:{kind}:{pk}'
+
+
+def new_version():
+    # Уникальное значение, а не счётчик: если версия будет вытеснена
+    # из кэша, новая не совпадёт ни с одной из прежних.
+    return str(time.time_ns())
+
+
+def bump_version(kind, pk):
+    """Делает недействительными все фрагменты, зависящие от объекта."""
+    get_fragment_cache().set(version_key(kind, pk), new_version(), None)
+
+
+def bump_versions(kind, pks):
+    """bump_version для нескольких объектов одним обращением к кэшу."""
+    version = new_version()
+    get_fragment_cache().set_many(
+        {version_key(kind, pk): version for pk in pks}, None)
+
+
+def get_versions(keys):
+    """
+    Возвращает версии для списка ключей одним обращением к кэшу.
+    Отсутствующие версии создаются.
+    """
+    cache = get_fragment_cache()
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, new_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(keys):
+    """Асинхронный вариант get_versions."""
+    cache = get_fragment_cache()
+    versions = await cache.aget_many(keys)
+    for key in keys:
+        if key not in versions:
+            await cache.aadd(key, new_version(), None)
+            versions[key] = await cache.aget(key)
+    return [versions[key] for key in keys]
+
+
+def post_card_versions(post):
+    """Ключи версий поста, автора, категории и местоположения."""
+    return [
+        version_key('post', post.pk),
+        version_key('user', post.author_id),
+        version_key('category', post.category_id),
+        version_key('location', post.location_id),
+    ]
+
+
+def card_key(post, versions):
+    return ':'.join([
+        POST_CARD_PREFIX,
+        str(post.pk),
+        *versions,
+        translation.get_language() or '',
+        get_current_timezone_name(),
+    ])
+
+
+def post_card_key(post):
+    """
+    Ключ карточки поста: id, версии поста, автора, категории
+    и местоположения, а также язык и часовой пояс зрителя,
+    от которых зависит формат даты.
+    """
+    return card_key(post, get_versions(post_card_versions(post)))
+
+
+async def aload_post_cards(posts):
+    """
+    Асинхронный код не может обращаться к кэшу из шаблона, поэтому
+    ключи и готовые карточки загружаются до рендера: одно обращение
+    за версиями и одно за фрагментами. Результат — post.card,
+    словарь с ключом и html (None, если карточки нет в кэше);
+    тег cached_post_card рендерит недостающие, asave_post_cards
+    сохраняет их.
+    """
+    keys = {post.pk: post_card_versions(post) for post in posts}
+    unique = list(dict.fromkeys(
+        key for post_keys in keys.values() for key in post_keys))
+    versions = dict(zip(unique, await aget_versions(unique)))
+    for post in posts:
+        post.card = {'key': card_key(
+            post, [versions[key] for key in keys[post.pk]])}
+    cached = await get_fragment_cache().aget_many(
+        [post.card['key'] for post in posts])
+    for post in posts:
+        post.card['html'] = cached.get(post.card['key'])
+
+
+async def asave_post_cards(posts):
+    """Сохраняет карточки, отрендеренные после aload_post_cards."""
+    rendered = {
+        post.card['key']: post.card['html']
+        for post in posts if post.card.get('rendered')
+    }
+    if rendered:
+        await get_fragment_cache().aset_many(
+            rendered, settings.BLOG_FRAGMENT_CACHE_TIMEOUT)
+
+
+def get_page_cache():
+    """Бэкенд кэша для страниц (настройка BLOG_PAGE_CACHE)."""
+    return caches[settings.BLOG_PAGE_CACHE]
+
+
+def next_publication(content_version):
+    """
+    Ближайшая дата отложенной публикации в будущем или None.
+    Результат кэшируется до этой даты в пределах версии контента.
+    """
+    from .publication import next_due_publication
+
+    cache = get_page_cache()
+    key = f'{NEXT_PUBLICATION_PREFIX}:{content_version}'
+    cached = cache.get(key)
+    if cached is not None:
+        return cached or None
+    current = now()
+    upcoming = next_due_publication(current)
+    cache.set(key, upcoming or '', publication_timeout(upcoming, current))
+    return upcoming
+
+
+async def anext_publication(content_version):
+    """Асинхронный вариант next_publication."""
+    from .publication import anext_due_publication
+
+    cache = get_page_cache()
+    key = f'{NEXT_PUBLICATION_PREFIX}:{content_version}'
+    cached = await cache.aget(key)
+    if cached is not None:
+        return cached or None
+    current = now()
+    upcoming = await anext_due_publication(current)
+    await cache.aset(
+        key, upcoming or '', publication_timeout(upcoming, current))
+    return upcoming
+
+
+def publication_timeout(upcoming, current):
+    if upcoming is None:
+        return settings.BLOG_PAGE_CACHE_TIMEOUT
+    return (upcoming - current).total_seconds()
+
+
+def page_timeout(content_version):
+    """
+    Время жизни страницы: не дольше BLOG_PAGE_CACHE_TIMEOUT
+    и не дольше момента ближайшей отложенной публикации.
+    """
+    return timeout_until(next_publication(content_version))
+
+
+def replica_may_lag(request, content_version):
+    """
+    Страница могла быть собрана из реплики, ещё не получившей
+    изменение, которое сменило версию контента. Такую страницу
+    нельзя кэшировать под новой версией, пока не истечёт
+    BLOG_REPLICA_STICKY_SECONDS — допустимое отставание реплик.
+    Запросы с cookie «прилипания» читают из основной базы.
+    """
+    if (not settings.BLOG_READ_REPLICAS
+            or settings.BLOG_REPLICA_STICKY_COOKIE in request.COOKIES):
+        return False
+    # Версия — время её смены в наносекундах (new_version).
+    changed = int(content_version) / 1e9
+    return time.time() - changed < settings.BLOG_REPLICA_STICKY_SECONDS
+
+
+def timeout_until(upcoming):
+    timeout = settings.BLOG_PAGE_CACHE_TIMEOUT
+    if upcoming is not None:
+        timeout = min(timeout, (upcoming - now()).total_seconds())
+    return int(timeout)
+
+
+def page_key(request, content_version, variant=None):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return ':'.join([
+        PAGE_PREFIX,
+        content_version,
+        translation.get_language() or '',
+        get_current_timezone_name(),
+        variant or '',
+        path,
+    ])
+
+
+def page_entry(response):
+    """Запись кэша страницы или None, если ответ кэшировать нельзя."""
+    if hasattr(response, 'render') and callable(response.render):
+        response.render()
+    if (response.status_code != 200
+            or 'private' in response.get('Cache-Control', ())):
+        return None
+    return {
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'etag': quote_etag(hashlib.md5(response.content).hexdigest()),
+        'last_modified': int(time.time()),
+    }
+
+
+def filled_response(request, response):
+    """Ответ, который не попал в кэш, с заполненными дырами."""
+    if not response.streaming:
+        response.content = fill_holes(request, response.content)
+    return response
+
+
+def entry_response(request, entry):
+    content = fill_holes(request, entry['content'])
+    etag = entry['etag']
+    if content is not entry['content']:
+        etag = quote_etag(hashlib.md5(content).hexdigest())
+    response = HttpResponse(content, content_type=entry['content_type'])
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(entry['last_modified'])
+    # Браузер хранит копию, но перепроверяет её при каждом запросе.
+    patch_cache_control(response, no_cache=True)
+    patch_vary_headers(response, ('Cookie',))
+    return get_conditional_response(
+        request,
+        etag=etag,
+        last_modified=entry['last_modified'],
+        response=response,
+    )
+
+
+def cache_shared_page(view=None, *, vary=None):
+    """
+    Кэширует ответ на GET/HEAD-запрос целиком для всех посетителей.
+    Персональные части страницы при этом рендерятся метками {% hole %}
+    и заполняются для каждого запроса, поэтому вошедшие пользователи
+    тоже получают страницу из кэша.
+
+    vary(request, *args, **kwargs) возвращает вариант страницы, если
+    от посетителя зависит и общая часть (например, владелец профиля
+    видит неопубликованные посты). Ответ с Cache-Control: private
+    не кэшируется. Отдаёт ETag и Last-Modified и отвечает 304
+    на условные запросы. Любое изменение контента меняет версию сайта
+    в ключе кэша. Пока реплики могут отставать от последнего
+    изменения, страницы, собранные из них, не сохраняются.
+    Асинхронные представления работают с кэшем через aget/aset.
+    """
+    if view is None:
+        return partial(cache_shared_page, vary=vary)
+    if iscoroutinefunction(view):
+        return acache_shared_page(view, vary)
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return view(request, *args, **kwargs)
+
+        cache = get_page_cache()
+        content_version, = get_versions([version_key(*SITE_CONTENT)])
+        key = page_key(
+            request, content_version,
+            vary and vary(request, *args, **kwargs))
+        entry = cache.get(key)
+        if entry is None:
+            request.shared_render = True
+            try:
+                response = view(request, *args, **kwargs)
+                # Отложенный рендер TemplateResponse — тоже с метками.
+                entry = page_entry(response)
+            finally:
+                request.shared_render = False
+            timeout = page_timeout(content_version)
+            if (entry is None or timeout <= 0
+                    or replica_may_lag(request, content_version)):
+                return filled_response(request, response)
+            cache.set(key, entry, timeout)
+        return entry_response(request, entry)
+
+    return wrapper
+
+
+def acache_shared_page(view, vary):
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await view(request, *args, **kwargs)
+
+        # Дыры заполняются синхронно: пользователь нужен заранее.
+        request.user = await request.auser()
+        cache = get_page_cache()
+        content_version, = await aget_versions([version_key(*SITE_CONTENT)])
+        key = page_key(
+            request, content_version,
+            vary and vary(request, *args, **kwargs))
+        entry = await cache.aget(key)
+        if entry is None:
+            request.shared_render = True
+            try:
+                response = await view(request, *args, **kwargs)
+                # Отложенный рендер TemplateResponse — тоже с метками.
+                entry = page_entry(response)
+            finally:
+                request.shared_render = False
+            timeout = timeout_until(
+                await anext_publication(content_version))
+            if (entry is None or timeout <= 0
+                    or replica_may_lag(request, content_version)):
+                return filled_response(request, response)
+            await cache.aset(key, entry, timeout)
+        return entry_response(request, entry)
+
+    return wrapper
+
+
+def profile_owner(request, username):
+    """Вариант страницы профиля: владелец видит все свои посты."""
+    if request.user.is_authenticated and request.user.username == username:
+        return 'owner'
+    return None
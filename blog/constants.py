@@ -14,3 +14,200 @@ class Lengths:
 class PostLimits:
     LATEST_POSTS_COUNT = 10
     """Количество последних постов на главной."""
+
+    CURSOR_COUNT_TIMEOUT = 300
+    """Время жизни (сек.) закэшированного общего числа постов в ленте."""
+
+
+class QueryBudgets:
+    """
+    Верхние границы числа SQL-запросов на страницу.
+    Не зависят от количества объектов на странице — проверяются в тестах.
+    """
+
+    POST_DETAIL = 5
+    """
+    Страница поста: сессия, пользователь, пост со связанными объектами,
+    все комментарии с авторами и ближайшая отложенная публикация
+    (она ограничивает время жизни страницы в кэше).
+    """
+
+    POST_LIST = 6
+    """
+    Лента, категория, профиль и популярное: сессия, пользователь,
+    владелец списка, строки списка, посты со связанными объектами
+    и ближайшая отложенная публикация.
+    """
+
+
+class Listings:
+    BATCH_SIZE = 5000
+    """Размер пачки строк при построении списков постов."""
+
+
+class CommentCounters:
+    BATCH_SIZE = 1000
+    """Размер пачки постов при пересчёте счётчиков комментариев."""
+
+
+class ViewCounters:
+    FLUSH_THRESHOLD = 1000
+    """
+    Просмотров в осколке буфера одного потока, после которых
+    счётчики записываются, не дожидаясь таймера.
+    """
+
+    BATCH_SIZE = 500
+    """Количество постов в одном UPDATE при записи просмотров."""
+
+
+class HotRanking:
+    HALF_LIFE = 24 * 60 * 60
+    """Время (сек.), за которое вес события в рейтинге падает вдвое."""
+
+    MIN_REMAINDER = 1e-12
+    """
+    Доля рейтинга, оставшаяся после удаления события, ниже которой
+    остаток считается ошибкой округления.
+    """
+
+    TOLERANCE = 1e-9
+    """Расхождение рейтинга, которое не исправляется при пересчёте."""
+
+    BATCH_SIZE = 1000
+    """Размер пачки постов при пересчёте рейтинга."""
+
+
+class Seeding:
+    """Параметры генерации синтетических данных."""
+
+    USERS = 1000
+    CATEGORIES = 20
+    LOCATIONS = 50
+    BATCH_SIZE = 5000
+    HIDDEN_SHARE = 0.05
+    """Доля снятых с публикации постов и категорий."""
+    MINUTES = 5 * 365 * 24 * 60
+    """Глубина истории публикаций в минутах."""
+
+    FUTURE_SHARE = 0.01
+    FUTURE_MINUTES = 30 * 24 * 60
+    """Доля отложенных постов и горизонт их публикации в минутах."""
+
+    AUTHOR_SKEW = 0.9
+    HOT_POST_SKEW = 0.8
+    """Показатели закона Ципфа для авторов постов и постов с комментариями."""
+
+
+class Scheduler:
+    """Паузы планировщика отложенных публикаций, сек."""
+
+    MAX_SLEEP = 60
+    MIN_SLEEP = 0.5
+
+
+class SearchLimits:
+    MAX_RESULTS = 200
+    """Максимальное количество постов в выдаче поиска."""
+
+    REBUILD_BATCH_SIZE = 2000
+    """Размер пачки при перестроении поискового индекса."""
+
+
+class ApiLimits:
+    PAGE_SIZE = 20
+    """Постов на странице API по умолчанию."""
+
+    MAX_PAGE_SIZE = 100
+    """Максимальный размер страницы, который можно запросить."""
+
+
+class ExportLimits:
+    CHUNK_SIZE = 2000
+    """Количество строк, читаемых из базы за одно обращение при выгрузке."""
+
+
+class ImageVariants:
+    """Параметры уменьшенных копий изображений постов."""
+
+    WIDTHS = (320, 640, 960, 1280)
+    QUALITY = 80
+    DIRECTORY = 'posts_images/variants'
+    SIZES = '(max-width: 40rem) 100vw, 40rem'
+    """Атрибут sizes: карточка поста не шире 40rem."""
+
+    WORKERS = 4
+    """Количество потоков при массовой обработке."""
+
+
+class MediaCleanup:
+    GRACE_PERIOD = 60 * 60 * 24
+    """
+    Файлы моложе этого (сек.) не удаляются: пост, которому они
+    загружены, может быть ещё не сохранён.
+    """
+
+
+class TaskQueue:
+    """Параметры фоновой очереди задач."""
+
+    NAME_LENGTH = 128
+    MAX_ATTEMPTS = 5
+    RETRY_DELAY = 10
+    """Пауза перед первым повтором, сек.; далее удваивается."""
+
+    POLL_INTERVAL = 1.0
+    """Пауза воркера при пустой очереди, сек."""
+
+    STALE_TIMEOUT = 60 * 10
+    """Через сколько секунд «зависшая» задача возвращается в очередь."""
+
+    KEEP_DONE = 60 * 60 * 24
+    """Сколько секунд хранятся выполненные задачи."""
+
+    WORKERS = 2
+    """Количество потоков воркера."""
+
+
+class Benchmarks:
+    """Параметры замера маршрутов (команда benchmark_views)."""
+
+    REPEAT = 20
+    """Запросов к каждому маршруту через тестовый клиент."""
+
+    CONCURRENCY = 8
+    REQUESTS = 200
+    """Потоки и число HTTP-запросов к маршруту при нагрузке."""
+
+    TIMEOUT = 10
+    EXPORT_TAIL = 500
+    """Сколько последних изменённых постов выгружает маршрут export."""
+
+    LATENCY_HEADROOM = 3.0
+    """Запас p95 при записи бюджетов: замеры разных машин расходятся."""
+
+    LATENCY_FLOOR = 50.0
+    """Минимальный бюджет p95, мс: у быстрых страниц велик шум."""
+
+    DATASET = {
+        'users': 200,
+        'categories': 10,
+        'locations': 20,
+        'posts': 2000,
+        'comments': 6000,
+        'seed': 0,
+    }
+    """
+    Параметры seed_dataset для временной базы замера. Время ответа
+    зависит от объёма данных, поэтому бюджеты p95 записываются
+    и проверяются только на этом наборе.
+    """
+
+
+class WriteRetries:
+    """Повторы транзакций записи при блокировке SQLite."""
+
+    ATTEMPTS = 5
+    BASE_DELAY = 0.05
+    MAX_DELAY = 1.0
+    """Пауза перед первым повтором и её верхняя граница, сек."""
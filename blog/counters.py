@@ -0,0 +1,185 @@
+"""
+Счётчики просмотров постов с отложенной записью.
+
+Просмотр не пишет в базу: он увеличивает счётчик в памяти процесса.
+У каждого потока свой осколок буфера со своей блокировкой, поэтому
+потоки не ждут друг друга. Накопленные приращения суммируются
+и записываются пачкой: по таймеру раз в BLOG_VIEW_FLUSH_INTERVAL сек.,
+раньше — когда осколок набрал ViewCounters.FLUSH_THRESHOLD просмотров,
+и при завершении процесса (atexit). Одна запись — по UPDATE с F()
+на каждое различное приращение, а не на каждый пост.
+
+Каждый процесс копит свои просмотры; после fork буфер дочернего
+процесса начинается пустым. При аварийном завершении теряется не
+больше одного интервала (или порога) просмотров на процесс.
+Запись, не удавшаяся из-за базы, возвращается в буфер.
+"""
+
+import atexit
+import logging
+import os
+import threading
+from collections import Counter, defaultdict
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DatabaseError
+from django.db.models import F
+
+from .cache import bump_versions
+from .constants import ViewCounters
+from .models import Post
+from .writes import run_write
+
+logger = logging.getLogger(__name__)
+
+
+class Shard:
+    """Просмотры, накопленные одним потоком."""
+
+    def __init__(self):
+        self.thread = threading.current_thread()
+        self.lock = threading.Lock()
+        self.counts = Counter()
+        self.pending = 0
+
+
+def write_counts(totals, batch_size=ViewCounters.BATCH_SIZE):
+    """Прибавляет просмотры {id поста: приращение} к Post.view_count."""
+    by_delta = defaultdict(list)
+    for post_id, delta in totals.items():
+        by_delta[delta].append(post_id)
+    for delta, post_ids in by_delta.items():
+        for offset in range(0, len(post_ids), batch_size):
+            Post.objects.filter(
+                pk__in=post_ids[offset:offset + batch_size]
+            ).update(view_count=F('view_count') + delta)
+
+
+class ViewCounterBuffer:
+    """Буфер просмотров процесса, разбитый на осколки по потокам."""
+
+    def __init__(self, threshold=ViewCounters.FLUSH_THRESHOLD):
+        self.threshold = threshold
+        self.reset()
+
+    def reset(self):
+        """Пустой буфер; вызывается и в дочернем процессе после fork."""
+        self._local = threading.local()
+        self._guard = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._shards = []
+        self._returned = Counter()
+        self._wakeup = threading.Event()
+        self._timer = None
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = Shard()
+            with self._guard:
+                self._shards.append(shard)
+                self._start_timer()
+        return shard
+
+    def _start_timer(self):
+        interval = settings.BLOG_VIEW_FLUSH_INTERVAL
+        if interval and self._timer is None:
+            self._timer = threading.Thread(
+                target=self._run_timer, args=(interval,),
+                name='view-counters', daemon=True)
+            self._timer.start()
+
+    def _run_timer(self, interval):
+        while True:
+            self._wakeup.wait(interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def record(self, post_id, flush=True):
+        """
+        Учитывает просмотр поста. Полный осколок будит фоновый поток,
+        а без него (BLOG_VIEW_FLUSH_INTERVAL = None) записывается сразу,
+        если flush (в асинхронном коде обращаться к базе нельзя).
+        """
+        shard = self._shard()
+        with shard.lock:
+            shard.counts[post_id] += 1
+            shard.pending += 1
+            full = shard.pending >= self.threshold
+        if full:
+            if self._timer is not None:
+                self._wakeup.set()
+            elif flush:
+                self.flush()
+
+    def drain(self):
+        """Забирает накопленные просмотры из всех осколков."""
+        totals = Counter()
+        with self._guard:
+            totals.update(self._returned)
+            self._returned.clear()
+            alive = []
+            for shard in self._shards:
+                with shard.lock:
+                    totals.update(shard.counts)
+                    shard.counts = Counter()
+                    shard.pending = 0
+                # Осколки завершившихся потоков больше не пополнятся.
+                if shard.thread.is_alive():
+                    alive.append(shard)
+            self._shards = alive
+        return totals
+
+    def flush(self):
+        """Записывает накопленные просмотры. Возвращает число постов."""
+        with self._flush_lock:
+            totals = self.drain()
+            if not totals:
+                return 0
+            try:
+                run_write(write_counts, totals)
+            except DatabaseError:
+                logger.exception('Не удалось записать счётчики просмотров')
+                with self._guard:
+                    self._returned.update(totals)
+                return 0
+        # Карточки постов показывают число просмотров. Версию контента
+        # сайта не меняем: страницы обновятся по таймауту кэша.
+        bump_versions('post', totals)
+        return len(totals)
+
+
+view_counts = ViewCounterBuffer()
+atexit.register(view_counts.flush)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=view_counts.reset)
+
+
+def count_views(view):
+    """
+    Учитывает просмотр страницы поста (kwargs['post_id']).
+    Ставится снаружи кэша страниц, поэтому считаются и ответы из кэша,
+    в том числе 304.
+    """
+    def record(request, response, post_id, flush=True):
+        if request.method == 'GET' and response.status_code in (200, 304):
+            view_counts.record(post_id, flush)
+
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            response = await view(request, *args, **kwargs)
+            record(request, response, kwargs['post_id'], flush=False)
+            return response
+
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        response = view(request, *args, **kwargs)
+        record(request, response, kwargs['post_id'])
+        return response
+
+    return wrapper
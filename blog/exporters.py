@@ -0,0 +1,137 @@
+"""
+Потоковая выгрузка постов в NDJSON и CSV.
+
+Строки читаются из базы пачками через iterator(chunk_size=...)
+и сразу превращаются в текст, поэтому расход памяти
+не зависит от размера таблицы.
+
+Инкрементальная выгрузка по updated_at отдаёт все изменённые посты,
+в том числе скрытые (is_visible = false, без содержимого), и отметки
+об удалённых постах (deleted = true), чтобы потребитель мог убрать
+свою копию.
+"""
+
+import csv
+import heapq
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .constants import ExportLimits
+from .models import Post, PostTombstone
+
+EXPORT_FIELDS = {
+    'id': 'id',
+    'title': 'title',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated_at': 'updated_at',
+    'author': 'author__username',
+    'category': 'category__slug',
+    'location': 'location__name',
+    'is_published': 'is_published',
+    'is_visible': 'is_visible',
+}
+"""Имя поля в выгрузке -> путь к значению в модели Post."""
+
+COLUMNS = [*EXPORT_FIELDS, 'deleted']
+"""Столбцы выгрузки: поля поста и признак удалённого поста."""
+
+HIDDEN_FIELDS = ('title', 'text', 'author', 'category', 'location')
+"""Поля, которые не выгружаются у постов, не видимых в ленте."""
+
+SINCE_FIELDS = ('updated_at', 'pub_date')
+"""Поля, по которым возможна инкрементальная выгрузка."""
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def export_rows(queryset, since=None, since_field='updated_at',
+                chunk_size=ExportLimits.CHUNK_SIZE, hide_invisible=True):
+    """
+    Кортежи значений COLUMNS в порядке (since_field, id).
+    При заданном since отдаются только строки с since_field > since.
+    При hide_invisible поля HIDDEN_FIELDS невидимых постов пустые.
+    """
+    if since is not None:
+        queryset = queryset.filter(**{f'{since_field}__gt': since})
+    rows = (
+        queryset
+        .select_related(None)
+        .order_by(since_field, 'id')
+        .values_list(*EXPORT_FIELDS.values())
+        .iterator(chunk_size=chunk_size)
+    )
+    for row in rows:
+        values = dict(zip(EXPORT_FIELDS, row))
+        if hide_invisible and not values['is_visible']:
+            values.update(dict.fromkeys(HIDDEN_FIELDS))
+        yield (*values.values(), False)
+
+
+def tombstone_rows(since, chunk_size=ExportLimits.CHUNK_SIZE):
+    """Строки удалённых после since постов: id, время удаления и deleted."""
+    tombstones = (
+        PostTombstone.objects
+        .filter(deleted_at__gt=since)
+        .order_by('deleted_at', 'post_id')
+        .values_list('post_id', 'deleted_at')
+        .iterator(chunk_size=chunk_size)
+    )
+    for post_id, deleted_at in tombstones:
+        values = dict.fromkeys(COLUMNS)
+        values.update(
+            id=post_id, updated_at=deleted_at,
+            is_published=False, is_visible=False, deleted=True)
+        yield tuple(values.values())
+
+
+def changed_rows(since, chunk_size=ExportLimits.CHUNK_SIZE,
+                 hide_invisible=True):
+    """
+    Всё, что изменилось после since: посты любой видимости
+    и удалённые посты, вместе в порядке (updated_at, id).
+    """
+    position = COLUMNS.index('updated_at')
+    return heapq.merge(
+        export_rows(Post.objects.all(), since, 'updated_at', chunk_size,
+                    hide_invisible),
+        tombstone_rows(since, chunk_size),
+        key=lambda row: (row[position], row[0]),
+    )
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(
+            dict(zip(COLUMNS, row)),
+            cls=DjangoJSONEncoder,
+            ensure_ascii=False,
+        ) + '\n'
+
+
+class _Echo:
+    """Псевдофайл для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow([
+            value.isoformat() if hasattr(value, 'isoformat') else value
+            for value in row
+        ])
+
+
+def iter_export(rows, output_format):
+    """Итератор строк выгрузки в формате ndjson или csv."""
+    if output_format == 'csv':
+        return iter_csv(rows)
+    return iter_ndjson(rows)
@@ -36,6 +36,8 @@ class PostForm(forms.ModelForm):
 
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
+        # Дата до изменения: по ней переносится вес поста в рейтинге.
+        self.original_pub_date = self.instance.pub_date
         if self.instance and self.instance.pub_date:
             self.initial[
                 'pub_date'] = self.instance.pub_date.strftime('%Y-%m-%dT%H:%M')
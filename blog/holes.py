@@ -0,0 +1,103 @@
+"""
+Персональные части кэшируемых страниц («дыры»).
+
+Страница рендерится один раз для всех посетителей: вместо кнопок
+пользователя, ссылок автора и формы комментария с CSRF-токеном
+тег {% hole %} оставляет метку <!--hole:имя:аргументы-->.
+Перед отправкой fill_holes заменяет метки фрагментами,
+отрендеренными для текущего пользователя. Аргументы меток —
+только целые id, поэтому заполнение не обращается к базе.
+
+Вне кэшируемых страниц тег сразу рендерит фрагмент.
+"""
+
+import re
+
+from django.template.loader import render_to_string
+
+from .forms import CommentForm
+
+HOLE_RE = re.compile(rb'<!--hole:(\w+)((?::\d+)*)-->')
+
+renderers = {}
+
+
+def hole(name):
+    """Регистрирует функцию (request, *ids) -> HTML для дыры name."""
+    def decorator(func):
+        renderers[name] = func
+        return func
+
+    return decorator
+
+
+def marker(name, args):
+    return ''.join([f'<!--hole:{name}', *(f':{int(arg)}' for arg in args),
+                    '-->'])
+
+
+def render_hole(request, name, args):
+    if request is None:
+        return ''
+    return renderers[name](request, *map(int, args))
+
+
+def shared_render(request):
+    """Рендерится ли сейчас общая для всех посетителей страница."""
+    return getattr(request, 'shared_render', False)
+
+
+def fill_holes(request, content):
+    """Подставляет в байты страницы фрагменты для request.user."""
+    if b'<!--hole:' not in content:
+        return content
+
+    def replace(match):
+        name = match[1].decode()
+        args = match[2].decode().split(':')[1:]
+        return render_hole(request, name, args).encode()
+
+    return HOLE_RE.sub(replace, content)
+
+
+# =================================
+# Фрагменты.
+# =================================
+@hole('viewer_menu')
+def viewer_menu(request):
+    return render_to_string('includes/holes/viewer_menu.html', request=request)
+
+
+@hole('post_actions')
+def post_actions(request, post_id, author_id):
+    if request.user.pk != author_id:
+        return ''
+    return render_to_string(
+        'includes/holes/post_actions.html', {'post_id': post_id})
+
+
+@hole('comment_form')
+def comment_form(request, post_id):
+    if not request.user.is_authenticated:
+        return ''
+    return render_to_string('includes/holes/comment_form.html', {
+        'post_id': post_id,
+        'form': CommentForm(),
+    }, request=request)
+
+
+@hole('comment_actions')
+def comment_actions(request, post_id, comment_id, author_id):
+    if request.user.pk != author_id:
+        return ''
+    return render_to_string('includes/holes/comment_actions.html', {
+        'post_id': post_id,
+        'comment_id': comment_id,
+    })
+
+
+@hole('profile_actions')
+def profile_actions(request, profile_id):
+    if request.user.pk != profile_id:
+        return ''
+    return render_to_string('includes/holes/profile_actions.html')
@@ -0,0 +1,117 @@
+"""
+Уменьшенные варианты изображений постов.
+
+Для Post.image создаются копии нескольких ширин в WebP и JPEG.
+Их имена, а также размеры оригинала сохраняются в посте и используются
+в шаблонах для srcset и атрибутов width/height.
+"""
+
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .cache import SITE_CONTENT, bump_version
+from .constants import ImageVariants
+from .models import Post
+
+PIL_FORMATS = {'webp': 'WEBP', 'jpeg': 'JPEG'}
+
+
+def needs_processing(post):
+    """Есть изображение, для которого ещё не созданы варианты."""
+    return bool(post.image) and (
+        post.image_variants.get('source') != post.image.name)
+
+
+def variant_name(source_name, width, image_format):
+    stem = PurePosixPath(source_name).stem
+    return f'{ImageVariants.DIRECTORY}/{stem}-{width}w.{image_format}'
+
+
+def delete_variants(storage, variants):
+    # Файлы контентно-адресуемого хранилища могут быть общими.
+    if getattr(storage, 'content_addressed', False):
+        return
+    for variant in variants.get('variants', []):
+        storage.delete(variant['name'])
+
+
+def render_variants(original):
+    """
+    Уменьшает изображение до ширин из ImageVariants.WIDTHS,
+    которые меньше исходной, и до исходной ширины.
+    Возвращает список (ширина, высота, формат, байты).
+    """
+    image = ImageOps.exif_transpose(original).convert('RGB')
+    widths = [width for width in ImageVariants.WIDTHS if width < image.width]
+    widths.append(image.width)
+    rendered = []
+    for width in widths:
+        height = round(image.height * width / image.width)
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        for image_format, pil_format in PIL_FORMATS.items():
+            buffer = BytesIO()
+            resized.save(
+                buffer, pil_format,
+                quality=ImageVariants.QUALITY, optimize=True)
+            rendered.append((width, height, image_format, buffer.getvalue()))
+    return rendered
+
+
+def process_post_image(post_id, force=False):
+    """
+    Создаёт варианты изображения поста и сохраняет их описание.
+    Возвращает True, если варианты были созданы.
+    """
+    post = Post.objects.filter(pk=post_id).only(
+        'image', 'image_variants').first()
+    if post is None or not post.image:
+        return False
+    if not force and not needs_processing(post):
+        return False
+
+    storage = post.image.storage
+    source = post.image.name
+    with storage.open(source, 'rb') as file:
+        with Image.open(file) as original:
+            original.load()
+            width, height = ImageOps.exif_transpose(original).size
+            rendered = render_variants(original)
+
+    delete_variants(storage, post.image_variants)
+    variants = []
+    for variant_width, variant_height, image_format, content in rendered:
+        name = variant_name(source, variant_width, image_format)
+        if not getattr(storage, 'content_addressed', False):
+            storage.delete(name)
+        variants.append({
+            'name': storage.save(name, ContentFile(content)),
+            'width': variant_width,
+            'height': variant_height,
+            'format': image_format,
+        })
+    # update() вместо save(): не запускаем сигналы сохранения поста.
+    updated = Post.objects.filter(pk=post_id, image=source).update(
+        image_width=width,
+        image_height=height,
+        image_variants={'source': source, 'variants': variants},
+    )
+    if not updated:
+        # Изображение успели заменить, пока строились варианты.
+        delete_variants(storage, {'variants': variants})
+        return False
+    bump_version('post', post_id)
+    bump_version(*SITE_CONTENT)
+    return True
+
+
+def srcset(post, image_format):
+    """Значение атрибута srcset для вариантов заданного формата."""
+    storage = post.image.storage
+    return ', '.join(
+        f"{storage.url(variant['name'])} {variant['width']}w"
+        for variant in post.image_variants.get('variants', [])
+        if variant['format'] == image_format
+    )
@@ -0,0 +1,101 @@
+"""
+Материализованные списки постов категорий и авторов.
+
+Для каждого видимого поста PostListing хранит строки
+(категория, дата публикации, id) и (автор, дата публикации, id).
+Страница категории или автора — проход по диапазону индекса узкой
+таблицы и выборка самих постов по первичному ключу, без соединений
+с категориями и пользователями.
+
+Строки пересчитываются при сохранении поста и по сигналу
+visibility_changed (планировщик публикаций, изменение категории),
+удаление поста удаляет их каскадом. Посты, созданные в обход
+Post.save(), учитывает команда rebuild_listings.
+"""
+
+from itertools import islice
+
+from django.db import transaction
+
+from .constants import Listings
+from .models import Post, PostListing
+
+LISTING_FIELDS = ('pub_date', 'post_id')
+"""Ключ сортировки списков для CursorPaginator."""
+
+
+def listing_rows(posts):
+    """Строки списков для видимых постов."""
+    for post in posts:
+        if not post.is_visible:
+            continue
+        if post.category_id is not None:
+            yield PostListing(
+                kind=PostListing.Kind.CATEGORY, owner_id=post.category_id,
+                pub_date=post.pub_date, post_id=post.pk)
+        yield PostListing(
+            kind=PostListing.Kind.AUTHOR, owner_id=post.author_id,
+            pub_date=post.pub_date, post_id=post.pk)
+
+
+def sync_post(post, created=False):
+    """Приводит строки списков в соответствие с сохранённым постом."""
+    with transaction.atomic(savepoint=False):
+        if not created:
+            PostListing.objects.filter(post_id=post.pk).delete()
+        PostListing.objects.bulk_create(listing_rows([post]))
+
+
+def sync_listings(post_ids):
+    """Пересчитывает строки списков для постов с указанными id."""
+    post_ids = list(post_ids)
+    posts = Post.objects.filter(pk__in=post_ids, is_visible=True).only(
+        'pub_date', 'author_id', 'category_id', 'is_visible')
+    with transaction.atomic():
+        PostListing.objects.filter(post_id__in=post_ids).delete()
+        PostListing.objects.bulk_create(
+            listing_rows(posts), batch_size=Listings.BATCH_SIZE)
+
+
+def rebuild_listings(batch_size=Listings.BATCH_SIZE):
+    """Заново строит все списки. Возвращает число строк."""
+    posts = Post.objects.filter(is_visible=True).only(
+        'pub_date', 'author_id', 'category_id', 'is_visible')
+    rows = listing_rows(posts.iterator(chunk_size=batch_size))
+    created = 0
+    with transaction.atomic():
+        PostListing.objects.all().delete()
+        while batch := list(islice(rows, batch_size)):
+            PostListing.objects.bulk_create(batch)
+            created += len(batch)
+    return created
+
+
+def listing(kind, owner_id):
+    """Строки списка в порядке от новых постов к старым."""
+    return (
+        PostListing.objects
+        .filter(kind=kind, owner_id=owner_id)
+        .only('pub_date', 'post')
+        .order_by('-pub_date', '-post_id')
+    )
+
+
+def attach_posts(page):
+    """
+    Заменяет строки списка на странице постами (с автором, категорией
+    и местоположением). Посты, скрытые после построения страницы,
+    пропускаются.
+    """
+    ids = [row.post_id for row in page.object_list]
+    posts = Post.published.in_bulk(ids)
+    page.object_list = [posts[pk] for pk in ids if pk in posts]
+    return page
+
+
+async def aattach_posts(page):
+    """Асинхронный вариант attach_posts."""
+    ids = [row.post_id for row in page.object_list]
+    posts = await Post.published.ain_bulk(ids)
+    page.object_list = [posts[pk] for pk in ids if pk in posts]
+    return page
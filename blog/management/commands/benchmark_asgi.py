@@ -0,0 +1,182 @@
+import asyncio
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.benchmark import percentiles
+from blog.constants import Benchmarks
+
+SERVERS = ('wsgi', 'asgi')
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def server_command(kind, port):
+    """Команда запуска сервера и значение BLOG_ASYNC_VIEWS для него."""
+    if kind == 'wsgi':
+        return [
+            sys.executable, os.fspath(settings.BASE_DIR / 'manage.py'),
+            'runserver', '--noreload', f'127.0.0.1:{port}',
+        ], '0'
+    return [
+        sys.executable, '-m', 'uvicorn', 'blogicum.asgi:application',
+        '--host', '127.0.0.1', '--port', str(port),
+        '--log-level', 'warning', '--no-access-log',
+    ], '1'
+
+
+async def request(port, path, trickle=0.0):
+    """
+    Один GET-запрос на новом соединении, мс. При trickle > 0
+    заголовки отправляются по строке с такой паузой — медленный клиент.
+    """
+    started = time.perf_counter()
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    try:
+        lines = [
+            f'GET {path} HTTP/1.1\r\n',
+            f'Host: 127.0.0.1:{port}\r\n',
+            'User-Agent: benchmark_asgi\r\n',
+            'Accept-Encoding: identity\r\n',
+            'Connection: close\r\n',
+            '\r\n',
+        ]
+        for line in lines:
+            writer.write(line.encode())
+            await writer.drain()
+            if trickle:
+                await asyncio.sleep(trickle)
+        status = await reader.readline()
+        await reader.read()
+    finally:
+        writer.close()
+    if b' 200 ' not in status:
+        raise ValueError(f'{path}: {status.decode().strip() or "нет ответа"}')
+    return (time.perf_counter() - started) * 1000
+
+
+async def load(port, paths, clients, requests, slow_clients, trickle):
+    """
+    clients быстрых клиентов делят requests запросов; одновременно
+    slow_clients медленных держат соединения, пока идёт замер.
+    """
+    latencies = []
+    errors = []
+    queue = asyncio.Queue()
+    for number in range(requests):
+        queue.put_nowait(paths[number % len(paths)])
+    done = asyncio.Event()
+
+    async def fast():
+        while not queue.empty():
+            path = queue.get_nowait()
+            try:
+                latencies.append(await request(port, path))
+            except (OSError, ValueError) as error:
+                errors.append(str(error))
+
+    async def slow():
+        while not done.is_set():
+            try:
+                await request(port, paths[0], trickle)
+            except (OSError, ValueError):
+                pass
+
+    slow_tasks = [asyncio.create_task(slow()) for _ in range(slow_clients)]
+    started = time.perf_counter()
+    await asyncio.gather(*(fast() for _ in range(clients)))
+    elapsed = time.perf_counter() - started
+    done.set()
+    for task in slow_tasks:
+        task.cancel()
+    await asyncio.gather(*slow_tasks, return_exceptions=True)
+    return latencies, errors, elapsed
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность и хвост задержек публичных '
+        'страниц под WSGI (runserver, синхронные представления) и ASGI '
+        '(uvicorn, асинхронные представления) при большом числе '
+        'одновременных и медленных клиентов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--server', action='append', choices=SERVERS,
+            help='Какие серверы замерять (по умолчанию оба).'
+        )
+        parser.add_argument(
+            '--url', action='append', dest='paths',
+            help='Путь страницы; можно указать несколько раз '
+                 '(по умолчанию главная).'
+        )
+        parser.add_argument('--clients', type=int, default=64)
+        parser.add_argument(
+            '--requests', type=int, default=Benchmarks.REQUESTS * 5
+        )
+        parser.add_argument(
+            '--slow-clients', type=int, default=64,
+            help='Клиентов, медленно передающих заголовки.'
+        )
+        parser.add_argument(
+            '--trickle', type=float, default=0.5,
+            help='Пауза медленного клиента между строками заголовков, сек.'
+        )
+
+    def handle(self, *args, server, paths, clients, requests,
+               slow_clients, trickle, **options):
+        servers = server or SERVERS
+        if ('asgi' in servers
+                and importlib.util.find_spec('uvicorn') is None):
+            raise CommandError('Для замера ASGI нужен uvicorn.')
+        paths = paths or ['/']
+
+        self.stdout.write(
+            f'{"сервер":8}{"запросов/с":>12}{"ошибок":>8}'
+            f'{"p50":>10}{"p95":>10}{"p99":>10}')
+        for kind in servers:
+            port = free_port()
+            command, async_views = server_command(kind, port)
+            process = subprocess.Popen(
+                command, cwd=settings.BASE_DIR,
+                env={**os.environ, 'BLOG_ASYNC_VIEWS': async_views},
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            try:
+                self.wait_ready(process, port)
+                # Прогрев: соединения с базой, шаблоны, кэш страниц.
+                asyncio.run(load(port, paths, len(paths), len(paths), 0, 0))
+                latencies, errors, elapsed = asyncio.run(load(
+                    port, paths, clients, requests, slow_clients, trickle))
+            finally:
+                process.terminate()
+                process.wait(Benchmarks.TIMEOUT)
+            if not latencies:
+                raise CommandError(
+                    f'{kind}: нет успешных ответов. {errors[:1]}')
+            cuts = percentiles(latencies)
+            self.stdout.write(
+                f'{kind:8}{len(latencies) / elapsed:>12.1f}{len(errors):>8}'
+                f'{cuts["p50"]:>10}{cuts["p95"]:>10}{cuts["p99"]:>10}')
+
+    def wait_ready(self, process, port):
+        deadline = time.monotonic() + Benchmarks.TIMEOUT
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                raise CommandError('Сервер завершился при запуске.')
+            try:
+                socket.create_connection(('127.0.0.1', port), 0.2).close()
+                return
+            except OSError:
+                time.sleep(0.1)
+        raise CommandError('Сервер не запустился.')
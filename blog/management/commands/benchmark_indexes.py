@@ -0,0 +1,114 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from blog.models import Category, Comment, Post
+from blog.seeding import seed_posts
+
+
+class Rollback(Exception):
+    """Откатывает транзакцию с удалёнными индексами."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Снимает планы запросов и время выполнения для ленты, категорий, '
+        'профилей и комментариев с индексами Meta.indexes и без них.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Сколько постов сгенерировать перед замером '
+                 '(например, 1000000).'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Количество повторов каждого запроса.'
+        )
+        parser.add_argument(
+            '--output', help='Путь к JSON-файлу с отчётом.'
+        )
+
+    def get_queries(self):
+        """Запросы, которые выполняют публичные страницы блога."""
+        post = Post.objects.order_by('-comment_count').first()
+        category = Category.objects.filter(is_published=True).first()
+        middle = Post.published.order_by('-pub_date')[5000:5001].first()
+        queries = {
+            'feed': Post.published.order_by('-pub_date', '-id')[:10],
+        }
+        if middle is not None:
+            queries['feed_keyset'] = (
+                Post.published
+                .filter(pub_date__lt=middle.pub_date)
+                .order_by('-pub_date', '-id')[:10]
+            )
+        if category is not None:
+            queries['category'] = (
+                Post.published.filter(category=category)
+                .order_by('-pub_date', '-id')[:10]
+            )
+        if post is not None:
+            queries['author'] = (
+                Post.objects.filter(author_id=post.author_id)
+                .order_by('-pub_date')[:10]
+            )
+            queries['comments'] = Comment.objects.filter(post=post)
+        return queries
+
+    def measure(self, queries, repeat):
+        report = {}
+        for name, queryset in queries.items():
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.all())
+                timings.append((time.perf_counter() - started) * 1000)
+            report[name] = {
+                'plan': queryset.explain(),
+                'median_ms': round(statistics.median(timings), 3),
+                'max_ms': round(max(timings), 3),
+            }
+        return report
+
+    def measure_without_indexes(self, queries, repeat):
+        """
+        Удаляет индексы из Meta.indexes внутри транзакции,
+        делает замер и откатывает изменения.
+        """
+        report = {}
+        try:
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    for model in (Post, Comment):
+                        for index in model._meta.indexes:
+                            cursor.execute('DROP INDEX %s' % (
+                                connection.ops.quote_name(index.name)))
+                report = self.measure(queries, repeat)
+                raise Rollback
+        except Rollback:
+            pass
+        return report
+
+    def handle(self, *args, seed, repeat, output, **options):
+        if seed:
+            self.stdout.write(f'Генерация {seed} постов...')
+            seed_posts(seed)
+        queries = self.get_queries()
+        report = {
+            'posts': Post.objects.count(),
+            'vendor': connection.vendor,
+            'before': self.measure_without_indexes(queries, repeat),
+            'after': self.measure(queries, repeat),
+        }
+        for name in queries:
+            before = report['before'][name]['median_ms']
+            after = report['after'][name]['median_ms']
+            self.stdout.write(f'{name:12} {before:10.3f} ms -> {after:.3f} ms')
+        if output:
+            with open(output, 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
@@ -0,0 +1,144 @@
+import json
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.benchmark import (
+    LiveServer,
+    benchmark_database,
+    build_routes,
+    check_budgets,
+    load_test,
+    measure_routes,
+    record_budgets,
+    route_names,
+)
+from blog.constants import Benchmarks
+
+BUDGETS = settings.BASE_DIR / 'benchmarks' / 'budgets.json'
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет все маршруты блога и статических страниц: задержку '
+        '(p50/p95/p99), число SQL-запросов и память. Завершается с ошибкой, '
+        'если превышен бюджет из JSON-файла. Замер идёт на временной базе '
+        'с эталонными синтетическими данными.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--current-db', action='store_true',
+            help='Замерять текущую базу вместо временной с эталонными '
+                 'данными. Проверяются только бюджеты числа запросов.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=Benchmarks.REPEAT,
+            help='Запросов к каждому маршруту через тестовый клиент.'
+        )
+        parser.add_argument(
+            '--warm', action='store_true',
+            help='Не очищать кэши страниц между запросами.'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=Benchmarks.CONCURRENCY)
+        parser.add_argument(
+            '--requests', type=int, default=Benchmarks.REQUESTS,
+            help='HTTP-запросов к каждому маршруту под нагрузкой '
+                 '(0 — без нагрузочного прогона).'
+        )
+        parser.add_argument(
+            '--url',
+            help='Адрес запущенного сервера (только с --current-db: '
+                 'временную базу он не видит). По умолчанию поднимается '
+                 'встроенный многопоточный WSGI-сервер.'
+        )
+        parser.add_argument(
+            '--budgets', default=BUDGETS,
+            help='JSON-файл с бюджетами маршрутов.'
+        )
+        parser.add_argument(
+            '--record', action='store_true',
+            help='Записать бюджеты по текущему замеру вместо проверки.'
+        )
+        parser.add_argument('--output', help='Путь к JSON-файлу с отчётом.')
+
+    def handle(self, *args, **options):
+        if options['current_db'] and options['record']:
+            raise CommandError(
+                'Бюджеты записываются только на эталонных данных '
+                '(без --current-db).')
+        if options['url'] and not options['current_db']:
+            raise CommandError('--url работает только с --current-db.')
+        if options['current_db']:
+            report = self.measure(options)
+        else:
+            self.stdout.write('Генерация эталонных данных...')
+            with benchmark_database(Benchmarks.DATASET):
+                # bulk_create не вызывает сигналы индексации.
+                call_command('rebuild_search_index', stdout=self.stdout)
+                report = self.measure(options)
+
+        if options['output']:
+            self.dump(options['output'], report)
+        if options['record']:
+            self.dump(options['budgets'], record_budgets(report['client']))
+            self.stdout.write(self.style.SUCCESS(
+                f'Бюджеты записаны в {options["budgets"]}'))
+            return
+
+        with open(options['budgets'], encoding='utf-8') as file:
+            violations = check_budgets(
+                report['client'], json.load(file),
+                ('queries',) if options['current_db'] else None)
+        violations += [
+            f'{key}: {measured["errors"]} ошибок под нагрузкой'
+            for key, measured in report.get('load', {}).items()
+            if measured['errors']
+        ]
+        if violations:
+            raise CommandError(
+                'Превышены бюджеты:\n' + '\n'.join(violations))
+        self.stdout.write(self.style.SUCCESS('Бюджеты соблюдены.'))
+
+    def measure(self, options):
+        try:
+            routes = build_routes()
+        except LookupError as error:
+            raise CommandError(error)
+        missing = route_names() - {route.name for route in routes}
+        if missing:
+            raise CommandError(
+                'Маршруты без замера: ' + ', '.join(sorted(missing)))
+
+        report = {'client': measure_routes(
+            routes, options['repeat'], options['warm'])}
+        self.write_table(report['client'], ('status', 'queries', 'p50',
+                                            'p95', 'p99', 'peak_kb'))
+        if options['requests']:
+            if options['url']:
+                report['load'] = self.load(options['url'], routes, options)
+            else:
+                with LiveServer() as url:
+                    report['load'] = self.load(url, routes, options)
+            self.write_table(
+                report['load'], ('p50', 'p95', 'p99', 'rps', 'errors'))
+        return report
+
+    def load(self, url, routes, options):
+        return load_test(
+            url.rstrip('/'), routes,
+            options['concurrency'], options['requests'])
+
+    def write_table(self, report, columns):
+        self.stdout.write(
+            f'{"маршрут":32}' + ''.join(f'{column:>10}' for column in columns))
+        for key, measured in report.items():
+            self.stdout.write(f'{key:32}' + ''.join(
+                f'{measured[column]:>10}' for column in columns))
+
+    def dump(self, path, data):
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump(data, file, ensure_ascii=False, indent=2)
+            file.write('\n')
@@ -0,0 +1,176 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db import transaction
+from django.db.models import F
+
+from blog.benchmark import percentiles
+from blog.models import Comment, Post
+from blog.writes import run_write
+
+PROFILES = {
+    # Настройки SQLite по умолчанию: журнал отката, BEGIN DEFERRED.
+    'baseline': {
+        'journal_mode': 'DELETE',
+        'options': {'timeout': 5},
+        'serialized': False,
+    },
+    # Профиль из settings.DATABASES с сериализацией записи.
+    'tuned': {
+        'journal_mode': 'WAL',
+        'options': settings.DATABASES[DEFAULT_DB_ALIAS].get('OPTIONS', {}),
+        'serialized': True,
+    },
+}
+
+
+def add_comment(alias, post_id, user_id):
+    """Как AddCommentView: чтение поста, комментарий и счётчик."""
+    post = Post.objects.using(alias).only('pk').get(pk=post_id)
+    # bulk_create не вызывает сигналы, которые пишут в основную базу.
+    Comment.objects.using(alias).bulk_create([
+        Comment(post=post, author_id=user_id, text='Нагрузочный комментарий')
+    ])
+    Post.objects.using(alias).filter(pk=post_id).update(
+        comment_count=F('comment_count') + 1)
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность параллельной записи '
+        'комментариев в SQLite с настройками по умолчанию и с профилем '
+        'проекта (WAL, прагмы, BEGIN IMMEDIATE, повторы). '
+        'Замер идёт на копиях основной базы.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', type=int, default=8)
+        parser.add_argument(
+            '--writes', type=int, default=200,
+            help='Комментариев на один поток записи.'
+        )
+        parser.add_argument(
+            '--readers', type=int, default=4,
+            help='Потоков, параллельно читающих ленту.'
+        )
+        parser.add_argument(
+            '--profile', action='append', choices=PROFILES,
+            help='Какие профили замерять (по умолчанию все).'
+        )
+
+    def handle(self, *args, writers, writes, readers, profile, **options):
+        source = settings.DATABASES[DEFAULT_DB_ALIAS]
+        if source['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('Замер рассчитан на SQLite.')
+        post_ids = list(
+            Post.objects.filter(is_visible=True)
+            .values_list('pk', flat=True)[:100])
+        user_id = Post.objects.values_list('author_id', flat=True).first()
+        if not post_ids:
+            raise CommandError('Нет постов: сгенерируйте данные (seed_blog).')
+
+        self.stdout.write(
+            f'{"профиль":10}{"записей/с":>12}{"ошибок":>8}'
+            f'{"p50":>10}{"p95":>10}{"p99":>10}{"чтений/с":>12}')
+        for name in profile or PROFILES:
+            with tempfile.TemporaryDirectory() as directory:
+                path = os.path.join(directory, 'benchmark.sqlite3')
+                self.copy_database(source['NAME'], path,
+                                   PROFILES[name]['journal_mode'])
+                alias = f'benchmark_{name}'
+                self.register(alias, path, PROFILES[name]['options'])
+                try:
+                    result = self.measure(
+                        alias, PROFILES[name]['serialized'], post_ids,
+                        user_id, writers, writes, readers)
+                finally:
+                    connections[alias].close()
+                    del connections.settings[alias]
+            self.stdout.write(
+                f'{name:10}{result["writes_per_second"]:>12}'
+                f'{result["errors"]:>8}{result["p50"]:>10}'
+                f'{result["p95"]:>10}{result["p99"]:>10}'
+                f'{result["reads_per_second"]:>12}')
+
+    def copy_database(self, source, target, journal_mode):
+        """Копия через backup API: корректна и для базы в режиме WAL."""
+        with sqlite3.connect(source) as src, sqlite3.connect(target) as dst:
+            src.backup(dst)
+            dst.execute(f'PRAGMA journal_mode={journal_mode}')
+        dst.close()
+        src.close()
+
+    def register(self, alias, path, options):
+        databases = connections.configure_settings({
+            DEFAULT_DB_ALIAS: settings.DATABASES[DEFAULT_DB_ALIAS],
+            alias: {
+                'ENGINE': 'django.db.backends.sqlite3',
+                'NAME': path,
+                'OPTIONS': options,
+            },
+        })
+        connections.settings[alias] = databases[alias]
+
+    def measure(self, alias, serialized, post_ids, user_id,
+                writers, writes, readers):
+        latencies = []
+        errors = []
+        reads = []
+        done = threading.Event()
+
+        def write(number):
+            for index in range(writes):
+                post_id = post_ids[(number + index) % len(post_ids)]
+                started = time.perf_counter()
+                try:
+                    if serialized:
+                        run_write(add_comment, alias, post_id, user_id,
+                                  using=alias)
+                    else:
+                        with transaction.atomic(using=alias):
+                            add_comment(alias, post_id, user_id)
+                except OperationalError:
+                    errors.append(1)
+                    continue
+                latencies.append((time.perf_counter() - started) * 1000)
+            connections[alias].close()
+
+        def read():
+            count = 0
+            while not done.is_set():
+                list(
+                    Post.objects.using(alias).filter(is_visible=True)
+                    .order_by('-pub_date', '-id')[:10])
+                count += 1
+            reads.append(count)
+            connections[alias].close()
+
+        reader_threads = [
+            threading.Thread(target=read) for _ in range(readers)]
+        writer_threads = [
+            threading.Thread(target=write, args=(number,))
+            for number in range(writers)]
+        for thread in reader_threads:
+            thread.start()
+        started = time.perf_counter()
+        for thread in writer_threads:
+            thread.start()
+        for thread in writer_threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        done.set()
+        for thread in reader_threads:
+            thread.join()
+        return {
+            'writes_per_second': round(len(latencies) / elapsed, 1),
+            'errors': len(errors),
+            **(percentiles(latencies) if latencies
+               else dict.fromkeys(('p50', 'p95', 'p99'), '-')),
+            'reads_per_second': round(sum(reads) / elapsed, 1),
+        }
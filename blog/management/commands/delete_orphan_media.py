@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from blog.constants import MediaCleanup
+from blog.models import Post
+from blog.storage import content_digest
+
+
+def iter_files(storage, directory):
+    """Имена всех файлов каталога хранилища, включая вложенные."""
+    directories, files = storage.listdir(directory)
+    for file_name in files:
+        yield f'{directory}/{file_name}'
+    for name in directories:
+        yield from iter_files(storage, f'{directory}/{name}')
+
+
+class Command(BaseCommand):
+    help = (
+        'Удаляет файлы изображений, на которые не ссылается ни один пост: '
+        'при замене и удалении изображения контентно-адресуемое хранилище '
+        'файлы не удаляет, потому что они могут быть общими.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-period', type=int, default=MediaCleanup.GRACE_PERIOD,
+            help='Не удалять файлы моложе стольких секунд.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать файлы, которые будут удалены.'
+        )
+
+    def handle(self, *args, grace_period, dry_run, **options):
+        field = Post._meta.get_field('image')
+        storage = field.storage
+        directory = field.upload_to.rstrip('/')
+        if not storage.exists(directory):
+            self.stdout.write('Каталог изображений пуст.')
+            return
+
+        referenced = set()
+        for image, variants in (
+                Post.objects.exclude(image='')
+                .values_list('image', 'image_variants')
+                .iterator()):
+            referenced.add(image)
+            referenced.update(
+                variant['name'] for variant in variants.get('variants', []))
+
+        cutoff = now() - timedelta(seconds=grace_period)
+        deleted = 0
+        for name in iter_files(storage, directory):
+            if (not content_digest(name) or name in referenced
+                    or storage.get_modified_time(name) > cutoff):
+                continue
+            if dry_run:
+                self.stdout.write(name)
+            else:
+                storage.delete(name)
+            deleted += 1
+        verb = 'К удалению' if dry_run else 'Удалено'
+        self.stdout.write(self.style.SUCCESS(f'{verb} файлов: {deleted}.'))
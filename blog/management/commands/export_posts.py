@@ -0,0 +1,64 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from blog.constants import ExportLimits
+from blog.exporters import (
+    FORMATS, SINCE_FIELDS, changed_rows, export_rows, iter_export
+)
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Потоковая выгрузка постов в NDJSON или CSV.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format', dest='output_format', choices=list(FORMATS),
+            default='ndjson', help='Формат выгрузки.'
+        )
+        parser.add_argument(
+            '--since', help='Выгрузить только посты, изменённые '
+                            '(или опубликованные, см. --by) после даты ISO 8601.'
+        )
+        parser.add_argument(
+            '--by', choices=SINCE_FIELDS, default='updated_at',
+            help='Поле для --since.'
+        )
+        parser.add_argument(
+            '--all', dest='include_hidden', action='store_true',
+            help='Включить скрытые и отложенные посты с содержимым.'
+        )
+        parser.add_argument(
+            '--output', help='Файл для выгрузки; по умолчанию stdout.'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=ExportLimits.CHUNK_SIZE,
+            help='Количество строк, читаемых из базы за раз.'
+        )
+
+    def handle(self, *args, output_format, since, by, include_hidden,
+               output, chunk_size, **options):
+        if since is not None:
+            parsed = parse_datetime(since)
+            if parsed is None:
+                raise CommandError(f'Некорректная дата: {since}')
+            # Дата без смещения — в часовом поясе сайта.
+            since = (timezone.make_aware(parsed)
+                     if timezone.is_naive(parsed) else parsed)
+        if since is not None and by == 'updated_at':
+            # Изменения включают скрытые и удалённые посты.
+            rows = changed_rows(
+                since, chunk_size, hide_invisible=not include_hidden)
+        else:
+            queryset = (
+                Post.objects.all() if include_hidden
+                else Post.published.all())
+            rows = export_rows(queryset, since, by, chunk_size,
+                               hide_invisible=not include_hidden)
+        if output:
+            with open(output, 'w', encoding='utf-8', newline='') as file:
+                file.writelines(iter_export(rows, output_format))
+        else:
+            for chunk in iter_export(rows, output_format):
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from blog.constants import ImageVariants
+from blog.images import process_post_image
+from blog.models import Post
+
+
+def process(post_id, force):
+    try:
+        return process_post_image(post_id, force=force)
+    finally:
+        # У каждого потока своё соединение с базой.
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Создаёт уменьшенные копии изображений для уже загруженных постов. '
+        'Изображения обрабатываются параллельно в пуле потоков.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=ImageVariants.WORKERS,
+            help='Количество потоков.'
+        )
+        parser.add_argument(
+            '--force', action='store_true',
+            help='Пересоздать варианты и для уже обработанных постов.'
+        )
+
+    def handle(self, *args, workers, force, **options):
+        post_ids = list(
+            Post.objects.exclude(image='').exclude(image__isnull=True)
+            .values_list('pk', flat=True)
+        )
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(
+                process, post_ids, [force] * len(post_ids)))
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано изображений: {sum(results)} из {len(post_ids)}.'))
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from blog.constants import Scheduler
+from blog.publication import next_due_publication, publish_due_posts
+
+
+class Command(BaseCommand):
+    help = (
+        'Включает видимость отложенных постов, дата публикации которых '
+        'наступила. С --loop работает постоянно и просыпается '
+        'к ближайшей публикации.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Не завершаться после первого прохода.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=Scheduler.MAX_SLEEP,
+            help='Максимальная пауза между проходами, сек.'
+        )
+
+    def handle(self, *args, loop, interval, **options):
+        while True:
+            published = publish_due_posts()
+            if published:
+                self.stdout.write(
+                    f'Опубликовано постов: {len(published)}.')
+            if not loop:
+                break
+            due = next_due_publication()
+            pause = interval
+            if due is not None:
+                pause = min(interval, (due - now()).total_seconds())
+            time.sleep(max(pause, Scheduler.MIN_SLEEP))
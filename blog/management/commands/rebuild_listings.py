@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from blog.constants import Listings
+from blog.listings import rebuild_listings
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново строит материализованные списки постов категорий '
+        'и авторов по видимым постам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=Listings.BATCH_SIZE,
+            help='Размер пачки при чтении постов и записи строк.'
+        )
+
+    def handle(self, *args, batch_size, **options):
+        created = rebuild_listings(batch_size)
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки постов перестроены, строк: {created}.'))
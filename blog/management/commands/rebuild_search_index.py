@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.constants import SearchLimits
+from blog.models import Comment, Post
+from blog.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Полностью перестраивает поисковый индекс постов и комментариев.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int,
+            default=SearchLimits.REBUILD_BATCH_SIZE,
+            help='Размер пачки при чтении постов и комментариев.'
+        )
+
+    def handle(self, *args, batch_size, **options):
+        backend = get_backend()
+        backend.create_schema()
+        with transaction.atomic():
+            backend.clear()
+            backend.bulk_index(
+                Post.objects.only('title', 'text')
+                .iterator(chunk_size=batch_size),
+                Comment.objects.only('text', 'post_id', 'is_published')
+                .iterator(chunk_size=batch_size),
+            )
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен.'))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.constants import CommentCounters
+from blog.models import Post
+from blog.services import recount_comments
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает Post.comment_count по таблице комментариев '
+        'и исправляет разошедшиеся счётчики.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=CommentCounters.BATCH_SIZE,
+            help='Количество постов, обрабатываемых в одной транзакции.'
+        )
+
+    def handle(self, *args, batch_size, **options):
+        last_pk = 0
+        checked = fixed = 0
+        while True:
+            # Проход по первичному ключу без OFFSET.
+            post_ids = list(
+                Post.objects
+                .filter(pk__gt=last_pk)
+                .order_by('pk')
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            if not post_ids:
+                break
+            with transaction.atomic():
+                fixed += recount_comments(post_ids)
+            checked += len(post_ids)
+            last_pk = post_ids[-1]
+        self.stdout.write(self.style.SUCCESS(
+            f'Проверено постов: {checked}, исправлено: {fixed}.'))
@@ -0,0 +1,69 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from blog import tasks
+from blog.constants import TaskQueue
+
+
+def execute(claimed_task):
+    try:
+        return tasks.run(claimed_task)
+    finally:
+        # У каждого потока своё соединение с базой.
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Воркер фоновой очереди задач.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=TaskQueue.WORKERS,
+            help='Сколько задач выполнять одновременно.'
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить готовые задачи и завершиться.'
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=TaskQueue.POLL_INTERVAL,
+            help='Пауза при пустой очереди, сек.'
+        )
+        parser.add_argument(
+            '--keep-done', type=int, default=TaskQueue.KEEP_DONE,
+            help='Сколько секунд хранить выполненные задачи.'
+        )
+
+    def handle(self, *args, concurrency, once, poll_interval, keep_done,
+               **options):
+        done = failed = 0
+        running = set()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            while True:
+                tasks.requeue_stale()
+                free = concurrency - len(running)
+                claimed = tasks.claim(free) if free else []
+                running.update(
+                    pool.submit(execute, claimed_task)
+                    for claimed_task in claimed
+                )
+                if not running:
+                    # Очередь пуста: время убрать выполненные задачи.
+                    tasks.purge_done(keep_done)
+                    if once:
+                        break
+                    time.sleep(poll_interval)
+                    continue
+                finished, running = wait(
+                    running, timeout=poll_interval,
+                    return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if future.result():
+                        done += 1
+                    else:
+                        failed += 1
+        self.stdout.write(
+            f'Выполнено задач: {done}, с ошибкой: {failed}.')
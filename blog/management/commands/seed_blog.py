@@ -0,0 +1,69 @@
+import os
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from blog.constants import Seeding
+from blog.seeding import seed_dataset
+
+
+class Command(BaseCommand):
+    help = (
+        'Быстро наполняет базу синтетическими пользователями, постами '
+        'и комментариями через bulk_create. Результат воспроизводим '
+        'при том же --seed независимо от числа воркеров.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=100_000)
+        parser.add_argument('--comments', type=int, default=300_000)
+        parser.add_argument('--users', type=int, default=Seeding.USERS)
+        parser.add_argument(
+            '--categories', type=int, default=Seeding.CATEGORIES)
+        parser.add_argument(
+            '--locations', type=int, default=Seeding.LOCATIONS)
+        parser.add_argument(
+            '--batch-size', type=int, default=Seeding.BATCH_SIZE,
+            help='Строк в одной пачке и одной транзакции.'
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help='Процессов, генерирующих строки.'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора случайных чисел.'
+        )
+        parser.add_argument(
+            '--search-index', action='store_true',
+            help='Перестроить поисковый индекс после загрузки '
+                 '(bulk_create не вызывает сигналы индексации).'
+        )
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        created = seed_dataset(
+            users=options['users'],
+            categories=options['categories'],
+            locations=options['locations'],
+            posts=options['posts'],
+            comments=options['comments'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            workers=options['workers'],
+        )
+        elapsed = time.perf_counter() - started
+        rows = created['posts'] + created['comments']
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано постов: {created["posts"]}, '
+            f'комментариев: {created["comments"]} за {elapsed:.1f} с '
+            f'({rows / elapsed:.0f} строк/с).'
+        ))
+        # Сигналы не срабатывали, поэтому закэшированные страницы устарели.
+        caches[settings.BLOG_PAGE_CACHE].clear()
+        caches[settings.BLOG_FRAGMENT_CACHE].clear()
+        if options['search_index']:
+            call_command('rebuild_search_index', stdout=self.stdout)
@@ -0,0 +1,57 @@
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = (
+        'Копирует основную базу SQLite в реплики из BLOG_READ_REPLICAS '
+        'через backup API. Заменяет репликацию при локальной проверке.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', action='store_true',
+            help='Синхронизировать постоянно.'
+        )
+        parser.add_argument(
+            '--interval', type=float, default=5.0,
+            help='Пауза между синхронизациями в режиме --loop, сек. '
+                 'Должна быть меньше BLOG_REPLICA_STICKY_SECONDS.'
+        )
+
+    def handle(self, *args, loop, interval, **options):
+        databases = settings.DATABASES
+        if not settings.BLOG_READ_REPLICAS:
+            raise CommandError(
+                'Реплики не настроены (BLOG_REPLICA_DATABASES).')
+        for alias in (DEFAULT_DB_ALIAS, *settings.BLOG_READ_REPLICAS):
+            if databases[alias]['ENGINE'] != 'django.db.backends.sqlite3':
+                raise CommandError(f'{alias}: поддерживается только SQLite.')
+        while True:
+            started = time.perf_counter()
+            for alias in settings.BLOG_READ_REPLICAS:
+                self.copy(databases[DEFAULT_DB_ALIAS]['NAME'],
+                          databases[alias]['NAME'])
+            self.stdout.write(
+                f'Реплики обновлены за '
+                f'{(time.perf_counter() - started) * 1000:.0f} мс.')
+            if not loop:
+                break
+            time.sleep(interval)
+
+    def copy(self, source, target):
+        """
+        Согласованный снимок основной базы: backup API копирует
+        страницы под блокировкой чтения и не мешает писателям в WAL.
+        """
+        src = sqlite3.connect(source)
+        dst = sqlite3.connect(target)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.1 on 2026-10-16 23:51
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_comment_count(apps, schema_editor):
+    Post = apps.get_model("blog", "Post")
+    Comment = apps.get_model("blog", "Comment")
+    totals = (
+        Comment.objects.filter(post=OuterRef("pk"))
+        .order_by()
+        .values("post")
+        .annotate(total=Count("id"))
+        .values("total")
+    )
+    Post.objects.update(comment_count=Coalesce(Subquery(totals), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0013_alter_comment_author_alter_comment_post_and_more"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="comment_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Количество комментариев"
+            ),
+        ),
+        migrations.RunPython(fill_comment_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.1.1 on 2026-10-16 23:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0014_post_comment_count"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "created_at"], name="comment_post_created_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("is_published", True)),
+                fields=["-pub_date", "-id"],
+                name="post_feed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["is_published", "-pub_date"], name="post_published_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["category", "is_published", "-pub_date"],
+                name="post_category_date_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["author", "-pub_date"], name="post_author_date_idx"
+            ),
+        ),
+    ]
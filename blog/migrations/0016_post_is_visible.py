@@ -0,0 +1,69 @@
+# Generated by Django 5.1.1 on 2026-10-16 23:54
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils.timezone import now
+
+
+def fill_is_visible(apps, schema_editor):
+    Post = apps.get_model("blog", "Post")
+    Post.objects.filter(
+        is_published=True,
+        pub_date__lte=now(),
+        category__is_published=True,
+    ).update(is_visible=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0015_post_comment_indexes"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="post",
+            name="post_feed_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="post",
+            name="post_published_date_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="post",
+            name="post_category_date_idx",
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="is_visible",
+            field=models.BooleanField(
+                default=False,
+                editable=False,
+                help_text="Пост опубликован, его категория опубликована и дата публикации наступила.",
+                verbose_name="Виден в ленте",
+            ),
+        ),
+        migrations.RunPython(fill_is_visible, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("is_visible", True)),
+                fields=["-pub_date", "-id"],
+                name="post_feed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["is_visible", "-pub_date"], name="post_visible_date_idx"
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["category", "is_visible", "-pub_date"],
+                name="post_category_date_idx",
+            ),
+        ),
+    ]
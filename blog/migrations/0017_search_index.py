@@ -0,0 +1,39 @@
+# Generated by Django 5.1.1 on 2026-10-16 23:58
+
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS blog_search_index "
+        "USING fts5(title, body, post_id UNINDEXED, "
+        "tokenize='unicode61 remove_diacritics 2')"
+    )
+    schema_editor.execute(
+        "INSERT INTO blog_search_index (rowid, title, body, post_id) "
+        "SELECT 2 * id, title, text, id FROM blog_post"
+    )
+    schema_editor.execute(
+        "INSERT INTO blog_search_index (rowid, title, body, post_id) "
+        "SELECT 2 * id + 1, '', text, post_id FROM blog_comment "
+        "WHERE is_published"
+    )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    schema_editor.execute("DROP TABLE IF EXISTS blog_search_index")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0016_post_is_visible"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
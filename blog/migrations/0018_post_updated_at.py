@@ -0,0 +1,24 @@
+# Generated by Django 5.1.1 on 2026-10-16 23:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0017_search_index"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="updated_at",
+            field=models.DateTimeField(auto_now=True, verbose_name="Изменено"),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(fields=["updated_at", "id"], name="post_updated_idx"),
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.1 on 2026-10-16 23:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0018_post_updated_at"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="image_height",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Высота изображения"
+            ),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="image_variants",
+            field=models.JSONField(
+                blank=True,
+                default=dict,
+                editable=False,
+                verbose_name="Уменьшенные копии изображения",
+            ),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="image_width",
+            field=models.PositiveIntegerField(
+                blank=True, editable=False, null=True, verbose_name="Ширина изображения"
+            ),
+        ),
+    ]
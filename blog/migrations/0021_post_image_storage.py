@@ -0,0 +1,25 @@
+# Generated by Django 5.1.1 on 2026-10-17 00:02
+
+import blog.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0020_task"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="post",
+            name="image",
+            field=models.ImageField(
+                blank=True,
+                null=True,
+                storage=blog.storage.ContentAddressedStorage(),
+                upload_to="posts_images/",
+                verbose_name="Изображение",
+            ),
+        ),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.1.1 on 2026-10-17 00:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+CATEGORY, AUTHOR = 1, 2
+BATCH_SIZE = 5000
+
+
+def fill_listings(apps, schema_editor):
+    Post = apps.get_model("blog", "Post")
+    PostListing = apps.get_model("blog", "PostListing")
+    posts = (
+        Post.objects.filter(is_visible=True)
+        .values_list("pk", "pub_date", "author_id", "category_id")
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    rows = []
+    for pk, pub_date, author_id, category_id in posts:
+        if category_id is not None:
+            rows.append(
+                PostListing(
+                    kind=CATEGORY, owner_id=category_id, pub_date=pub_date, post_id=pk
+                )
+            )
+        rows.append(
+            PostListing(kind=AUTHOR, owner_id=author_id, pub_date=pub_date, post_id=pk)
+        )
+        if len(rows) >= BATCH_SIZE:
+            PostListing.objects.bulk_create(rows)
+            rows = []
+    PostListing.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0021_post_image_storage"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PostListing",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "kind",
+                    models.PositiveSmallIntegerField(
+                        choices=[(1, "Категория"), (2, "Автор")], verbose_name="Список"
+                    ),
+                ),
+                (
+                    "owner_id",
+                    models.PositiveIntegerField(verbose_name="id категории или автора"),
+                ),
+                (
+                    "pub_date",
+                    models.DateTimeField(verbose_name="Дата и время публикации"),
+                ),
+                (
+                    "post",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="listings",
+                        to="blog.post",
+                        verbose_name="Публикация",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "строка списка постов",
+                "verbose_name_plural": "Списки постов",
+                "indexes": [
+                    models.Index(
+                        fields=["kind", "owner_id", "-pub_date", "-post"],
+                        name="post_listing_page_idx",
+                    )
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("kind", "owner_id", "post"), name="post_listing_unique"
+                    )
+                ],
+            },
+        ),
+        migrations.RunPython(fill_listings, migrations.RunPython.noop),
+    ]
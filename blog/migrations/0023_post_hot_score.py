@@ -0,0 +1,72 @@
+# Generated by Django 5.1.1 on 2026-10-17 00:38
+
+import math
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import migrations, models
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+HALF_LIFE = 24 * 60 * 60
+BATCH_SIZE = 1000
+
+
+def activity(moment):
+    return (moment - EPOCH).total_seconds() / HALF_LIFE * math.log(2)
+
+
+def fill_hot_scores(apps, schema_editor):
+    Post = apps.get_model("blog", "Post")
+    Comment = apps.get_model("blog", "Comment")
+    last_pk = 0
+    while True:
+        posts = list(
+            Post.objects.filter(pk__gt=last_pk)
+            .order_by("pk")
+            .only("pub_date")[:BATCH_SIZE]
+        )
+        if not posts:
+            break
+        values = {post.pk: [activity(post.pub_date)] for post in posts}
+        comments = Comment.objects.filter(post_id__in=values).values_list(
+            "post_id", "created_at"
+        )
+        for post_id, created_at in comments:
+            values[post_id].append(activity(created_at))
+        for post in posts:
+            top = max(values[post.pk])
+            post.hot_score = top + math.log(
+                sum(math.exp(value - top) for value in values[post.pk])
+            )
+        Post.objects.bulk_update(posts, ["hot_score"])
+        last_pk = posts[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0022_post_listing"),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="hot_score",
+            field=models.FloatField(
+                default=0.0,
+                editable=False,
+                help_text="Логарифм затухающей суммы публикации и комментариев.",
+                verbose_name="Рейтинг популярности",
+            ),
+        ),
+        migrations.RunPython(fill_hot_scores, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("is_visible", True)),
+                fields=["-hot_score", "-id"],
+                name="post_hot_idx",
+            ),
+        ),
+    ]
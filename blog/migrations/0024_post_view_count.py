@@ -0,0 +1,20 @@
+# Generated by Django 5.1.1 on 2026-10-17 00:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0023_post_hot_score"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="view_count",
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name="Количество просмотров"
+            ),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.1.1 on 2026-10-17 01:04
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0024_post_view_count"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="PostTombstone",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("post_id", models.PositiveIntegerField(verbose_name="id публикации")),
+                (
+                    "deleted_at",
+                    models.DateTimeField(
+                        default=django.utils.timezone.now, verbose_name="Удалено"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "удалённая публикация",
+                "verbose_name_plural": "Удалённые публикации",
+                "indexes": [
+                    models.Index(
+                        fields=["deleted_at", "post_id"], name="post_tombstone_idx"
+                    )
+                ],
+            },
+        ),
+    ]
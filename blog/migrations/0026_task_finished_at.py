@@ -0,0 +1,35 @@
+# Generated by Django 5.1.1 on 2026-10-17 01:40
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def fill_finished_at(apps, schema_editor):
+    # Время завершения уже выполненных задач неизвестно: отсчитываем
+    # срок хранения от миграции, иначе они не удалятся никогда.
+    Task = apps.get_model("blog", "Task")
+    Task.objects.filter(status__in=["done", "failed"]).update(
+        finished_at=timezone.now()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("blog", "0025_post_tombstone"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="task",
+            name="finished_at",
+            field=models.DateTimeField(blank=True, null=True, verbose_name="Завершена"),
+        ),
+        migrations.AddIndex(
+            model_name="task",
+            index=models.Index(
+                fields=["status", "finished_at"], name="task_status_finished_idx"
+            ),
+        ),
+        migrations.RunPython(fill_finished_at, migrations.RunPython.noop),
+    ]
@@ -2,7 +2,9 @@ from django.contrib.auth import get_user_model
 from django.db import models
 from django.utils.timezone import now
 
-from .constants import Lengths
+from .constants import Lengths, TaskQueue
+from .ranking import activity
+from .storage import ContentAddressedStorage
 
 User = get_user_model()
 
@@ -49,15 +51,17 @@ class TruncatedStringMixin:
 
 
 class PublishedPostManager(models.Manager):
+    """
+    Видимые в ленте посты.
+    Поле is_visible поддерживается в актуальном состоянии
+    при сохранении и планировщиком отложенных публикаций.
+    """
+
     def get_queryset(self):
         return (
             super().get_queryset()
             .select_related('author', 'category', 'location')
-            .filter(
-                is_published=True,
-                pub_date__lte=now(),
-                category__is_published=True
-            )
+            .filter(is_visible=True)
         )
 
 
@@ -136,10 +140,56 @@ class Post(TruncatedStringMixin, AbstractPublishModel):
     )
     image = models.ImageField(
         upload_to='posts_images/',
+        storage=ContentAddressedStorage(),
         blank=True,
         null=True,
         verbose_name='Изображение'
     )
+    image_width = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Ширина изображения'
+    )
+    image_height = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='Высота изображения'
+    )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name='Уменьшенные копии изображения'
+    )
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество комментариев'
+    )
+    view_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Количество просмотров'
+    )
+    hot_score = models.FloatField(
+        default=0.0,
+        editable=False,
+        verbose_name='Рейтинг популярности',
+        help_text='Логарифм затухающей суммы публикации и комментариев.'
+    )
+    updated_at = models.DateTimeField(
+        auto_now=True,
+        verbose_name='Изменено'
+    )
+    is_visible = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name='Виден в ленте',
+        help_text=('Пост опубликован, его категория опубликована '
+                   'и дата публикации наступила.')
+    )
     objects = models.Manager()
     published = PublishedPostManager()
 
@@ -148,6 +198,57 @@ class Post(TruncatedStringMixin, AbstractPublishModel):
         verbose_name_plural = 'Публикации'
         ordering = ['-pub_date']
         default_related_name = 'posts'
+        indexes = [
+            # Лента: видимые посты в порядке (pub_date, id).
+            # Частичный индекс — на бэкендах, которые его поддерживают.
+            models.Index(
+                fields=['-pub_date', '-id'],
+                condition=models.Q(is_visible=True),
+                name='post_feed_idx',
+            ),
+            models.Index(
+                fields=['is_visible', '-pub_date'],
+                name='post_visible_date_idx',
+            ),
+            # Страница категории и профиль автора.
+            models.Index(
+                fields=['category', 'is_visible', '-pub_date'],
+                name='post_category_date_idx',
+            ),
+            models.Index(
+                fields=['author', '-pub_date'],
+                name='post_author_date_idx',
+            ),
+            # Популярные посты.
+            models.Index(
+                fields=['-hot_score', '-id'],
+                condition=models.Q(is_visible=True),
+                name='post_hot_idx',
+            ),
+            # Инкрементальная выгрузка.
+            models.Index(
+                fields=['updated_at', 'id'],
+                name='post_updated_idx',
+            ),
+        ]
+
+    def save(self, *args, **kwargs):
+        """
+        Пересчитывает is_visible на момент сохранения.
+        Новый пост получает рейтинг по дате публикации.
+        """
+        if self._state.adding:
+            self.hot_score = activity(self.pub_date)
+        self.is_visible = bool(
+            self.is_published
+            and self.pub_date <= now()
+            and self.category_id is not None
+            and self.category.is_published
+        )
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'is_visible'}
+        super().save(*args, **kwargs)
 
 
 class Comment(TruncatedStringMixin, AbstractPublishModel):
@@ -172,3 +273,155 @@ class Comment(TruncatedStringMixin, AbstractPublishModel):
         ordering = ['created_at']
         verbose_name = 'комментарий'
         verbose_name_plural = 'Комментарии'
+        indexes = [
+            models.Index(
+                fields=['post', 'created_at'],
+                name='comment_post_created_idx',
+            ),
+        ]
+
+
+class PostListing(models.Model):
+    """
+    Строка материализованного списка видимых постов категории
+    или автора (blog.listings). Хранит только ключ сортировки.
+    """
+
+    class Kind(models.IntegerChoices):
+        CATEGORY = 1, 'Категория'
+        AUTHOR = 2, 'Автор'
+
+    kind = models.PositiveSmallIntegerField(
+        choices=Kind.choices,
+        verbose_name='Список'
+    )
+    owner_id = models.PositiveIntegerField(
+        verbose_name='id категории или автора'
+    )
+    pub_date = models.DateTimeField(
+        verbose_name='Дата и время публикации'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='listings',
+        verbose_name='Публикация'
+    )
+
+    class Meta:
+        verbose_name = 'строка списка постов'
+        verbose_name_plural = 'Списки постов'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['kind', 'owner_id', 'post'],
+                name='post_listing_unique',
+            ),
+        ]
+        indexes = [
+            # Страница списка — проход по диапазону этого индекса.
+            models.Index(
+                fields=['kind', 'owner_id', '-pub_date', '-post'],
+                name='post_listing_page_idx',
+            ),
+        ]
+
+
+class PostTombstone(models.Model):
+    """
+    Отметка об удалённом посте для инкрементальной выгрузки:
+    потребитель, забирающий изменения с некоторого момента,
+    узнаёт из неё, что копию поста нужно удалить.
+    """
+
+    post_id = models.PositiveIntegerField(
+        verbose_name='id публикации'
+    )
+    deleted_at = models.DateTimeField(
+        default=now,
+        verbose_name='Удалено'
+    )
+
+    class Meta:
+        verbose_name = 'удалённая публикация'
+        verbose_name_plural = 'Удалённые публикации'
+        indexes = [
+            models.Index(
+                fields=['deleted_at', 'post_id'],
+                name='post_tombstone_idx',
+            ),
+        ]
+
+
+class Task(models.Model):
+    """Фоновая задача для воркера run_tasks."""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'В очереди'
+        RUNNING = 'running', 'Выполняется'
+        DONE = 'done', 'Выполнена'
+        FAILED = 'failed', 'Ошибка'
+
+    name = models.CharField(
+        max_length=TaskQueue.NAME_LENGTH,
+        verbose_name='Задача'
+    )
+    kwargs = models.JSONField(
+        default=dict,
+        blank=True,
+        verbose_name='Аргументы'
+    )
+    status = models.CharField(
+        max_length=16,
+        choices=Status.choices,
+        default=Status.PENDING,
+        verbose_name='Статус'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попыток'
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        default=TaskQueue.MAX_ATTEMPTS,
+        verbose_name='Максимум попыток'
+    )
+    run_after = models.DateTimeField(
+        default=now,
+        verbose_name='Не раньше'
+    )
+    locked_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Взята в работу'
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Завершена'
+    )
+    last_error = models.TextField(
+        blank=True,
+        verbose_name='Последняя ошибка'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Добавлено'
+    )
+
+    class Meta:
+        verbose_name = 'фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ['run_after']
+        indexes = [
+            models.Index(
+                fields=['status', 'run_after'],
+                name='task_status_run_after_idx',
+            ),
+            # Удаление выполненных задач.
+            models.Index(
+                fields=['status', 'finished_at'],
+                name='task_status_finished_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} #{self.pk}'
@@ -0,0 +1,242 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.paginator import EmptyPage, PageNotAnInteger, Paginator
+from django.db.models import Q
+
+from .constants import PostLimits
+
+
+class InvalidCursor(ValueError):
+    """Курсор не удалось разобрать."""
+
+
+def encode_cursor(values, reverse=False):
+    """Упаковывает значения ключа в непрозрачный токен для URL."""
+    payload = {
+        'v': [
+            value.isoformat() if isinstance(value, datetime) else value
+            for value in values
+        ],
+    }
+    if reverse:
+        payload['r'] = 1
+    raw = json.dumps(payload, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token, fields):
+    """
+    Распаковывает токен курсора.
+    fields — поля модели, составляющие ключ: каждое значение
+    приводится их to_python, поэтому в запрос попадают только
+    значения нужного типа.
+    Возвращает кортеж (значения ключа, флаг движения назад).
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        payload = json.loads(raw)
+        values = payload['v']
+        if not isinstance(values, list) or len(values) != len(fields):
+            raise InvalidCursor(token)
+        if any(value is None or isinstance(value, (list, dict))
+               for value in values):
+            raise InvalidCursor(token)
+        # Даты передаются строками ISO, числа — как есть.
+        values = [
+            field.to_python(value) for field, value in zip(fields, values)
+        ]
+        return values, bool(payload.get('r'))
+    except (binascii.Error, ValueError, KeyError, TypeError,
+            ValidationError) as error:
+        raise InvalidCursor(token) from error
+
+
+class CursorPage:
+    """
+    Страница курсорной пагинации.
+    Повторяет интерфейс django.core.paginator.Page в той мере,
+    в какой он нужен шаблонам.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator,
+                 next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Пагинатор по ключу (по умолчанию (pub_date, id)) без OFFSET и COUNT(*).
+    Страница выбирается условием «строго после курсора»,
+    поэтому стоимость запроса не зависит от глубины страницы.
+    Общее количество объектов считается только по запросу
+    и кэшируется, если передан count_cache_key.
+    fields задаёт другой ключ, например ('pub_date', 'post_id')
+    для материализованных списков или ('hot_score', 'id')
+    для популярных постов; поля — даты и числа.
+    """
+
+    fields = ('pub_date', 'id')
+
+    def __init__(self, queryset, per_page, count_cache_key=None,
+                 count_timeout=PostLimits.CURSOR_COUNT_TIMEOUT, fields=None):
+        if fields is not None:
+            self.fields = tuple(fields)
+        self.queryset = queryset
+        self.per_page = per_page
+        self.count_cache_key = count_cache_key
+        self.count_timeout = count_timeout
+        self._count = None
+
+    @property
+    def count(self):
+        """
+        Приблизительное общее количество объектов:
+        значение берётся из кэша и обновляется не чаще count_timeout.
+        """
+        if self.count_cache_key is None:
+            return None
+        if self._count is None:
+            self._count = cache.get_or_set(
+                self.count_cache_key, self.queryset.count, self.count_timeout)
+        return self._count
+
+    async def acount(self):
+        """Асинхронный вариант count для асинхронных представлений."""
+        if self.count_cache_key is None:
+            return None
+        if self._count is None:
+            count = await cache.aget(self.count_cache_key)
+            if count is None:
+                count = await self.queryset.acount()
+                await cache.aset(
+                    self.count_cache_key, count, self.count_timeout)
+            self._count = count
+        return self._count
+
+    def _order(self, reverse):
+        prefix = '' if reverse else '-'
+        return [prefix + field for field in self.fields]
+
+    def _after(self, values, reverse):
+        """Условие «строго после курсора» в заданном направлении."""
+        lookup = 'gt' if reverse else 'lt'
+        condition = Q()
+        for index, field in enumerate(self.fields):
+            step = Q(**{f'{field}__{lookup}': values[index]})
+            for previous, value in zip(self.fields[:index], values):
+                step &= Q(**{previous: value})
+            condition |= step
+        return condition
+
+    def _key(self, obj):
+        return [getattr(obj, field) for field in self.fields]
+
+    def _page_queryset(self, cursor):
+        """
+        Запрос страницы после курсора, значения ключа и направление.
+        Некорректный курсор трактуется как первая страница.
+        """
+        values, reverse = None, False
+        if cursor:
+            try:
+                values, reverse = decode_cursor(cursor, [
+                    self.queryset.model._meta.get_field(field)
+                    for field in self.fields
+                ])
+            except InvalidCursor:
+                values, reverse = None, False
+
+        queryset = self.queryset.order_by(*self._order(reverse))
+        if values is not None:
+            queryset = queryset.filter(self._after(values, reverse))
+        return queryset[:self.per_page + 1], values, reverse
+
+    def _build_page(self, rows, values, reverse):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if reverse:
+            rows.reverse()
+
+        next_cursor = previous_cursor = None
+        if rows:
+            if has_more or reverse:
+                next_cursor = encode_cursor(self._key(rows[-1]))
+            if values is not None and (has_more or not reverse):
+                previous_cursor = encode_cursor(
+                    self._key(rows[0]), reverse=True)
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+    def get_page(self, cursor=None):
+        """Возвращает страницу после курсора."""
+        queryset, values, reverse = self._page_queryset(cursor)
+        return self._build_page(list(queryset), values, reverse)
+
+    async def aget_page(self, cursor=None):
+        """
+        Асинхронный get_page. Общее количество считается заранее,
+        чтобы шаблон не обращался к базе синхронно.
+        """
+        queryset, values, reverse = self._page_queryset(cursor)
+        rows = [row async for row in queryset]
+        await self.acount()
+        return self._build_page(rows, values, reverse)
+
+
+class AsyncPaginator(Paginator):
+    """
+    Paginator для асинхронных представлений: количество объектов
+    считается заранее через acount(), страница читается async for.
+    """
+
+    def __init__(self, object_list, per_page, count):
+        super().__init__(object_list, per_page)
+        self._count = count
+
+    @classmethod
+    async def create(cls, queryset, per_page):
+        return cls(queryset, per_page, await queryset.acount())
+
+    @property
+    def count(self):
+        return self._count
+
+    async def aget_page(self, number):
+        """Асинхронный аналог Paginator.get_page."""
+        try:
+            number = self.validate_number(number)
+        except PageNotAnInteger:
+            number = 1
+        except EmptyPage:
+            number = self.num_pages
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        objects = [obj async for obj in self.object_list[bottom:top]]
+        return self._get_page(objects, number, self)
@@ -0,0 +1,91 @@
+"""
+Материализованная видимость постов.
+
+Post.is_visible хранит результат условия «опубликован, дата публикации
+наступила и категория опубликована». Поле пересчитывается при сохранении
+поста и категории, а отложенные публикации включает планировщик
+(команда publish_scheduled). Лента фильтрует по простому равенству.
+"""
+
+from django.db import transaction
+from django.db.models import Min, Q
+from django.dispatch import Signal
+from django.utils.timezone import now
+
+from .models import Category, Post
+from .writes import on_commit
+
+visibility_changed = Signal()
+"""Отправляется после коммита с аргументом post_ids."""
+
+
+def visible_condition(moment):
+    """Условие видимости поста на момент moment."""
+    return Q(
+        is_published=True,
+        pub_date__lte=moment,
+        category__in=Category.objects.filter(is_published=True),
+    )
+
+
+def refresh_visibility(queryset=None, moment=None):
+    """
+    Приводит is_visible в соответствие с условием видимости
+    для постов из queryset. Возвращает список изменённых id.
+    """
+    if queryset is None:
+        queryset = Post.objects.all()
+    moment = moment or now()
+    condition = visible_condition(moment)
+    with transaction.atomic():
+        shown = list(
+            queryset.filter(condition, is_visible=False)
+            .values_list('pk', flat=True))
+        hidden = list(
+            queryset.filter(is_visible=True).exclude(condition)
+            .values_list('pk', flat=True))
+        Post.objects.filter(pk__in=shown).update(
+            is_visible=True, updated_at=moment)
+        Post.objects.filter(pk__in=hidden).update(
+            is_visible=False, updated_at=moment)
+        changed = shown + hidden
+        if changed:
+            on_commit(lambda: visibility_changed.send(
+                sender=Post, post_ids=changed))
+    return changed
+
+
+def publish_due_posts(moment=None):
+    """Включает отложенные посты, дата публикации которых наступила."""
+    moment = moment or now()
+    return refresh_visibility(
+        Post.objects.filter(
+            is_visible=False, is_published=True, pub_date__lte=moment),
+        moment,
+    )
+
+
+def due_posts(moment):
+    """
+    Отложенные посты, которые станут видимыми сами, когда наступит
+    дата публикации: опубликованные и в опубликованной категории.
+    Посты скрытых категорий появятся только при публикации
+    категории — она меняет версию контента и так.
+    """
+    return Post.objects.filter(
+        is_visible=False,
+        is_published=True,
+        pub_date__gt=moment or now(),
+        category__is_published=True,
+    )
+
+
+def next_due_publication(moment=None):
+    """Дата ближайшей отложенной публикации или None."""
+    return due_posts(moment).aggregate(due=Min('pub_date'))['due']
+
+
+async def anext_due_publication(moment=None):
+    """Асинхронный вариант next_due_publication."""
+    due = await due_posts(moment).aaggregate(due=Min('pub_date'))
+    return due['due']
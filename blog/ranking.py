@@ -0,0 +1,84 @@
+"""
+Рейтинг «популярных» постов с затуханием по времени.
+
+Каждое событие поста — публикация и каждый комментарий — весит
+2 ** ((t - EPOCH) / HALF_LIFE): событие, случившееся на HALF_LIFE позже,
+весит вдвое больше. Сумма весов всех постов затухает одинаково,
+поэтому порядок постов со временем не меняется и пересчитывать
+рейтинг по часам не нужно — достаточно прибавлять вес нового события.
+
+Веса растут экспоненциально, поэтому Post.hot_score хранит натуральный
+логарифм суммы: добавление события — logaddexp, удаление —
+вычитание под логарифмом, перенос даты публикации — то и другое
+сразу. Каждое изменение — один UPDATE с F(), так же как сдвиг
+Post.comment_count.
+"""
+
+import math
+from datetime import datetime, timezone
+
+from django.db.models import Case, F, FloatField, Value, When
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.db.models.lookups import GreaterThan
+
+from .constants import HotRanking
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+"""Начало отсчёта весов; на порядок постов не влияет."""
+
+
+def activity(moment):
+    """Логарифм веса события, случившегося в moment."""
+    elapsed = (moment - EPOCH).total_seconds()
+    return elapsed / HotRanking.HALF_LIFE * math.log(2)
+
+
+def score(pub_date, comment_dates=()):
+    """Рейтинг поста по дате публикации и датам комментариев."""
+    values = [activity(pub_date), *map(activity, comment_dates)]
+    top = max(values)
+    return top + math.log(sum(math.exp(value - top) for value in values))
+
+
+def weight(moment):
+    """activity(moment) как выражение для UPDATE."""
+    return Value(activity(moment), output_field=FloatField())
+
+
+def logaddexp(left, right):
+    """ln(e^left + e^right) без переполнения."""
+    return Greatest(left, right) + Ln(1 + Exp(-Abs(left - right)))
+
+
+def without(moment, then, otherwise):
+    """
+    Выражение по остатку рейтинга после удаления события moment:
+    then(остаток), если в сумме остались заметные веса, иначе otherwise.
+    Остаток меньше MIN_REMAINDER — это ошибки округления, а не веса.
+    """
+    field = F('hot_score')
+    remainder = 1 - Exp(weight(moment) - field)
+    return Case(
+        When(GreaterThan(remainder, HotRanking.MIN_REMAINDER),
+             then=then(field + Ln(remainder))),
+        default=otherwise,
+        output_field=FloatField(),
+    )
+
+
+def with_event(moment):
+    """Выражение hot_score после добавления события moment."""
+    return logaddexp(F('hot_score'), weight(moment))
+
+
+def without_event(moment, pub_date):
+    """
+    Выражение hot_score после удаления события moment.
+    Вес публикации pub_date остаётся в сумме всегда.
+    """
+    return without(moment, lambda rest: rest, weight(pub_date))
+
+
+def with_moved_event(old, new):
+    """Выражение hot_score после переноса публикации из old в new."""
+    return without(old, lambda rest: logaddexp(rest, weight(new)), weight(new))
@@ -0,0 +1,26 @@
+"""
+Полнотекстовый поиск по постам и комментариям.
+
+Бэкенд выбирается настройкой BLOG_SEARCH_BACKEND. Индекс обновляется
+сигналами при сохранении и удалении, полностью перестраивается
+командой rebuild_search_index. Поиск возвращает id постов по убыванию
+релевантности; видимость постов проверяется при чтении.
+"""
+
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    """Экземпляр бэкенда поиска из настройки BLOG_SEARCH_BACKEND."""
+    return import_string(settings.BLOG_SEARCH_BACKEND)()
+
+
+def search_post_ids(query, limit):
+    """Id постов, подходящих под запрос, от более релевантных к менее."""
+    if not query.strip():
+        return []
+    return get_backend().search(query, limit)
@@ -0,0 +1,199 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+
+from ..models import Post
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+class BaseSearchBackend:
+    """
+    Интерфейс бэкенда поиска.
+    Бэкенд индексирует посты и опубликованные комментарии
+    и по запросу возвращает id постов в порядке релевантности.
+    """
+
+    def create_schema(self):
+        """Создаёт хранилище индекса, если оно нужно бэкенду."""
+
+    def index_post(self, post):
+        raise NotImplementedError
+
+    def index_comment(self, comment):
+        raise NotImplementedError
+
+    def remove_post(self, post_id):
+        raise NotImplementedError
+
+    def remove_comment(self, comment_id):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def bulk_index(self, posts, comments):
+        """Индексирует итерируемые посты и комментарии."""
+        for post in posts:
+            self.index_post(post)
+        for comment in comments:
+            self.index_comment(comment)
+
+    def search(self, query, limit):
+        raise NotImplementedError
+
+
+class DatabaseSearchBackend(BaseSearchBackend):
+    """
+    Поиск через icontains без отдельного индекса.
+    Подходит для любой СУБД и небольших объёмов данных.
+    """
+
+    def index_post(self, post):
+        pass
+
+    def index_comment(self, comment):
+        pass
+
+    def remove_post(self, post_id):
+        pass
+
+    def remove_comment(self, comment_id):
+        pass
+
+    def clear(self):
+        pass
+
+    def bulk_index(self, posts, comments):
+        pass
+
+    def search(self, query, limit):
+        condition = Q()
+        for term in TOKEN_RE.findall(query):
+            condition &= (
+                Q(title__icontains=term)
+                | Q(text__icontains=term)
+                | Q(comments__text__icontains=term,
+                    comments__is_published=True)
+            )
+        return list(
+            Post.objects.filter(condition)
+            .order_by('-pub_date')
+            .values_list('pk', flat=True)
+            .distinct()[:limit]
+        )
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    """
+    Поиск через виртуальную таблицу SQLite FTS5 с ранжированием bm25.
+    rowid записи кодирует тип и id объекта: 2 * id для поста
+    и 2 * id + 1 для комментария, поэтому удаление — поиск по rowid.
+    """
+
+    table = 'blog_search_index'
+    # Веса столбцов (title, body) для bm25: совпадение
+    # в заголовке важнее совпадения в тексте.
+    weights = (10.0, 1.0)
+    rows_per_post = 5
+
+    @staticmethod
+    def post_rowid(post_id):
+        return 2 * post_id
+
+    @staticmethod
+    def comment_rowid(comment_id):
+        return 2 * comment_id + 1
+
+    def create_schema(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {self.table} '
+                'USING fts5(title, body, post_id UNINDEXED, '
+                "tokenize='unicode61 remove_diacritics 2')"
+            )
+
+    def _upsert(self, rows):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [(row[0],) for row in rows],
+            )
+            cursor.executemany(
+                f'INSERT INTO {self.table} (rowid, title, body, post_id) '
+                'VALUES (%s, %s, %s, %s)',
+                rows,
+            )
+
+    def _delete(self, rowids):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f'DELETE FROM {self.table} WHERE rowid = %s',
+                [(rowid,) for rowid in rowids],
+            )
+
+    def _post_row(self, post):
+        return (self.post_rowid(post.pk), post.title, post.text, post.pk)
+
+    def _comment_row(self, comment):
+        return (
+            self.comment_rowid(comment.pk), '', comment.text,
+            comment.post_id)
+
+    def index_post(self, post):
+        self._upsert([self._post_row(post)])
+
+    def index_comment(self, comment):
+        if comment.is_published:
+            self._upsert([self._comment_row(comment)])
+        else:
+            self.remove_comment(comment.pk)
+
+    def remove_post(self, post_id):
+        self._delete([self.post_rowid(post_id)])
+
+    def remove_comment(self, comment_id):
+        self._delete([self.comment_rowid(comment_id)])
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+
+    def bulk_index(self, posts, comments):
+        with connection.cursor() as cursor:
+            sql = (
+                f'INSERT INTO {self.table} (rowid, title, body, post_id) '
+                'VALUES (%s, %s, %s, %s)'
+            )
+            cursor.executemany(sql, (self._post_row(post) for post in posts))
+            cursor.executemany(sql, (
+                self._comment_row(comment) for comment in comments
+                if comment.is_published
+            ))
+
+    @staticmethod
+    def build_match(query):
+        """
+        Превращает пользовательский ввод в запрос FTS5:
+        каждое слово ищется как префикс, все слова обязательны.
+        Спецсимволы синтаксиса FTS5 в запрос не попадают.
+        """
+        return ' '.join(f'"{term}"*' for term in TOKEN_RE.findall(query))
+
+    def search(self, query, limit):
+        match = self.build_match(query)
+        if not match:
+            return []
+        # Один пост может встретиться несколько раз (сам пост и его
+        # комментарии), поэтому строк выбирается с запасом, а в выдаче
+        # остаётся первое, самое релевантное вхождение.
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT post_id FROM {self.table} '
+                f'WHERE {self.table} MATCH %s '
+                f'ORDER BY bm25({self.table}, %s, %s) LIMIT %s',
+                [match, *self.weights, limit * self.rows_per_post],
+            )
+            post_ids = dict.fromkeys(row[0] for row in cursor.fetchall())
+        return list(post_ids)[:limit]
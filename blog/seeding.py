@@ -0,0 +1,295 @@
+"""
+Генерация синтетических данных для нагрузочных замеров.
+
+Заголовки, тексты, категории и местоположения берутся из
+fixtures/db.json, поэтому синтетические записи похожи на настоящие
+по длине и составу полей. Распределения приближены к живому блогу:
+авторы и обсуждения подчиняются закону Ципфа, свежих постов больше,
+часть постов запланирована на будущее.
+"""
+
+import json
+import multiprocessing
+import random
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .constants import Seeding
+from .listings import listing_rows
+from .models import Category, Comment, Location, Post, PostListing
+from .ranking import activity
+from .services import rescore_posts
+
+User = get_user_model()
+
+FIXTURE = settings.BASE_DIR / 'fixtures' / 'db.json'
+
+
+@lru_cache
+def load_template(path=FIXTURE):
+    """
+    Образцы значений из фикстуры: списки заголовков и текстов постов,
+    описаний категорий и названий местоположений.
+    """
+    template = {'titles': [], 'texts': [], 'descriptions': [], 'places': []}
+    with open(path, encoding='utf-8') as file:
+        for row in json.load(file):
+            fields = row['fields']
+            if row['model'] == 'blog.post':
+                template['titles'].append(fields['title'])
+                template['texts'].append(fields['text'])
+            elif row['model'] == 'blog.category':
+                template['descriptions'].append(fields['description'])
+            elif row['model'] == 'blog.location':
+                template['places'].append(fields['name'])
+    # Без фикстуры генерация всё равно должна работать.
+    template['titles'] = template['titles'] or ['Пост']
+    template['texts'] = template['texts'] or ['Текст публикации.']
+    template['descriptions'] = (
+        template['descriptions'] or ['Сгенерированная категория'])
+    template['places'] = template['places'] or ['Место']
+    return template
+
+
+def ensure_base_objects(rng, users=Seeding.USERS,
+                        categories=Seeding.CATEGORIES,
+                        locations=Seeding.LOCATIONS):
+    """
+    Создаёт недостающих пользователей, категории и местоположения.
+    Возвращает списки первичных ключей пользователей и местоположений
+    и словарь «id категории -> опубликована ли она».
+    """
+    template = load_template()
+    existing = User.objects.filter(username__startswith='seed_').count()
+    User.objects.bulk_create(
+        User(username=f'seed_{number}')
+        for number in range(existing, users)
+    )
+    existing = Category.objects.filter(slug__startswith='seed-').count()
+    Category.objects.bulk_create(
+        Category(
+            title=f'Категория {number}',
+            slug=f'seed-{number}',
+            description=rng.choice(template['descriptions']),
+            # Часть категорий снята с публикации, как и в реальных данных.
+            is_published=rng.random() > Seeding.HIDDEN_SHARE,
+        )
+        for number in range(existing, categories)
+    )
+    existing = Location.objects.filter(name__endswith=' (seed)').count()
+    Location.objects.bulk_create(
+        Location(name=f'{rng.choice(template["places"])} {number} (seed)')
+        for number in range(existing, locations)
+    )
+    return (
+        list(User.objects.values_list('pk', flat=True)),
+        dict(Category.objects.values_list('pk', 'is_published')),
+        list(Location.objects.values_list('pk', flat=True)),
+    )
+
+
+def zipf_weights(count, exponent):
+    """
+    Накопленные веса закона Ципфа: элемент с рангом r выбирается
+    с вероятностью ~ 1 / r**exponent. Подходит для random.choices.
+    """
+    total = 0.0
+    weights = []
+    for rank in range(1, count + 1):
+        total += rank ** -exponent
+        weights.append(total)
+    return weights
+
+
+# =================================
+# Генерация строк в процессах-воркерах.
+# =================================
+_context = {}
+"""
+Общие данные генераторов. Заполняются до запуска пула и достаются
+воркерам при fork, поэтому не передаются с каждой пачкой.
+"""
+
+
+def batch_random(kind, number):
+    # Пачка с данным номером одинакова при любом числе воркеров.
+    return random.Random(f'{_context["seed"]}-{kind}-{number}')
+
+
+def generate_posts(task):
+    """Поля постов одной пачки; к базе не обращается."""
+    number, size = task
+    rng = batch_random('posts', number)
+    template = _context['template']
+    start = _context['start']
+    rows = []
+    for _ in range(size):
+        if rng.random() < Seeding.FUTURE_SHARE:
+            minutes = -rng.randint(1, Seeding.FUTURE_MINUTES)
+        else:
+            # Свежих публикаций больше, чем старых.
+            minutes = int(Seeding.MINUTES * rng.random() ** 2)
+        pub_date = start - timedelta(minutes=minutes)
+        category_id = rng.choice(_context['category_ids'])
+        is_published = rng.random() > Seeding.HIDDEN_SHARE
+        rows.append({
+            'title': rng.choice(template['titles']),
+            'text': ' '.join(
+                rng.choices(template['texts'], k=rng.randint(1, 5))),
+            'pub_date': pub_date,
+            # Немногие авторы пишут большую часть постов.
+            'author_id': rng.choices(
+                _context['authors'], cum_weights=_context['weights'])[0],
+            'category_id': category_id,
+            'location_id': rng.choice(_context['location_ids']),
+            'is_published': is_published,
+            # bulk_create не вызывает Post.save().
+            'is_visible': (is_published and pub_date <= start
+                           and _context['categories'][category_id]),
+            'hot_score': activity(pub_date),
+        })
+    return rows
+
+
+def generate_comments(task):
+    """Поля комментариев одной пачки; к базе не обращается."""
+    number, size = task
+    rng = batch_random('comments', number)
+    texts = _context['template']['texts']
+    # Обсуждение сосредоточено на немногих «горячих» постах.
+    post_ids = rng.choices(
+        _context['posts'], cum_weights=_context['weights'], k=size)
+    return [
+        {
+            'post_id': post_id,
+            'author_id': rng.choice(_context['user_ids']),
+            'text': rng.choice(texts),
+        }
+        for post_id in post_ids
+    ]
+
+
+def generate_batches(generate, context, count, batch_size, workers):
+    """
+    Строки пачками по batch_size в исходном порядке.
+    При workers > 1 пачки строятся в дочерних процессах,
+    а запись в базу остаётся в текущем.
+    """
+    _context.clear()
+    _context.update(context)
+    tasks = [
+        (number, min(batch_size, count - offset))
+        for number, offset in enumerate(range(0, count, batch_size))
+    ]
+    if workers <= 1 or 'fork' not in multiprocessing.get_all_start_methods():
+        yield from map(generate, tasks)
+        return
+    # Соединения с базой не должны наследоваться дочерними процессами.
+    connections.close_all()
+    with multiprocessing.get_context('fork').Pool(workers) as pool:
+        yield from pool.imap(generate, tasks)
+
+
+def seed_posts(count, batch_size=Seeding.BATCH_SIZE, seed=0, workers=1,
+               **base):
+    """
+    Массово создаёт count постов пачками по batch_size,
+    каждая пачка — в отдельной транзакции.
+    base — размеры справочников для ensure_base_objects.
+    """
+    rng = random.Random(seed)
+    user_ids, categories, location_ids = ensure_base_objects(rng, **base)
+    rng.shuffle(user_ids)
+    context = {
+        'seed': seed,
+        'template': load_template(),
+        'start': timezone.now(),
+        'authors': user_ids,
+        'weights': zipf_weights(len(user_ids), Seeding.AUTHOR_SKEW),
+        'categories': categories,
+        'category_ids': list(categories),
+        'location_ids': location_ids + [None],
+    }
+    created = 0
+    for rows in generate_batches(
+            generate_posts, context, count, batch_size, workers):
+        with transaction.atomic():
+            posts = Post.objects.bulk_create(
+                [Post(**row) for row in rows], batch_size=batch_size)
+            # Сигналы не вызываются: строки списков создаются здесь.
+            PostListing.objects.bulk_create(
+                listing_rows(posts), batch_size=batch_size)
+        created += len(rows)
+    return created
+
+
+def update_comment_counts(post_ids, batch_size=Seeding.BATCH_SIZE):
+    """Пересчитывает Post.comment_count одним UPDATE на пачку постов."""
+    post_ids = sorted(post_ids)
+    totals = (
+        Comment.objects.filter(post=OuterRef('pk'))
+        .order_by().values('post').annotate(total=Count('pk'))
+        .values('total')
+    )
+    for offset in range(0, len(post_ids), batch_size):
+        Post.objects.filter(
+            pk__in=post_ids[offset:offset + batch_size]
+        ).update(comment_count=Coalesce(Subquery(totals), 0))
+
+
+def seed_comments(count, batch_size=Seeding.BATCH_SIZE, seed=0, workers=1):
+    """
+    Массово создаёт count комментариев к видимым постам
+    и пересчитывает Post.comment_count и рейтинг затронутых постов.
+    """
+    rng = random.Random(seed)
+    user_ids = list(User.objects.values_list('pk', flat=True))
+    post_ids = list(
+        Post.objects.filter(is_visible=True)
+        .order_by('pk').values_list('pk', flat=True))
+    if not user_ids or not post_ids:
+        return 0
+    rng.shuffle(post_ids)
+    context = {
+        'seed': seed,
+        'template': load_template(),
+        'user_ids': user_ids,
+        'posts': post_ids,
+        'weights': zipf_weights(len(post_ids), Seeding.HOT_POST_SKEW),
+    }
+    created = 0
+    touched = set()
+    for rows in generate_batches(
+            generate_comments, context, count, batch_size, workers):
+        with transaction.atomic():
+            Comment.objects.bulk_create(
+                [Comment(**row) for row in rows], batch_size=batch_size)
+        touched.update(row['post_id'] for row in rows)
+        created += len(rows)
+    with transaction.atomic():
+        update_comment_counts(touched)
+    touched = sorted(touched)
+    for offset in range(0, len(touched), batch_size):
+        with transaction.atomic():
+            rescore_posts(touched[offset:offset + batch_size])
+    return created
+
+
+def seed_dataset(users=Seeding.USERS, categories=Seeding.CATEGORIES,
+                 locations=Seeding.LOCATIONS, posts=0, comments=0, seed=0,
+                 batch_size=Seeding.BATCH_SIZE, workers=1):
+    """Создаёт полный набор данных заданного размера."""
+    base = {'users': users, 'categories': categories, 'locations': locations}
+    ensure_base_objects(random.Random(seed), **base)
+    options = {'batch_size': batch_size, 'seed': seed, 'workers': workers}
+    return {
+        'posts': seed_posts(posts, **options, **base) if posts else 0,
+        'comments': seed_comments(comments, **options) if comments else 0,
+    }
@@ -3,11 +3,30 @@ from rest_framework import serializers
 from .models import Post
 
 
-class PostSerializer(serializers.ModelSerializer):
+class SparseFieldsMixin:
+    """
+    Позволяет ограничить набор полей сериализатора:
+    fields — оставить только перечисленные, omit — убрать перечисленные.
+    """
+
+    def __init__(self, *args, fields=None, omit=(), **kwargs):
+        super().__init__(*args, **kwargs)
+        allowed = set(self.fields) if fields is None else set(fields)
+        for name in list(self.fields):
+            if name not in allowed or name in omit:
+                self.fields.pop(name)
+
+    def get_model_fields(self):
+        """Поля модели, которые нужны оставшимся полям сериализатора."""
+        return {field.source for field in self.fields.values()}
+
+
+class PostSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     Заголовок = serializers.CharField(source='title')
     Текст = serializers.CharField(source='text')
     Дата_публикации = serializers.DateTimeField(source='pub_date')
+    Просмотры = serializers.IntegerField(source='view_count', read_only=True)
 
     class Meta:
         model = Post
-        fields = ['id', 'Заголовок', 'Текст', 'Дата_публикации']
\ No newline at end of file
+        fields = ['id', 'Заголовок', 'Текст', 'Дата_публикации', 'Просмотры']
@@ -0,0 +1,83 @@
+from django.db.models import Count, F
+
+from .cache import SITE_CONTENT, bump_version
+from .constants import CommentCounters, HotRanking
+from .models import Comment, Post
+from .ranking import score, with_moved_event
+from .writes import on_commit
+
+
+def change_comment_count(post_id, delta, hot_score=None):
+    """
+    Атомарно сдвигает счётчик комментариев поста на delta.
+    hot_score — выражение нового рейтинга поста из blog.ranking,
+    оно записывается тем же UPDATE.
+    Вызывается в той же транзакции, что и создание/удаление комментария.
+    """
+    changes = {'comment_count': F('comment_count') + delta}
+    if hot_score is not None:
+        changes['hot_score'] = hot_score
+    Post.objects.filter(pk=post_id).update(**changes)
+
+
+def move_publication(post_id, old_date, new_date):
+    """Переносит вес публикации поста в рейтинге на новую дату."""
+    if old_date != new_date:
+        Post.objects.filter(pk=post_id).update(
+            hot_score=with_moved_event(old_date, new_date))
+
+
+def recount_comments(post_ids):
+    """
+    Пересчитывает счётчики комментариев у указанных постов по таблице
+    комментариев и исправляет разошедшиеся значения.
+    Возвращает количество исправленных постов.
+    """
+    post_ids = list(post_ids)
+    actual = dict(
+        Comment.objects
+        .filter(post_id__in=post_ids)
+        .values_list('post_id')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    drifted = []
+    for post in Post.objects.filter(pk__in=post_ids).only('comment_count'):
+        total = actual.get(post.pk, 0)
+        if post.comment_count != total:
+            post.comment_count = total
+            drifted.append(post)
+    Post.objects.bulk_update(
+        drifted, ['comment_count'], batch_size=CommentCounters.BATCH_SIZE)
+    for post in drifted:
+        on_commit(
+            lambda pk=post.pk: bump_version('post', pk))
+    if drifted:
+        on_commit(lambda: bump_version(*SITE_CONTENT))
+    return len(drifted)
+
+
+def rescore_posts(post_ids):
+    """
+    Пересчитывает рейтинг популярности указанных постов по дате
+    публикации и датам комментариев и исправляет разошедшиеся значения.
+    Возвращает количество исправленных постов.
+    """
+    post_ids = list(post_ids)
+    comment_dates = {}
+    for post_id, created_at in (
+            Comment.objects.filter(post_id__in=post_ids)
+            .values_list('post_id', 'created_at')):
+        comment_dates.setdefault(post_id, []).append(created_at)
+    drifted = []
+    for post in Post.objects.filter(pk__in=post_ids).only(
+            'pub_date', 'hot_score'):
+        actual = score(post.pub_date, comment_dates.get(post.pk, ()))
+        if abs(post.hot_score - actual) > HotRanking.TOLERANCE:
+            post.hot_score = actual
+            drifted.append(post)
+    Post.objects.bulk_update(
+        drifted, ['hot_score'], batch_size=HotRanking.BATCH_SIZE)
+    if drifted:
+        on_commit(lambda: bump_version(*SITE_CONTENT))
+    return len(drifted)
@@ -0,0 +1,164 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .cache import SITE_CONTENT, bump_version
+from .images import needs_processing
+from .listings import sync_listings, sync_post
+from .models import Category, Comment, Location, Post, PostTombstone
+from .publication import refresh_visibility, visibility_changed
+from .services import recount_comments, rescore_posts
+from .tasks import index_comment, index_post, process_post_image
+from .writes import on_commit
+
+User = get_user_model()
+
+
+def bump_on_commit(kind, pk):
+    """
+    Меняет версию объекта и версию контента сайта после коммита,
+    иначе параллельный запрос успеет закэшировать старые данные.
+    """
+    def bump():
+        bump_version(kind, pk)
+        bump_version(*SITE_CONTENT)
+
+    on_commit(bump)
+
+
+# =================================
+# Кэш фрагментов и страниц.
+# =================================
+@receiver([post_save, post_delete], sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    bump_on_commit('post', instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def invalidate_comment_post(sender, instance, **kwargs):
+    # Карточка поста показывает количество комментариев.
+    bump_on_commit('post', instance.post_id)
+
+
+@receiver([post_save, post_delete], sender=Category)
+def invalidate_category(sender, instance, **kwargs):
+    bump_on_commit('category', instance.pk)
+
+
+@receiver(post_save, sender=Category)
+def refresh_category_posts(sender, instance, **kwargs):
+    refresh_visibility(Post.objects.filter(category=instance))
+
+
+@receiver(post_delete, sender=Category)
+def hide_uncategorized_posts(sender, instance, **kwargs):
+    # Посты удалённой категории остаются без неё (SET_NULL).
+    refresh_visibility(
+        Post.objects.filter(category__isnull=True, is_visible=True))
+
+
+@receiver(visibility_changed)
+def invalidate_visibility(sender, post_ids, **kwargs):
+    # Сигнал уже отправлен после коммита.
+    for pk in post_ids:
+        bump_version('post', pk)
+    bump_version(*SITE_CONTENT)
+
+
+@receiver([post_save, post_delete], sender=Location)
+def invalidate_location(sender, instance, **kwargs):
+    bump_on_commit('location', instance.pk)
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user(sender, instance, update_fields=None, **kwargs):
+    # Вход в систему обновляет только last_login — на страницах его нет.
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    bump_on_commit('user', instance.pk)
+
+
+# =================================
+# Счётчики и рейтинг постов.
+# =================================
+@receiver(pre_delete, sender=User)
+def remember_commented_posts(sender, instance, **kwargs):
+    # Комментарии пользователя к чужим постам удаляются каскадом,
+    # мимо change_comment_count: запоминаем посты до удаления.
+    instance._commented_post_ids = list(
+        Comment.objects.filter(author=instance)
+        .exclude(post__author=instance)
+        .values_list('post_id', flat=True).distinct())
+
+
+@receiver(post_delete, sender=User)
+def recount_commented_posts(sender, instance, **kwargs):
+    post_ids = getattr(instance, '_commented_post_ids', None)
+    if post_ids:
+        recount_comments(post_ids)
+        rescore_posts(post_ids)
+
+
+# =================================
+# Материализованные списки постов.
+# =================================
+@receiver(post_save, sender=Post)
+def update_post_listings(sender, instance, created, **kwargs):
+    sync_post(instance, created)
+
+
+@receiver(visibility_changed)
+def refresh_post_listings(sender, post_ids, **kwargs):
+    sync_listings(post_ids)
+
+
+# =================================
+# Поисковый индекс.
+# =================================
+@receiver(post_save, sender=Post)
+def reindex_post(sender, instance, **kwargs):
+    # Индекс обновляет воркер: задача читает пост заново.
+    index_post.enqueue(post_id=instance.pk)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    # Комментарии удалённого поста убирает та же задача.
+    index_post.enqueue(
+        post_id=instance.pk,
+        comment_ids=getattr(instance, '_deleted_comment_ids', []))
+
+
+@receiver(post_save, sender=Comment)
+def reindex_comment(sender, instance, **kwargs):
+    index_comment.enqueue(comment_id=instance.pk)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, origin=None, **kwargs):
+    # Каскад от удаления поста: сигналы комментариев приходят раньше
+    # сигнала поста, id запоминаются на нём — одна задача вместо
+    # задачи на каждый комментарий.
+    if isinstance(origin, Post) and origin.pk == instance.post_id:
+        origin.__dict__.setdefault('_deleted_comment_ids', []).append(
+            instance.pk)
+        return
+    index_comment.enqueue(comment_id=instance.pk)
+
+
+# =================================
+# Инкрементальная выгрузка.
+# =================================
+@receiver(post_delete, sender=Post)
+def record_post_tombstone(sender, instance, **kwargs):
+    PostTombstone.objects.create(post_id=instance.pk)
+
+
+# =================================
+# Изображения.
+# =================================
+@receiver(post_save, sender=Post)
+def process_image(sender, instance, **kwargs):
+    # Уменьшенные копии строит воркер run_tasks, а не запрос.
+    if needs_processing(instance):
+        process_post_image.enqueue(post_id=instance.pk)
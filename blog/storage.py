@@ -0,0 +1,77 @@
+import hashlib
+import os
+import posixpath
+import re
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+CONTENT_NAME_RE = re.compile(
+    r'(?:^|/)[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})(?:\.\w+)?$')
+"""Имя файла в контентно-адресуемом хранилище: .../ab/<sha256>.ext"""
+
+
+def content_digest(name):
+    """sha256 содержимого, если имя выдано ContentAddressedStorage."""
+    match = CONTENT_NAME_RE.search(name)
+    return match and match['digest']
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Хранилище, в котором имя файла — хэш его содержимого.
+    Одинаковые загрузки занимают один файл, а содержимое по имени
+    никогда не меняется, поэтому его можно кэшировать навсегда.
+    Файлы могут использоваться несколькими объектами сразу,
+    поэтому удалять их при удалении объекта нельзя — ставшие ненужными
+    файлы удаляет команда delete_orphan_media.
+    """
+
+    content_addressed = True
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        sha256 = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            sha256.update(chunk)
+        content.seek(0)
+        digest = sha256.hexdigest()
+        extension = posixpath.splitext(name)[1].lower()
+        name = posixpath.join(
+            posixpath.dirname(name), digest[:2], digest + extension)
+        if self.exists(name) and self.touch(name):
+            return name
+        try:
+            return super().save(name, content, max_length)
+        except FileExistsError:
+            # Параллельная загрузка того же содержимого успела раньше.
+            self.touch(name)
+            return name
+
+    def touch(self, name):
+        """
+        Обновляет время изменения существующего файла: по нему
+        delete_orphan_media отсчитывает срок, в течение которого файл,
+        ещё не сохранённый в посте, не удаляется. Без этого старый
+        ненужный файл, загруженный заново, мог бы быть удалён сразу.
+        Возвращает False, если файл успели удалить.
+        """
+        try:
+            os.utime(self.path(name))
+        except FileNotFoundError:
+            return False
+        return True
+
+    def get_available_name(self, name, max_length=None):
+        """
+        Имя — хэш содержимого, поэтому занятое имя хранит те же байты:
+        суффикс, как у FileSystemStorage, сломал бы адресацию.
+        Если файл уже есть, FileExistsError прерывает запись, и save()
+        возвращает имя без изменений.
+        """
+        if content_digest(name) and self.exists(name):
+            raise FileExistsError(name)
+        return super().get_available_name(name, max_length)
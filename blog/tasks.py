@@ -0,0 +1,205 @@
+"""
+Фоновая очередь задач на базе таблицы Task.
+
+Функция регистрируется декоратором @task и ставится в очередь через
+.enqueue(**kwargs) в той же транзакции, что и изменения данных:
+воркер увидит задачу только после коммита. Воркер (команда run_tasks)
+забирает задачи, повторяет упавшие с экспоненциальной паузой
+и соблюдает ограничение одновременных запусков для каждой задачи.
+Выполненные задачи хранятся TaskQueue.KEEP_DONE секунд после
+завершения, затем воркер их удаляет.
+"""
+
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Count, F, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.lookups import LessThan
+from django.utils.timezone import now
+
+from .constants import TaskQueue
+from .models import Comment, Post, Task
+from .search import get_backend as get_search_backend
+from .writes import on_commit
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+class RegisteredTask:
+    def __init__(self, func, name, concurrency, max_attempts):
+        self.func = func
+        self.name = name
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+
+    def __call__(self, **kwargs):
+        return self.func(**kwargs)
+
+    def enqueue(self, delay=0, **kwargs):
+        """
+        Ставит задачу в очередь. При BLOG_TASKS_EAGER задача
+        выполняется сразу после коммита текущей транзакции.
+        """
+        if settings.BLOG_TASKS_EAGER:
+            on_commit(lambda: self.func(**kwargs))
+            return None
+        return Task.objects.create(
+            name=self.name,
+            kwargs=kwargs,
+            max_attempts=self.max_attempts,
+            run_after=now() + timedelta(seconds=delay),
+        )
+
+
+def task(name=None, concurrency=None, max_attempts=TaskQueue.MAX_ATTEMPTS):
+    """
+    Регистрирует функцию как фоновую задачу.
+    concurrency — сколько экземпляров задачи может выполняться
+    одновременно во всех воркерах (None — без ограничения).
+    """
+
+    def decorator(func):
+        registered = RegisteredTask(
+            func,
+            name or f'{func.__module__}.{func.__name__}',
+            concurrency,
+            max_attempts,
+        )
+        registry[registered.name] = registered
+        return registered
+
+    return decorator
+
+
+def requeue_stale(timeout=TaskQueue.STALE_TIMEOUT):
+    """Возвращает в очередь задачи, воркер которых, видимо, упал."""
+    return Task.objects.filter(
+        status=Task.Status.RUNNING,
+        locked_at__lt=now() - timedelta(seconds=timeout),
+    ).update(status=Task.Status.PENDING, locked_at=None)
+
+
+def running_count(name):
+    """Подзапрос: сколько экземпляров задачи name выполняется сейчас."""
+    return Coalesce(
+        Subquery(
+            Task.objects.filter(name=name, status=Task.Status.RUNNING)
+            .order_by()
+            .values('name')
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0,
+    )
+
+
+def claim(limit):
+    """
+    Забирает до limit готовых к запуску задач.
+    Задача считается взятой, только если условный UPDATE
+    изменил строку, поэтому несколько воркеров не возьмут одну задачу.
+    Ограничение одновременных запусков проверяется в том же UPDATE:
+    между подсчётом и захватом другой воркер вклиниться не может.
+    """
+    claimed = []
+    candidates = Task.objects.filter(
+        status=Task.Status.PENDING, run_after__lte=now()
+    ).order_by('run_after')[:limit * 4]
+    for candidate in candidates:
+        if len(claimed) == limit:
+            break
+        registered = registry.get(candidate.name)
+        condition = Q(pk=candidate.pk, status=Task.Status.PENDING)
+        if registered is not None and registered.concurrency is not None:
+            condition &= LessThan(
+                running_count(candidate.name), registered.concurrency)
+        updated = Task.objects.filter(condition).update(
+            status=Task.Status.RUNNING,
+            locked_at=now(),
+            attempts=F('attempts') + 1,
+        )
+        if updated:
+            candidate.refresh_from_db()
+            claimed.append(candidate)
+    return claimed
+
+
+def purge_done(keep=TaskQueue.KEEP_DONE):
+    """Удаляет задачи, выполненные больше keep секунд назад."""
+    deleted, _ = Task.objects.filter(
+        status=Task.Status.DONE,
+        finished_at__lt=now() - timedelta(seconds=keep),
+    ).delete()
+    return deleted
+
+
+def run(claimed_task):
+    """Выполняет взятую задачу и записывает результат."""
+    registered = registry.get(claimed_task.name)
+    try:
+        if registered is None:
+            raise LookupError(f'Неизвестная задача {claimed_task.name}')
+        registered(**claimed_task.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Задача %s упала', claimed_task)
+        if claimed_task.attempts < claimed_task.max_attempts:
+            delay = TaskQueue.RETRY_DELAY * 2 ** (claimed_task.attempts - 1)
+            Task.objects.filter(pk=claimed_task.pk).update(
+                status=Task.Status.PENDING,
+                locked_at=None,
+                run_after=now() + timedelta(seconds=delay),
+                last_error=error,
+            )
+        else:
+            Task.objects.filter(pk=claimed_task.pk).update(
+                status=Task.Status.FAILED,
+                locked_at=None,
+                finished_at=now(),
+                last_error=error,
+            )
+        return False
+    Task.objects.filter(pk=claimed_task.pk).update(
+        status=Task.Status.DONE, locked_at=None, finished_at=now())
+    return True
+
+
+# =================================
+# Задачи блога.
+# =================================
+@task(name='blog.process_post_image', concurrency=TaskQueue.WORKERS)
+def process_post_image(post_id):
+    from .images import process_post_image as process
+
+    process(post_id)
+
+
+@task(name='blog.index_post')
+def index_post(post_id, comment_ids=()):
+    """
+    Обновляет пост в поисковом индексе или убирает удалённый
+    вместе с комментариями comment_ids, удалёнными каскадом.
+    """
+    backend = get_search_backend()
+    post = Post.objects.filter(pk=post_id).first()
+    if post is not None:
+        backend.index_post(post)
+        return
+    backend.remove_post(post_id)
+    for comment_id in comment_ids:
+        backend.remove_comment(comment_id)
+
+
+@task(name='blog.index_comment')
+def index_comment(comment_id):
+    """Обновляет комментарий в поисковом индексе или убирает удалённый."""
+    comment = Comment.objects.filter(pk=comment_id).first()
+    if comment is None:
+        get_search_backend().remove_comment(comment_id)
+    else:
+        get_search_backend().index_comment(comment)
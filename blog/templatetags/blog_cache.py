@@ -0,0 +1,49 @@
+from django import template
+from django.conf import settings
+from django.utils.safestring import mark_safe
+
+from ..cache import get_fragment_cache, post_card_key
+from ..holes import marker, render_hole, shared_render
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def cached_post_card(context, post):
+    """
+    Рендерит includes/post_card.html для поста
+    или берёт готовый фрагмент из кэша.
+    Карточки, загруженные заранее aload_post_cards, берутся из post.card.
+    """
+    card = getattr(post, 'card', None)
+    if card is not None:
+        if card['html'] is None:
+            card['html'] = render_card(context, post)
+            card['rendered'] = True
+        return mark_safe(card['html'])
+
+    cache = get_fragment_cache()
+    key = post_card_key(post)
+    html = cache.get(key)
+    if html is None:
+        html = render_card(context, post)
+        cache.set(key, html, settings.BLOG_FRAGMENT_CACHE_TIMEOUT)
+    return mark_safe(html)
+
+
+def render_card(context, post):
+    card = context.template.engine.get_template('includes/post_card.html')
+    with context.push(post=post):
+        return card.render(context)
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, *args):
+    """
+    Персональная часть страницы (см. blog.holes): в общей для всех
+    странице — метка для заполнения, иначе — готовый фрагмент.
+    """
+    request = context.get('request')
+    if shared_render(request):
+        return mark_safe(marker(name, args))
+    return mark_safe(render_hole(request, name, args))
@@ -0,0 +1,20 @@
+from django import template
+
+from ..constants import ImageVariants
+from ..images import srcset
+
+register = template.Library()
+
+
+@register.inclusion_tag('includes/post_image.html')
+def post_image(post):
+    """
+    Изображение поста с вариантами WebP/JPEG в srcset.
+    Пока варианты не созданы, показывается оригинал.
+    """
+    return {
+        'post': post,
+        'webp_srcset': srcset(post, 'webp'),
+        'jpeg_srcset': srcset(post, 'jpeg'),
+        'sizes': ImageVariants.SIZES,
+    }
@@ -0,0 +1,1587 @@
+import base64
+import json
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import warnings
+from datetime import timedelta
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, OperationalError, connection
+from django.http import Http404
+from django.test import (
+    AsyncRequestFactory, Client, RequestFactory, SimpleTestCase, TestCase,
+    TransactionTestCase, override_settings
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from blogicum.instrumentation import (
+    RequestMetrics, RequestMetricsMiddleware, stats
+)
+from blogicum.middleware import PrecompressedStaticMiddleware
+from blogicum.routers import ReplicaRouter, replica_reads
+
+from . import async_views
+from .benchmark import (
+    build_routes, check_budgets, measure_routes, record_budgets, route_names
+)
+from .cache import (
+    SITE_CONTENT, aload_post_cards, get_versions, page_timeout, version_key
+)
+from .constants import MediaCleanup, QueryBudgets, TaskQueue
+from .counters import view_counts
+from .listings import LISTING_FIELDS, listing, rebuild_listings
+from .management.commands.benchmark_views import BUDGETS
+from .models import Category, Comment, Post, PostListing, Task
+from .paginators import CursorPaginator, encode_cursor
+from .publication import next_due_publication, publish_due_posts
+from .ranking import activity, score
+from .search import search_post_ids
+from .seeding import (
+    generate_batches, generate_posts, load_template, zipf_weights
+)
+from .services import recount_comments, rescore_posts
+from .storage import content_digest
+from .tasks import claim, run
+from .views import serve_media
+from .writes import on_commit, run_write
+
+User = get_user_model()
+
+
+@override_settings(BLOG_VIEW_FLUSH_INTERVAL=None)
+class BlogTestCase(TestCase):
+    """
+    Автор с постом и комментарием и посторонний пользователь.
+    Просмотры пишутся только явным flush(): фоновый поток и atexit
+    не должны записывать их после удаления тестовой базы.
+    """
+
+    def setUp(self):
+        # Кэш страниц и фрагментов общий для всех тестов процесса.
+        for alias in caches:
+            caches[alias].clear()
+
+    def tearDown(self):
+        view_counts.drain()
+        super().tearDown()
+
+    def run_tasks(self):
+        """Выполняет готовые задачи очереди в текущем потоке."""
+        names = []
+        while claimed := claim(10):
+            for claimed_task in claimed:
+                self.assertTrue(run(claimed_task))
+                names.append(claimed_task.name)
+        return names
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('author')
+        cls.reader = User.objects.create_user('reader')
+        cls.category = Category.objects.create(
+            title='Категория', slug='category', description='Описание')
+        cls.post = Post.objects.create(
+            title='Пост', text='Текст', author=cls.author,
+            category=cls.category, pub_date=timezone.now(),
+            comment_count=1)
+        cls.comment = Comment.objects.create(
+            post=cls.post, author=cls.author, text='Комментарий')
+
+
+class MutatingViewQueriesTest(BlogTestCase):
+    """
+    Число SQL-запросов изменяющих маршрутов.
+    В каждом считаются сессия и пользователь (2 запроса), а запись
+    под TestCase обрамлена SAVEPOINT/RELEASE (ещё 2). Объект автора
+    загружается одним запросом, который одновременно проверяет права.
+    Каждый сохранённый или удалённый пост и комментарий ставит
+    в очередь задачу обновления поискового индекса (INSERT).
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.author)
+
+    def post_data(self):
+        return {
+            'title': 'Новый пост',
+            'text': 'Текст',
+            'pub_date': '2024-01-01 10:00',
+            'category': self.category.pk,
+            'is_published': 'on',
+        }
+
+    def test_create_post(self):
+        # Категория из формы: выборка и проверка существования,
+        # INSERT поста и строк списков категории и автора.
+        with self.assertNumQueries(9):
+            response = self.client.post(
+                reverse('blog:create_post'), self.post_data())
+        self.assertEqual(response.status_code, 302)
+
+    def test_edit_post_form(self):
+        # Пост и варианты категорий и местоположений для формы.
+        with self.assertNumQueries(5):
+            response = self.client.get(
+                reverse('blog:edit_post', args=[self.post.pk]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_edit_post(self):
+        # Строки списков постов пересоздаются, вес публикации
+        # в рейтинге переносится на новую дату.
+        with self.assertNumQueries(12):
+            response = self.client.post(
+                reverse('blog:edit_post', args=[self.post.pk]),
+                self.post_data())
+        self.assertRedirects(
+            response, reverse('blog:post_detail', args=[self.post.pk]))
+
+    def test_delete_post_form(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                reverse('blog:delete_post', args=[self.post.pk]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_delete_post(self):
+        # Комментарии выбираются и удаляются каскадом (с сигналами),
+        # строки списков постов удаляются одним запросом,
+        # для инкрементальной выгрузки остаётся отметка об удалении.
+        with self.assertNumQueries(11):
+            response = self.client.post(
+                reverse('blog:delete_post', args=[self.post.pk]))
+        self.assertRedirects(
+            response, reverse('blog:index'), fetch_redirect_response=False)
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+
+    def test_add_comment(self):
+        # Вложенная транзакция: комментарий и счётчик комментариев.
+        with self.assertNumQueries(10):
+            response = self.client.post(
+                reverse('blog:add_comment', args=[self.post.pk]),
+                {'text': 'Ещё комментарий'})
+        self.assertEqual(response.status_code, 302)
+
+    def test_edit_comment_form(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse(
+                'blog:edit_comment', args=[self.post.pk, self.comment.pk]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_edit_comment(self):
+        with self.assertNumQueries(7):
+            response = self.client.post(
+                reverse('blog:edit_comment',
+                        args=[self.post.pk, self.comment.pk]),
+                {'text': 'Исправленный комментарий'})
+        self.assertEqual(response.status_code, 302)
+        self.comment.refresh_from_db()
+        self.assertEqual(self.comment.text, 'Исправленный комментарий')
+
+    def test_delete_comment_form(self):
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse(
+                'blog:delete_comment', args=[self.post.pk, self.comment.pk]))
+        self.assertEqual(response.status_code, 200)
+
+    def test_delete_comment(self):
+        # Вложенная транзакция: удаление и счётчик комментариев.
+        with self.assertNumQueries(10):
+            response = self.client.post(reverse(
+                'blog:delete_comment', args=[self.post.pk, self.comment.pk]))
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Comment.objects.filter(pk=self.comment.pk).exists())
+
+    def test_edit_profile(self):
+        with self.assertNumQueries(5):
+            response = self.client.post(reverse('blog:edit_profile'), {
+                'first_name': 'Имя',
+                'last_name': 'Фамилия',
+                'email': 'author@example.com',
+            })
+        self.assertEqual(response.status_code, 302)
+
+
+class ReadViewQueriesTest(BlogTestCase):
+    """
+    Страницы чтения укладываются в QueryBudgets при любом числе
+    комментариев и постов на странице.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.reader)
+        for number in range(5):
+            author = User.objects.create_user(f'commenter{number}')
+            Comment.objects.create(
+                post=self.post, author=author, text='Комментарий')
+            Post.objects.create(
+                title=f'Пост {number}', text='Текст', author=author,
+                category=self.category, pub_date=timezone.now())
+
+    def test_post_detail(self):
+        with self.assertNumQueries(QueryBudgets.POST_DETAIL):
+            response = self.client.get(
+                reverse('blog:post_detail', args=[self.post.pk]))
+        self.assertContains(response, 'commenter4')
+
+    def test_post_lists(self):
+        routes = [
+            ('blog:index', []),
+            ('blog:popular', []),
+            ('blog:category_posts', [self.category.slug]),
+            ('blog:profile', [self.author.username]),
+        ]
+        for name, args in routes:
+            with self.subTest(name=name), \
+                    CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse(name, args=args))
+            self.assertEqual(response.status_code, 200)
+            self.assertLessEqual(len(queries), QueryBudgets.POST_LIST)
+
+        # Владелец видит все свои посты, а не строки списка автора.
+        for number in range(5):
+            Post.objects.create(
+                title=f'Черновик {number}', text='Текст',
+                author=self.author, category=self.category,
+                pub_date=timezone.now(), is_published=False)
+        self.client.force_login(self.author)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('blog:profile', args=[self.author.username]))
+        self.assertContains(response, 'Черновик 4')
+        self.assertLessEqual(len(queries), QueryBudgets.POST_LIST)
+
+
+class CommentCounterTest(BlogTestCase):
+    """Post.comment_count и рейтинг следуют за комментариями."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.reader)
+
+    def test_add_and_delete(self):
+        self.client.post(reverse('blog:add_comment', args=[self.post.pk]),
+                         {'text': 'Ещё один'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 2)
+        comment = self.post.comments.get(author=self.reader)
+        self.client.post(reverse(
+            'blog:delete_comment', args=[self.post.pk, comment.pk]))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+    def test_commands_fix_drift(self):
+        Post.objects.filter(pk=self.post.pk).update(
+            comment_count=5, hot_score=0)
+        for name in ('recount_comments', 'rescore_posts'):
+            output = StringIO()
+            call_command(name, stdout=output)
+            self.assertIn('исправлено: 1', output.getvalue())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertAlmostEqual(
+            self.post.hot_score,
+            score(self.post.pub_date, [self.comment.created_at]))
+
+    def test_commenter_deleted(self):
+        self.client.post(reverse('blog:add_comment', args=[self.post.pk]),
+                         {'text': 'Ещё один'})
+        with self.captureOnCommitCallbacks(execute=True):
+            self.reader.delete()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+        self.assertAlmostEqual(
+            self.post.hot_score,
+            score(self.post.pub_date, [self.comment.created_at]))
+
+
+class PostIndexTest(BlogTestCase):
+    """Запросы списков постов читают индексы, а не всю таблицу."""
+
+    def assertUsesIndex(self, queryset, name):
+        self.assertIn(name, queryset.explain())
+
+    def test_feed(self):
+        self.assertUsesIndex(
+            Post.published.order_by('-pub_date', '-id')[:10],
+            'post_feed_idx')
+
+    def test_author(self):
+        self.assertUsesIndex(
+            Post.objects.filter(author=self.author)
+            .order_by('-pub_date')[:10],
+            'post_author_date_idx')
+
+
+@override_settings(BLOG_PAGE_CACHE_TIMEOUT=0)
+class PostCardCacheTest(BlogTestCase):
+    """
+    Карточки постов берутся из кэша фрагментов, пока не изменятся
+    пост или связанные с ним объекты. Кэш страниц отключён.
+    """
+
+    def index(self):
+        return self.client.get(reverse('blog:index'))
+
+    def test_post_change(self):
+        self.assertContains(self.index(), 'Пост')
+        # UPDATE без сигналов: карточка остаётся прежней.
+        Post.objects.filter(pk=self.post.pk).update(title='Новое название')
+        self.assertNotContains(self.index(), 'Новое название')
+        self.post.title = 'Новое название'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post.save()
+        self.assertContains(self.index(), 'Новое название')
+
+    def test_related_change(self):
+        self.assertContains(self.index(), '@author')
+        self.author.username = 'writer'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.save()
+        response = self.index()
+        self.assertContains(response, '@writer')
+        self.assertNotContains(response, '@author')
+
+
+class PageCacheTest(BlogTestCase):
+    """Страницы списков отдаются из кэша до изменения контента."""
+
+    def test_cached_until_content_changes(self):
+        url = reverse('blog:index')
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code,
+                304)
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(
+                title='Свежий пост', text='Текст', author=self.author,
+                category=self.category, pub_date=timezone.now())
+        self.assertContains(self.client.get(url), 'Свежий пост')
+
+    @override_settings(BLOG_READ_REPLICAS=['replica_1'])
+    def test_not_stored_while_replicas_lag(self):
+        url = reverse('blog:index')
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(
+                title='Свежий пост', text='Текст', author=self.author,
+                category=self.category, pub_date=timezone.now())
+        # Реплика могла ещё не получить пост: страница не кэшируется.
+        for _ in range(2):
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            self.assertTrue(queries)
+
+        later = time.time() + settings.BLOG_REPLICA_STICKY_SECONDS
+        with mock.patch('blog.cache.time.time', return_value=later):
+            self.client.get(url)
+            with self.assertNumQueries(0):
+                self.client.get(url)
+
+    @override_settings(BLOG_READ_REPLICAS=['replica_1'])
+    def test_sticky_request_stored(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Post.objects.create(
+                title='Свежий пост', text='Текст', author=self.author,
+                category=self.category, pub_date=timezone.now())
+        # «Прилипший» запрос читает основную базу.
+        self.client.cookies[settings.BLOG_REPLICA_STICKY_COOKIE] = '1'
+        url = reverse('blog:index')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            self.client.get(url)
+
+    def test_holes_filled_per_viewer(self):
+        # Автор, читатель и аноним получают одну закэшированную страницу,
+        # но каждый видит только свои действия.
+        clients = {'author': Client(), 'reader': Client(), None: Client()}
+        clients['author'].force_login(self.author)
+        clients['reader'] = Client(enforce_csrf_checks=True)
+        clients['reader'].force_login(self.reader)
+        edit_post = reverse('blog:edit_post', args=[self.post.pk])
+        edit_comment = reverse(
+            'blog:edit_comment', args=[self.post.pk, self.comment.pk])
+        edit_profile = reverse('blog:edit_profile')
+        pages = {
+            reverse('blog:post_detail', args=[self.post.pk]): {
+                'author': {edit_post, edit_comment, 'Оставить комментарий'},
+                'reader': {'Оставить комментарий'},
+                None: set(),
+            },
+            reverse('blog:profile', args=[self.author.username]): {
+                'author': {edit_profile},
+                'reader': set(),
+                None: set(),
+            },
+        }
+        actions = {edit_post, edit_comment, edit_profile,
+                   'Оставить комментарий'}
+        for url, expected in pages.items():
+            for viewer, client in clients.items():
+                with self.subTest(url=url, viewer=viewer), \
+                        CaptureQueriesContext(connection) as queries:
+                    response = client.get(url)
+                content = response.content.decode()
+                if viewer is None:
+                    # Последним страница достаётся из кэша.
+                    self.assertFalse(
+                        [query for query in queries
+                         if 'blog_post' in query['sql']])
+                for action in actions:
+                    self.assertEqual(
+                        action in content, action in expected[viewer],
+                        (viewer, action))
+                menu = (reverse('blog:profile', args=[viewer])
+                        if viewer else reverse('login'))
+                self.assertIn(f'href="{menu}"', content)
+
+        # CSRF-токен формы из закэшированной страницы принимается.
+        reader = clients['reader']
+        with CaptureQueriesContext(connection) as queries:
+            page = reader.get(
+                reverse('blog:post_detail', args=[self.post.pk])).content
+        self.assertFalse(
+            [query for query in queries if 'blog_post' in query['sql']])
+        token = re.search(
+            rb'name="csrfmiddlewaretoken" value="([^"]+)"', page)[1]
+        response = reader.post(
+            reverse('blog:add_comment', args=[self.post.pk]),
+            {'text': 'Из кэша', 'csrfmiddlewaretoken': token.decode()})
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(
+            Comment.objects.filter(author=self.reader, text='Из кэша')
+            .exists())
+
+    def test_timeout_capped_by_scheduled_post(self):
+        Post.objects.create(
+            title='Отложенный', text='Текст', author=self.author,
+            category=self.category,
+            pub_date=timezone.now() + timedelta(minutes=1))
+        version, = get_versions([version_key(*SITE_CONTENT)])
+        self.assertLessEqual(page_timeout(version), 60)
+
+
+class PostVisibilityTest(BlogTestCase):
+    """Страница поста, ещё не видимого в ленте, открыта только автору."""
+
+    def setUp(self):
+        super().setUp()
+        self.scheduled = Post.objects.create(
+            title='Отложенный', text='Текст', author=self.author,
+            category=self.category,
+            pub_date=timezone.now() + timedelta(days=2))
+        self.url = reverse('blog:post_detail', args=[self.scheduled.pk])
+
+    def test_scheduled_post(self):
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_login(self.reader)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+        self.client.force_login(self.author)
+        self.assertContains(self.client.get(self.url), 'Отложенный')
+
+    def test_hidden_category(self):
+        self.category.is_published = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        url = reverse('blog:post_detail', args=[self.post.pk])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_author_page_not_cached(self):
+        # Страница, открытая автором, не попадает в общий кэш.
+        self.client.force_login(self.author)
+        response = self.client.get(self.url)
+        self.assertContains(response, 'Отложенный')
+        self.assertIn('private', response['Cache-Control'])
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    async def test_async_author_page_not_cached(self):
+        author = self.author
+
+        async def auser():
+            return author
+
+        request = AsyncRequestFactory().get(self.url)
+        request.auser = auser
+        response = await async_views.post_detail(
+            request, post_id=self.scheduled.pk)
+        self.assertIn('private', response['Cache-Control'])
+        request = AsyncRequestFactory().get(self.url)
+
+        async def anonymous():
+            return AnonymousUser()
+
+        request.auser = anonymous
+        with self.assertRaises(Http404):
+            await async_views.post_detail(request, post_id=self.scheduled.pk)
+
+    async def test_async_scheduled_post(self):
+        request = AsyncRequestFactory().get(self.url)
+
+        async def auser():
+            return AnonymousUser()
+
+        request.auser = auser
+        with self.assertRaises(Http404):
+            await async_views.post_detail(request, post_id=self.scheduled.pk)
+
+    def test_due_publication_needs_published_category(self):
+        hidden = Category.objects.create(
+            title='Скрытая', slug='hidden', is_published=False)
+        Post.objects.filter(pk=self.scheduled.pk).update(category=hidden)
+        soon = Post.objects.create(
+            title='Скоро', text='Текст', author=self.author,
+            category=hidden, pub_date=timezone.now() + timedelta(hours=1))
+        self.assertIsNone(next_due_publication())
+        hidden.is_published = True
+        hidden.save()
+        self.assertEqual(next_due_publication(), soon.pub_date)
+
+
+@override_settings(BLOG_TASKS_EAGER=True)
+class SearchTest(BlogTestCase):
+    """
+    Полнотекстовый поиск по постам и комментариям.
+    Задачи индексации выполняются сразу после коммита.
+    """
+
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cats = self.create_post('Кошки и собаки', 'Про зверей')
+            self.mention = self.create_post('Другое', 'Упомянуты кошки')
+            self.commented = self.create_post('Третье', 'Ничего')
+            Comment.objects.create(
+                post=self.commented, author=self.reader, text='Люблю кошек')
+
+    def create_post(self, title, text):
+        return Post.objects.create(
+            title=title, text=text, author=self.author,
+            category=self.category, pub_date=timezone.now())
+
+    def test_ranking_and_prefix(self):
+        # Совпадение в заголовке весит больше, чем в тексте.
+        self.assertEqual(search_post_ids('кошки', 10),
+                         [self.cats.pk, self.mention.pk])
+        self.assertEqual(
+            set(search_post_ids('кош', 10)),
+            {self.cats.pk, self.mention.pk, self.commented.pk})
+        self.assertEqual(search_post_ids('" OR *', 10), [])
+
+    def test_page(self):
+        response = self.client.get(reverse('blog:search'), {'q': 'кошки'})
+        self.assertContains(response, 'Кошки и собаки')
+        self.assertNotContains(response, 'Третье')
+
+    def test_delete_and_rebuild(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cats.delete()
+        self.assertEqual(search_post_ids('кошки', 10), [self.mention.pk])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(set(search_post_ids('кош', 10)),
+                         {self.mention.pk, self.commented.pk})
+
+
+class PostApiTest(BlogTestCase):
+    """API постов: курсорные страницы и выбор полей."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.reader)
+        moment = timezone.now()
+        for number in range(25):
+            Post.objects.create(
+                title=f'Пост {number}', text='Текст', author=self.author,
+                category=self.category,
+                pub_date=moment - timedelta(minutes=number + 1))
+        Post.objects.create(
+            title='Отложенный', text='Текст', author=self.author,
+            category=self.category, pub_date=moment + timedelta(days=1))
+
+    def test_cursor_pages(self):
+        url, params = reverse('blog:post-list'), {'fields': 'id,Заголовок'}
+        seen = []
+        while url:
+            # Сессия, пользователь и страница — без COUNT(*).
+            with self.assertNumQueries(3):
+                data = self.client.get(url, params).json()
+            seen += data['results']
+            # Ссылка на следующую страницу уже содержит fields.
+            url, params = data['next'], None
+        self.assertEqual(len(seen), 26)
+        self.assertEqual(set(seen[0]), {'id', 'Заголовок'})
+        self.assertNotIn('Отложенный',
+                         [post['Заголовок'] for post in seen])
+
+    def test_omit_skips_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(
+                reverse('blog:post-list'), {'omit': 'Текст'}).json()
+        self.assertNotIn('"text"', queries[-1]['sql'])
+        self.assertNotIn('Текст', data['results'][0])
+        detail = self.client.get(
+            reverse('blog:post-detail', args=[self.post.pk])).json()
+        self.assertEqual(detail['Текст'], 'Текст')
+
+    def test_unknown_fields(self):
+        for param in ('fields', 'omit'):
+            with self.subTest(param=param):
+                response = self.client.get(
+                    reverse('blog:post-list'), {param: 'id,bogus'})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('Заголовок', response.json()[param])
+
+
+class ExportTest(BlogTestCase):
+    """Потоковая выгрузка постов и её инкрементальный режим."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.reader)
+        self.url = reverse('blog:post-export')
+
+    def export(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_full_export(self):
+        Post.objects.create(
+            title='Отложенный', text='Текст', author=self.author,
+            category=self.category,
+            pub_date=timezone.now() + timedelta(days=1))
+        row, = map(json.loads, self.export())
+        self.assertEqual(row['id'], self.post.pk)
+        self.assertEqual(row['author'], 'author')
+        self.assertFalse(row['deleted'])
+        header, line = self.export(output='csv')
+        self.assertTrue(header.startswith('id,title,text,'))
+        self.assertEqual(
+            self.client.get(self.url, {'since': 'вчера'}).status_code, 400)
+
+    def test_changes_include_hidden_and_deleted(self):
+        since = timezone.now()
+        self.post.is_published = False
+        self.post.save()
+        removed = Post.objects.create(
+            title='Удалённый', text='Текст', author=self.author,
+            category=self.category, pub_date=since)
+        removed_id = removed.pk
+        removed.delete()
+        rows = {row['id']: row
+                for row in map(json.loads, self.export(since=since))}
+        self.assertEqual(set(rows), {self.post.pk, removed_id})
+        self.assertFalse(rows[self.post.pk]['is_visible'])
+        self.assertIsNone(rows[self.post.pk]['text'])
+        self.assertTrue(rows[removed_id]['deleted'])
+        # Выгрузка по дате публикации — только видимые посты.
+        self.assertEqual(
+            self.export(since=since - timedelta(days=1), by='pub_date'), [])
+
+    def test_naive_since(self):
+        # Дата без смещения — в часовом поясе сайта, без RuntimeWarning.
+        since = timezone.localtime() - timedelta(minutes=1)
+        self.post.save()
+        naive = since.replace(tzinfo=None).isoformat()
+        with warnings.catch_warnings():
+            warnings.simplefilter('error', RuntimeWarning)
+            row, = map(json.loads, self.export(since=naive))
+            self.assertEqual(row['id'], self.post.pk)
+            self.assertEqual(self.export(
+                since=(since + timedelta(minutes=2)).replace(
+                    tzinfo=None).isoformat()), [])
+
+    def test_command(self):
+        since = timezone.now()
+        self.post.is_published = False
+        self.post.save()
+        output = StringIO()
+        call_command('export_posts', '--all', '--since', since.isoformat(),
+                     stdout=output)
+        row = json.loads(output.getvalue())
+        self.assertEqual(row['text'], 'Текст')
+        self.assertFalse(row['is_visible'])
+
+
+class MediaTestCase(BlogTestCase):
+    """Загруженные файлы пишутся во временный MEDIA_ROOT."""
+
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        media = override_settings(MEDIA_ROOT=media_root)
+        media.enable()
+        self.addCleanup(media.disable)
+
+    @staticmethod
+    def image_file(color='red', size=(1000, 500), name='image.png'):
+        buffer = BytesIO()
+        Image.new('RGB', size, color).save(buffer, 'PNG')
+        return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+    def upload(self, image):
+        """Создаёт пост с изображением через форму автора."""
+        self.client.force_login(self.author)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('blog:create_post'), {
+                'title': 'С картинкой',
+                'text': 'Текст',
+                'pub_date': '2024-01-01 10:00',
+                'category': self.category.pk,
+                'is_published': 'on',
+                'image': image,
+            })
+        return Post.objects.latest('pk')
+
+
+class ImageVariantTest(MediaTestCase):
+    """Уменьшенные копии изображений строит фоновая задача."""
+
+    def test_variants_built_by_task(self):
+        post = self.upload(self.image_file())
+        self.assertEqual(post.image_variants, {})
+        self.assertIn('blog.process_post_image', self.run_tasks())
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (1000, 500))
+        # Ширины меньше оригинала в WebP и JPEG.
+        self.assertEqual(len(post.image_variants['variants']), 8)
+        response = self.client.get(
+            reverse('blog:post_detail', args=[post.pk]))
+        self.assertContains(response, 'image/webp')
+        self.assertContains(response, '640w')
+        self.assertContains(response, 'width="1000"')
+
+
+class TaskQueueTest(BlogTestCase):
+    """Очередь задач: индексация, ограничение запусков и очистка."""
+
+    def setUp(self):
+        super().setUp()
+        # Задачи индексации поста и комментария из setUpTestData.
+        Task.objects.all().delete()
+
+    def test_search_indexed_by_worker(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            post = Post.objects.create(
+                title='Жирафы', text='Текст', author=self.author,
+                category=self.category, pub_date=timezone.now())
+        self.assertEqual(search_post_ids('жирафы', 10), [])
+        self.assertEqual(self.run_tasks(), ['blog.index_post'])
+        self.assertEqual(search_post_ids('жирафы', 10), [post.pk])
+        Comment.objects.create(post=post, author=self.reader, text='Зебры')
+        self.run_tasks()
+        self.assertEqual(search_post_ids('зебры', 10), [post.pk])
+        # Комментарии удаляются из индекса задачей поста.
+        post.delete()
+        self.assertEqual(self.run_tasks(), ['blog.index_post'])
+        self.assertEqual(search_post_ids('жирафы', 10), [])
+        self.assertEqual(search_post_ids('зебры', 10), [])
+
+    def test_claim_respects_concurrency(self):
+        Task.objects.bulk_create(
+            Task(name='blog.process_post_image', kwargs={'post_id': 0})
+            for _ in range(TaskQueue.WORKERS + 1))
+        self.assertEqual(len(claim(10)), TaskQueue.WORKERS)
+        self.assertEqual(claim(10), [])
+        Task.objects.filter(status=Task.Status.RUNNING).first().delete()
+        self.assertEqual(len(claim(10)), 1)
+
+    def test_worker_purges_done(self):
+        # Срок хранения отсчитывается от завершения, а не от run_after.
+        long_ago = timezone.now() - timedelta(
+            seconds=TaskQueue.KEEP_DONE + 1)
+        old, recent = Task.objects.bulk_create([
+            Task(name='blog.index_post', status=Task.Status.DONE,
+                 run_after=long_ago, finished_at=long_ago),
+            Task(name='blog.index_post', status=Task.Status.DONE,
+                 run_after=long_ago, finished_at=timezone.now()),
+        ])
+        call_command('run_tasks', '--once', stdout=StringIO())
+        self.assertEqual(
+            list(Task.objects.values_list('pk', flat=True)), [recent.pk])
+
+    def test_run_records_finish(self):
+        Task.objects.create(
+            name='blog.index_post', kwargs={'post_id': self.post.pk},
+            run_after=timezone.now() - timedelta(days=2))
+        claimed, = claim(1)
+        self.assertTrue(run(claimed))
+        claimed.refresh_from_db()
+        self.assertEqual(claimed.status, Task.Status.DONE)
+        self.assertGreater(
+            claimed.finished_at, timezone.now() - timedelta(minutes=1))
+
+
+class ContentAddressedStorageTest(MediaTestCase):
+    """Изображения хранятся под хэшем содержимого."""
+
+    def test_same_content_shares_file(self):
+        first = self.upload(self.image_file(name='first.png'))
+        second = self.upload(self.image_file(name='SECOND.PNG'))
+        self.assertEqual(first.image.name, second.image.name)
+        digest = content_digest(first.image.name)
+        self.assertIsNotNone(digest)
+
+        path = first.image.name
+        response = serve_media(RequestFactory().get('/'), path)
+        self.assertIn('immutable', response['Cache-Control'])
+        response = serve_media(
+            RequestFactory().get('/', HTTP_IF_NONE_MATCH=f'"{digest}"'), path)
+        self.assertEqual(response.status_code, 304)
+
+    def test_concurrent_upload_keeps_name(self):
+        storage = Post._meta.get_field('image').storage
+        name = storage.save('posts_images/a.txt', ContentFile(b'data'))
+        exists = storage.exists
+        # Другая загрузка записала файл после проверки в save().
+        checks = iter([False])
+        with mock.patch.object(
+                storage, 'exists',
+                side_effect=lambda path: next(checks, exists(path))):
+            self.assertEqual(
+                storage.save('posts_images/b.txt', ContentFile(b'data')),
+                name)
+
+    def test_delete_orphans(self):
+        post = self.upload(self.image_file())
+        self.run_tasks()
+        post.refresh_from_db()
+        storage = post.image.storage
+        orphan = storage.save(
+            'posts_images/old.png', self.image_file(color='blue'))
+        output = StringIO()
+        call_command('delete_orphan_media', '--grace-period', '0',
+                     stdout=output)
+        self.assertIn('Удалено файлов: 1', output.getvalue())
+        self.assertFalse(storage.exists(orphan))
+        self.assertTrue(storage.exists(post.image.name))
+        for variant in post.image_variants['variants']:
+            self.assertTrue(storage.exists(variant['name']))
+
+
+    def test_reused_orphan_survives(self):
+        storage = Post._meta.get_field('image').storage
+        name = storage.save('posts_images/old.png', self.image_file())
+        aged = time.time() - 2 * MediaCleanup.GRACE_PERIOD
+        os.utime(storage.path(name), (aged, aged))
+        # Та же картинка загружена снова: пост её ещё не сохранил.
+        self.assertEqual(
+            storage.save('posts_images/new.png', self.image_file()), name)
+        output = StringIO()
+        call_command('delete_orphan_media', stdout=output)
+        self.assertIn('Удалено файлов: 0', output.getvalue())
+        self.assertTrue(storage.exists(name))
+
+
+class PrecompressedStaticTest(SimpleTestCase):
+    """Сжатая копия статики выбирается по q из Accept-Encoding."""
+
+    def setUp(self):
+        static_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, static_root)
+        for suffix in ('', '.gz', '.br'):
+            with open(f'{static_root}/app.0123456789ab.css{suffix}',
+                      'w') as file:
+                file.write('body {}')
+        static = override_settings(
+            DEBUG=False, BLOG_SERVE_STATIC=True, STATIC_ROOT=static_root,
+            STATIC_URL='/static/')
+        static.enable()
+        self.addCleanup(static.disable)
+
+    def encoding(self, accept_encoding):
+        middleware = PrecompressedStaticMiddleware(lambda request: None)
+        response = middleware(RequestFactory().get(
+            '/static/app.0123456789ab.css',
+            HTTP_ACCEPT_ENCODING=accept_encoding))
+        response.close()
+        return response.get('Content-Encoding')
+
+    def test_qvalues(self):
+        for accept_encoding, expected in (
+                ('br, gzip', 'br'),
+                ('gzip, br;q=0', 'gzip'),
+                ('br;q=0.5, gzip', 'gzip'),
+                ('gzip;q=0, br;q=0', None),
+                ('gzip;q=0', None),
+                ('identity', None),
+                ('*', 'br'),
+                ('*;q=0.5, br;q=0', 'gzip'),
+        ):
+            with self.subTest(accept_encoding=accept_encoding):
+                self.assertEqual(self.encoding(accept_encoding), expected)
+
+    def test_not_used_with_debug(self):
+        with self.settings(DEBUG=True), self.assertRaises(MiddlewareNotUsed):
+            PrecompressedStaticMiddleware(lambda request: None)
+
+
+class BenchmarkTest(BlogTestCase):
+    """Бюджеты маршрутов в benchmarks/budgets.json."""
+
+    def setUp(self):
+        super().setUp()
+        with open(BUDGETS, encoding='utf-8') as file:
+            self.budgets = json.load(file)
+
+    def test_route_names(self):
+        names = route_names()
+        self.assertIn('blog:post_detail', names)
+        self.assertIn('pages:about', names)
+        self.assertFalse({name for name in names
+                          if not name.startswith(('blog:', 'pages:'))})
+        self.assertEqual(
+            {key.split()[0] for key in self.budgets}, names)
+
+    def test_check_budgets(self):
+        budgets = {
+            'blog:index': {'queries': 3, 'p95': 50.0},
+            'blog:popular': {'queries': 3, 'p95': 50.0},
+        }
+        report = {'blog:index': {'queries': 4, 'p95': 60.0}}
+        self.assertEqual(check_budgets(report, budgets), [
+            'blog:index: queries = 4 > 3',
+            'blog:index: p95 = 60.0 > 50.0',
+            'blog:popular: маршрут не замерялся',
+        ])
+        self.assertEqual(check_budgets(report, budgets, ('queries',)), [
+            'blog:index: queries = 4 > 3',
+            'blog:popular: маршрут не замерялся',
+        ])
+
+    def test_record_budgets(self):
+        report = {
+            'blog:index': {'queries': 3, 'p95': 40.0, 'p50': 20.0},
+            'pages:about': {'queries': 0, 'p95': 1.0, 'p50': 1.0},
+        }
+        self.assertEqual(record_budgets(report, headroom=2, floor=10), {
+            'blog:index': {'queries': 3, 'p95': 80.0},
+            'pages:about': {'queries': 0, 'p95': 10},
+        })
+
+    def test_query_budgets_independent_of_data_size(self):
+        # Бюджеты записаны на Benchmarks.DATASET, а здесь постов
+        # единицы: число запросов должно уложиться. Исключение —
+        # удаление поста: каскад удаляет комментарии пачками по 100,
+        # у замеряемого поста эталонных данных их от 200 до 300.
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.reader, text='Ещё')
+            for _ in range(250))
+        report = measure_routes(build_routes(), repeat=1)
+        # В транзакции теста изменяющий запрос откатывается к точке
+        # сохранения: SAVEPOINT, ROLLBACK TO и RELEASE вместо
+        # BEGIN и ROLLBACK.
+        budgets = {
+            key: {'queries': limits['queries'] + (' ' in key)}
+            for key, limits in self.budgets.items()
+        }
+        self.assertEqual(check_budgets(report, budgets), [])
+
+
+@override_settings(BLOG_INSTRUMENTATION=True, BLOG_SIMILAR_QUERIES=3)
+class InstrumentationTest(BlogTestCase):
+    """Server-Timing, повторы SQL и статистика по представлениям."""
+
+    def setUp(self):
+        super().setUp()
+        stats.reset()
+        self.addCleanup(stats.reset)
+
+    def test_server_timing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(
+                reverse('blog:post_detail', args=[self.post.pk]))
+        timing = response['Server-Timing']
+        self.assertIn('db;dur=', timing)
+        self.assertIn(f'desc="{len(queries)} queries"', timing)
+        self.assertRegex(timing, r'tpl;dur=(?!0\.00)')
+        self.assertIn('total;dur=', timing)
+        view_stats = stats.snapshot()['blog:post_detail']
+        self.assertEqual(view_stats['count'], 1)
+        self.assertEqual(view_stats['max_queries'], len(queries))
+        self.assertEqual(sum(view_stats['histogram_ms'].values()), 1)
+
+    async def test_server_timing_async(self):
+        response = await self.async_client.get(reverse('pages:about'))
+        self.assertIn('total;dur=', response['Server-Timing'])
+        self.assertEqual(stats.snapshot()['pages:about']['count'], 1)
+
+    def test_repeated_queries(self):
+        metrics = RequestMetrics()
+        for params in [(1,), (1,), (2,), ('x',)]:
+            metrics.execute(
+                lambda *args: None, 'SELECT %s', params, False, {})
+        for _ in range(2):
+            metrics.execute(
+                lambda *args: None, 'SAVEPOINT "s1"', None, False, {})
+        self.assertEqual(metrics.queries, 6)
+        self.assertEqual(metrics.duplicates(), {'SELECT %s': 2})
+        self.assertEqual(metrics.similar(), {'SELECT %s': 3})
+
+    def test_stats_page(self):
+        self.client.get(reverse('blog:index'))
+        url = reverse('request_stats')
+        self.client.force_login(self.reader)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        staff = User.objects.create_user('staff', is_staff=True)
+        self.client.force_login(staff)
+        self.assertEqual(
+            self.client.get(url).json()['blog:index']['count'], 1)
+        self.client.post(url, {'reset': 1})
+        self.assertNotIn('blog:index', stats.snapshot())
+
+    def test_not_used_when_disabled(self):
+        with self.settings(BLOG_INSTRUMENTATION=False), \
+                self.assertRaises(MiddlewareNotUsed):
+            RequestMetricsMiddleware(lambda request: None)
+
+
+class SeedingTest(BlogTestCase):
+    """Синтетические данные согласованы так же, как созданные через ORM."""
+
+    def seed(self, **options):
+        output = StringIO()
+        call_command(
+            'seed_blog', users=20, categories=5, locations=5,
+            batch_size=64, workers=1, stdout=output, **options)
+        return output.getvalue()
+
+    def test_seed_blog(self):
+        output = self.seed(posts=300, comments=900)
+        self.assertIn('Создано постов: 300, комментариев: 900', output)
+        self.assertEqual(
+            User.objects.filter(username__startswith='seed_').count(), 20)
+        self.assertEqual(
+            Category.objects.filter(slug__startswith='seed-').count(), 5)
+        self.assertEqual(Post.objects.count(), 301)
+        self.assertEqual(Comment.objects.count(), 901)
+        # Справочники не дублируются при повторном запуске.
+        self.seed(posts=10, comments=0)
+        self.assertEqual(
+            User.objects.filter(username__startswith='seed_').count(), 20)
+
+        now = timezone.now()
+        for post in Post.objects.select_related('category'):
+            self.assertEqual(post.is_visible, (
+                post.is_published and post.pub_date <= now
+                and post.category.is_published), post.pk)
+        self.assertFalse(Comment.objects.filter(post__is_visible=False))
+        # Рейтинг поста из setUpTestData не учитывает его комментарий.
+        post_ids = Post.objects.exclude(pk=self.post.pk).values_list(
+            'pk', flat=True)
+        self.assertEqual(recount_comments(post_ids), 0)
+        self.assertEqual(rescore_posts(post_ids), 0)
+
+        listings = set(PostListing.objects.values_list(
+            'kind', 'owner_id', 'pub_date', 'post_id'))
+        rebuild_listings()
+        self.assertEqual(listings, set(PostListing.objects.values_list(
+            'kind', 'owner_id', 'pub_date', 'post_id')))
+
+    def test_same_rows_for_any_workers(self):
+        context = {
+            'seed': 7,
+            'template': load_template(),
+            'start': timezone.now(),
+            'authors': [1, 2, 3],
+            'weights': zipf_weights(3, 0.9),
+            'categories': {1: True, 2: False},
+            'category_ids': [1, 2],
+            'location_ids': [None],
+        }
+
+        def rows(workers):
+            return [row for batch in generate_batches(
+                generate_posts, context, 50, 16, workers) for row in batch]
+
+        self.assertEqual(len(rows(1)), 50)
+        self.assertEqual(rows(1), rows(2))
+
+
+class WriteRetryTest(TransactionTestCase):
+    """
+    Повторы записи при блокировке SQLite. В транзакции TestCase
+    run_write не повторяет, поэтому здесь TransactionTestCase.
+    """
+
+    def setUp(self):
+        patcher = mock.patch('blog.writes.time.sleep')
+        self.sleep = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def flaky(self, failures, error='database is locked'):
+        """Функция записи, падающая failures раз."""
+        calls = []
+
+        def write(title):
+            calls.append(title)
+            Category.objects.create(title=title, slug=f'slug-{len(calls)}')
+            on_commit(lambda: self.committed.append(len(calls)))
+            if len(calls) <= failures:
+                raise OperationalError(error)
+            return len(calls)
+
+        self.committed = []
+        return write, calls
+
+    def test_wal_pragmas(self):
+        options = settings.DATABASES['default']['OPTIONS']
+        with tempfile.TemporaryDirectory() as directory:
+            database = sqlite3.connect(f'{directory}/db.sqlite3')
+            try:
+                database.executescript(options['init_command'])
+                self.assertEqual(database.execute(
+                    'PRAGMA journal_mode').fetchone()[0], 'wal')
+            finally:
+                database.close()
+        self.assertEqual(options['transaction_mode'], 'IMMEDIATE')
+
+    def test_retries_locked(self):
+        write, calls = self.flaky(2)
+        self.assertEqual(run_write(write, 'Категория'), 3)
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(self.sleep.call_count, 2)
+        # Откаченные попытки не оставили ни строк, ни обработчиков.
+        self.assertEqual(Category.objects.count(), 1)
+        self.assertEqual(self.committed, [3])
+
+    def test_gives_up(self):
+        write, calls = self.flaky(5)
+        with self.assertRaises(OperationalError):
+            run_write(write, 'Категория', attempts=3)
+        self.assertEqual(len(calls), 3)
+        self.assertFalse(Category.objects.exists())
+
+    def test_other_errors_not_retried(self):
+        write, calls = self.flaky(1, 'no such table: x')
+        with self.assertRaises(OperationalError):
+            run_write(write, 'Категория')
+        self.assertEqual(len(calls), 1)
+
+    def test_side_effects_not_retried(self):
+        calls = []
+
+        def write():
+            calls.append(1)
+            Category.objects.create(title='Категория', slug='slug')
+            on_commit(failing_bump)
+
+        def failing_bump():
+            raise OperationalError('database is locked')
+
+        with self.assertRaises(OperationalError):
+            run_write(write)
+        # Запись уже зафиксирована: ошибка кэша её не повторяет.
+        self.assertEqual(calls, [1])
+        self.assertTrue(Category.objects.exists())
+
+    def test_nested(self):
+        def outer():
+            Category.objects.create(title='Внешняя', slug='outer')
+            return run_write(inner)
+
+        def inner():
+            Category.objects.create(title='Вложенная', slug='inner')
+            return 'ok'
+
+        results = []
+        thread = threading.Thread(
+            target=lambda: results.append(run_write(outer)))
+        thread.start()
+        thread.join(10)
+        self.assertFalse(thread.is_alive(), 'вложенный run_write завис')
+        self.assertEqual(results, ['ok'])
+        self.assertEqual(Category.objects.count(), 2)
+
+
+@override_settings(BLOG_READ_REPLICAS=['replica_1'])
+class ReplicaRouterTest(SimpleTestCase):
+    """Чтения из реплик только внутри replica_reads()."""
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def test_reads_outside_scope_use_primary(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        # Запись вне области не «прилипает» к потоку навсегда.
+        self.router.db_for_write(Post)
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Post), 'replica_1')
+
+    def test_write_pins_until_scope_ends(self):
+        with replica_reads() as wrote:
+            self.assertEqual(self.router.db_for_read(Post), 'replica_1')
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertEqual(wrote, [True])
+        with replica_reads():
+            self.assertEqual(self.router.db_for_read(Post), 'replica_1')
+        with replica_reads(pin=True):
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+
+
+@override_settings(CACHES={'default': {
+    'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+    'LOCATION': 'blog_test_cache',
+}})
+class AsyncDatabaseCacheTest(BlogTestCase):
+    """
+    Асинхронные страницы с кэшем в базе: синхронное обращение
+    к такому кэшу из цикла событий запрещено.
+    """
+
+    def setUp(self):
+        call_command('createcachetable', verbosity=0)
+        super().setUp()
+
+    async def get(self, view, *args, **kwargs):
+        request = AsyncRequestFactory().get('/')
+
+        async def auser():
+            return AnonymousUser()
+
+        request.auser = auser
+        return await view(request, *args, **kwargs)
+
+    async def test_index(self):
+        # Без кэша страниц: карточка рендерится, затем берётся из кэша.
+        with self.settings(BLOG_PAGE_CACHE_TIMEOUT=0):
+            for _ in range(2):
+                response = await self.get(async_views.index)
+                self.assertContains(response, self.post.title)
+        post = await Post.published.aget(pk=self.post.pk)
+        await aload_post_cards([post])
+        self.assertIn(self.post.title, post.card['html'])
+        # Страница сохраняется в кэш и отдаётся из него.
+        for _ in range(2):
+            response = await self.get(async_views.index)
+            self.assertContains(response, self.post.title)
+
+    async def test_category_and_profile(self):
+        response = await self.get(
+            async_views.category_posts, category_slug=self.category.slug)
+        self.assertContains(response, self.post.title)
+        response = await self.get(
+            async_views.profile, username=self.author.username)
+        self.assertContains(response, self.post.title)
+
+
+class AuthorRequiredTest(BlogTestCase):
+    """Чужие посты и комментарии: один запрос на проверку и отказ."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.reader)
+
+    def test_edit_post_redirects(self):
+        url = reverse('blog:post_detail', args=[self.post.pk])
+        with self.assertNumQueries(3):
+            response = self.client.post(
+                reverse('blog:edit_post', args=[self.post.pk]))
+        self.assertRedirects(response, url)
+
+    def test_delete_post_not_found(self):
+        with self.assertNumQueries(3):
+            response = self.client.post(
+                reverse('blog:delete_post', args=[self.post.pk]))
+        self.assertEqual(response.status_code, 404)
+        self.assertTrue(Post.objects.filter(pk=self.post.pk).exists())
+
+    def test_comment_forbidden(self):
+        args = [self.post.pk, self.comment.pk]
+        for name in ('blog:edit_comment', 'blog:delete_comment'):
+            with self.subTest(name=name), self.assertNumQueries(3):
+                response = self.client.post(reverse(name, args=args))
+            self.assertEqual(response.status_code, 403)
+        self.assertTrue(Comment.objects.filter(pk=self.comment.pk).exists())
+
+    def test_anonymous_redirected_to_login(self):
+        self.client.logout()
+        response = self.client.get(
+            reverse('blog:edit_post', args=[self.post.pk]))
+        self.assertEqual(response.status_code, 302)
+        self.assertIn('?next=', response['Location'])
+
+
+class PostListingTest(BlogTestCase):
+    """Материализованные списки следуют за видимостью постов."""
+
+    def listed(self, kind, owner_id):
+        return set(
+            PostListing.objects.filter(kind=kind, owner_id=owner_id)
+            .values_list('post_id', flat=True))
+
+    def test_save_and_delete(self):
+        Kind = PostListing.Kind
+        self.assertEqual(self.listed(Kind.CATEGORY, self.category.pk),
+                         {self.post.pk})
+        self.assertEqual(self.listed(Kind.AUTHOR, self.author.pk),
+                         {self.post.pk})
+        self.post.author = self.reader
+        self.post.save()
+        self.assertEqual(self.listed(Kind.AUTHOR, self.author.pk), set())
+        self.assertEqual(self.listed(Kind.AUTHOR, self.reader.pk),
+                         {self.post.pk})
+        self.post.is_published = False
+        self.post.save()
+        self.assertFalse(PostListing.objects.exists())
+        self.post.is_published = True
+        self.post.save()
+        self.post.delete()
+        self.assertFalse(PostListing.objects.exists())
+
+    def test_scheduler_and_category(self):
+        moment = timezone.now() + timedelta(hours=1)
+        scheduled = Post.objects.create(
+            title='Отложенный', text='Текст', author=self.author,
+            category=self.category, pub_date=moment)
+        category = PostListing.Kind.CATEGORY, self.category.pk
+        self.assertEqual(self.listed(*category), {self.post.pk})
+        with self.captureOnCommitCallbacks(execute=True):
+            publish_due_posts(moment)
+        self.assertEqual(self.listed(*category),
+                         {self.post.pk, scheduled.pk})
+        self.category.is_published = False
+        with self.captureOnCommitCallbacks(execute=True):
+            self.category.save()
+        self.assertFalse(PostListing.objects.exists())
+
+    def test_category_page(self):
+        Post.objects.create(
+            title='Скрытый', text='Текст', author=self.author,
+            category=self.category, pub_date=timezone.now(),
+            is_published=False)
+        response = self.client.get(
+            reverse('blog:category_posts', args=[self.category.slug]))
+        self.assertEqual(list(response.context['page_obj']), [self.post])
+
+
+class HotRankingTest(BlogTestCase):
+    """Рейтинг популярности сдвигается комментариями без пересчёта."""
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.reader)
+        moment = timezone.now()
+        self.older = Post.objects.create(
+            title='Вчерашний', text='Текст', author=self.author,
+            category=self.category, pub_date=moment - timedelta(hours=6))
+        self.newer = Post.objects.create(
+            title='Свежий', text='Текст', author=self.author,
+            category=self.category, pub_date=moment)
+
+    def popular(self):
+        response = self.client.get(reverse('blog:popular'))
+        return [post for post in response.context['page_obj']
+                if post in (self.older, self.newer)]
+
+    def test_comments_shift_score(self):
+        self.assertAlmostEqual(
+            self.older.hot_score, activity(self.older.pub_date))
+        self.assertEqual(self.popular(), [self.newer, self.older])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('blog:add_comment', args=[self.older.pk]),
+                {'text': 'Обсуждаем'})
+        comment = self.older.comments.get()
+        self.older.refresh_from_db()
+        self.assertAlmostEqual(
+            self.older.hot_score,
+            score(self.older.pub_date, [comment.created_at]))
+        self.assertEqual(rescore_posts([self.older.pk]), 0)
+        self.assertEqual(self.popular(), [self.older, self.newer])
+
+        self.client.post(reverse(
+            'blog:delete_comment', args=[self.older.pk, comment.pk]))
+        self.older.refresh_from_db()
+        self.assertAlmostEqual(
+            self.older.hot_score, activity(self.older.pub_date))
+
+    def test_edit_moves_publication(self):
+        self.client.force_login(self.author)
+        self.client.post(reverse('blog:edit_post', args=[self.older.pk]), {
+            'title': 'Вчерашний',
+            'text': 'Текст',
+            'pub_date': '2024-01-01 10:00',
+            'category': self.category.pk,
+            'is_published': 'on',
+        })
+        self.older.refresh_from_db()
+        self.assertAlmostEqual(
+            self.older.hot_score, activity(self.older.pub_date))
+
+    def test_admin_changelist_save(self):
+        # В списке постов админки редактируется только is_published.
+        admin_user = User.objects.create_superuser('admin')
+        self.client.force_login(admin_user)
+        posts = list(Post.objects.order_by('-pub_date', '-pk'))
+        data = {
+            'form-TOTAL_FORMS': len(posts),
+            'form-INITIAL_FORMS': len(posts),
+            '_save': 'Сохранить',
+        }
+        for index, post in enumerate(posts):
+            data[f'form-{index}-id'] = post.pk
+            if post != self.older:
+                data[f'form-{index}-is_published'] = 'on'
+        response = self.client.post(
+            reverse('admin:blog_post_changelist'), data)
+        self.assertEqual(response.status_code, 302)
+        self.older.refresh_from_db()
+        self.assertFalse(self.older.is_published)
+        self.assertAlmostEqual(
+            self.older.hot_score, activity(self.older.pub_date))
+
+    def test_rescore_fixes_drift(self):
+        Post.objects.filter(pk=self.older.pk).update(hot_score=0)
+        self.assertEqual(rescore_posts([self.older.pk, self.newer.pk]), 1)
+        self.older.refresh_from_db()
+        self.assertAlmostEqual(
+            self.older.hot_score, activity(self.older.pub_date))
+
+
+class ViewCounterTest(BlogTestCase):
+    """Просмотры копятся в памяти и записываются пачкой."""
+
+    def test_cached_views_counted(self):
+        url = reverse('blog:post_detail', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        # Повторы отдаются из кэша страниц, в том числе как 304.
+        self.client.get(url)
+        self.assertEqual(
+            self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 0)
+        self.assertEqual(view_counts.flush(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 3)
+
+    def test_flush_groups_by_delta(self):
+        other, third = (
+            Post.objects.create(
+                title=title, text='Текст', author=self.author,
+                category=self.category, pub_date=timezone.now())
+            for title in ('Другой', 'Третий'))
+        for post_id in (self.post.pk, self.post.pk, other.pk, other.pk):
+            view_counts.record(post_id)
+        # Просмотр из другого потока попадает в его осколок.
+        thread = threading.Thread(target=view_counts.record, args=(third.pk,))
+        thread.start()
+        thread.join()
+        # UPDATE на каждое приращение (2 и 1) под SAVEPOINT/RELEASE.
+        with self.assertNumQueries(4):
+            self.assertEqual(view_counts.flush(), 3)
+        self.assertEqual(
+            dict(Post.objects.values_list('pk', 'view_count')),
+            {self.post.pk: 2, other.pk: 2, third.pk: 1})
+        self.assertEqual(view_counts.flush(), 0)
+
+    def test_failed_flush_keeps_views(self):
+        view_counts.record(self.post.pk)
+        with mock.patch('blog.counters.run_write',
+                        side_effect=DatabaseError), \
+                self.assertLogs('blog.counters', 'ERROR'):
+            self.assertEqual(view_counts.flush(), 0)
+        self.assertEqual(view_counts.flush(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.view_count, 1)
+
+    def test_api_and_card(self):
+        Post.objects.filter(pk=self.post.pk).update(view_count=7)
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse('blog:post-detail',
+                                           args=[self.post.pk]))
+        self.assertEqual(response.json()['Просмотры'], 7)
+        self.assertContains(self.client.get(reverse('blog:index')),
+                            'Просмотры: 7')
+
+
+@override_settings(BLOG_CURSOR_PAGINATION=True)
+class CursorPaginationTest(BlogTestCase):
+    """Курсорная пагинация и разбор курсоров из адреса."""
+
+    def setUp(self):
+        super().setUp()
+        moment = timezone.now() - timedelta(hours=1)
+        for number in range(4):
+            Post.objects.create(
+                title=f'Пост {number}', text='Текст', author=self.author,
+                category=self.category, pub_date=moment)
+        self.posts = list(Post.published.order_by('-pub_date', '-id'))
+
+    def test_round_trip(self):
+        paginator = CursorPaginator(Post.published.all(), 2)
+        first = paginator.get_page()
+        self.assertEqual(list(first), self.posts[:2])
+        self.assertFalse(first.has_previous())
+        second = paginator.get_page(first.next_cursor)
+        self.assertEqual(list(second), self.posts[2:4])
+        self.assertEqual(list(paginator.get_page(second.previous_cursor)),
+                         self.posts[:2])
+        last = paginator.get_page(second.next_cursor)
+        self.assertEqual(list(last), self.posts[4:])
+        self.assertFalse(last.has_next())
+
+    def test_listing_round_trip(self):
+        paginator = CursorPaginator(
+            listing(PostListing.Kind.AUTHOR, self.author.pk), 3,
+            fields=LISTING_FIELDS)
+        first = paginator.get_page()
+        second = paginator.get_page(first.next_cursor)
+        self.assertEqual(
+            [row.post_id for row in [*first, *second]],
+            [post.pk for post in self.posts])
+
+    def test_setting_read_per_request(self):
+        url = reverse('blog:index')
+        self.assertTrue(self.client.get(url).context['page_obj'].is_cursor)
+        with self.settings(BLOG_CURSOR_PAGINATION=False):
+            response = self.client.get(url, {'page': 1})
+        self.assertFalse(hasattr(response.context['page_obj'], 'is_cursor'))
+
+    def test_malformed_cursor_is_first_page(self):
+        moment = self.posts[0].pub_date.isoformat()
+        payloads = [
+            {'v': [1, 2]},
+            {'v': [[1], 2]},
+            {'v': [moment, moment]},
+            {'v': [moment, None]},
+            {'v': moment},
+            ['v'],
+        ]
+        cursors = ['не base64', 'e30', *(
+            base64.urlsafe_b64encode(json.dumps(payload).encode()).decode()
+            for payload in payloads)]
+        for cursor in cursors:
+            with self.subTest(cursor=cursor):
+                response = self.client.get(
+                    reverse('blog:index'), {'cursor': cursor})
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(list(response.context['page_obj']),
+                                 self.posts)
+        self.assertEqual(
+            list(self.client.get(reverse('blog:index'), {
+                'cursor': encode_cursor([self.posts[1].pub_date,
+                                         self.posts[1].pk]),
+            }).context['page_obj']),
+            self.posts[2:])
@@ -1,10 +1,13 @@
 from rest_framework.routers import DefaultRouter
 
+from django.conf import settings
 from django.urls import path, include
 
+from . import async_views
 from .api_views import PostViewSet
 from .views import (
     IndexView,
+    PopularView,
     PostDetailView,
     CategoryPostListView,
     UserProfileView,
@@ -15,21 +18,36 @@ from .views import (
     DeletePostView,
     AddCommentView,
     EditProfileView,
-    UserPostListView
+    UserPostListView,
+    SearchView
 )
 
+# Под ASGI публичные страницы можно отдавать асинхронными представлениями.
+if settings.BLOG_ASYNC_VIEWS:
+    index_view = async_views.index
+    post_detail_view = async_views.post_detail
+    category_posts_view = async_views.category_posts
+    profile_view = async_views.profile
+else:
+    index_view = IndexView.as_view()
+    post_detail_view = PostDetailView.as_view()
+    category_posts_view = CategoryPostListView.as_view()
+    profile_view = UserProfileView.as_view()
+
 router = DefaultRouter()
 router.register(r'posts', PostViewSet)
 app_name = 'blog'
 
 urlpatterns = [
-    path('', IndexView.as_view(), name='index'),
+    path('', index_view, name='index'),
+    path('popular/', PopularView.as_view(), name='popular'),
+    path('search/', SearchView.as_view(), name='search'),
 
     # Посты
     path('posts/create/',
          CreatePostView.as_view(), name='create_post'),
     path('posts/<int:post_id>/',
-         PostDetailView.as_view(), name='post_detail'),
+         post_detail_view, name='post_detail'),
     path('posts/<int:post_id>/edit/',
          PostEditView.as_view(), name='edit_post'),
     path('posts/<int:post_id>/delete/',
@@ -45,13 +63,13 @@ urlpatterns = [
 
     # Категории
     path('category/<slug:category_slug>/',
-         CategoryPostListView.as_view(), name='category_posts'),
+         category_posts_view, name='category_posts'),
 
     # Профиль пользователя
     path('profile/edit/',
          EditProfileView.as_view(), name='edit_profile'),
     path('profile/<str:username>/',
-         UserProfileView.as_view(), name='profile'),
+         profile_view, name='profile'),
     path('user/<str:username>/',
          UserPostListView.as_view(), name='user_posts'),
     # REST API
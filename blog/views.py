@@ -1,28 +1,130 @@
+from django.conf import settings
+from django.http import Http404, HttpResponseNotModified
 from django.utils import timezone
 from django.shortcuts import get_object_or_404, redirect, render
 from django.contrib.auth import get_user_model
-from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
+from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import (
     ListView, DetailView, CreateView, UpdateView, View, DeleteView
 )
 from django.urls import reverse
+from django.utils.cache import patch_cache_control
+from django.utils.http import parse_etags, quote_etag, urlencode
+from django.views.static import serve
+from django.utils.decorators import method_decorator
 from django.core.paginator import Paginator
-from django.db.models import Q, Count
+from django.db import transaction
+from django.db.models import Q, Prefetch
 
-from .models import Category, Post, Comment
+from .listings import LISTING_FIELDS, attach_posts, listing
+from .models import Category, Post, Comment, PostListing
 from .forms import UserEditForm, PostForm, CommentForm
-from .constants import PostLimits
+from .cache import cache_shared_page, profile_owner
+from .constants import PostLimits, SearchLimits
+from .counters import count_views
+from .paginators import CursorPaginator
+from .ranking import with_event, without_event
+from .search import search_post_ids
+from .storage import content_digest
+from .services import change_comment_count, move_publication
+from .writes import serialized_write
 
 User = get_user_model()
 
 
-def paginate(request, queryset, per_page=PostLimits.LATEST_POSTS_COUNT):
-    """Универсальная функция пагинации."""
+def paginate(request, queryset, per_page=PostLimits.LATEST_POSTS_COUNT,
+             cursor=False, count_cache_key=None, fields=None):
+    """
+    Универсальная функция пагинации.
+    При cursor=True используется пагинация по ключу (pub_date, id)
+    или по полям fields с токенами в параметре ?cursor=,
+    иначе — постраничная ?page=.
+    """
+    if cursor:
+        paginator = CursorPaginator(
+            queryset, per_page, count_cache_key=count_cache_key,
+            fields=fields)
+        return paginator.get_page(request.GET.get('cursor'))
     paginator = Paginator(queryset, per_page)
     page_number = request.GET.get('page')
     return paginator.get_page(page_number)
 
 
+class CursorPaginationMixin:
+    """
+    Миксин для включения курсорной пагинации в списках постов.
+    По умолчанию режим берётся из настройки BLOG_CURSOR_PAGINATION.
+    """
+
+    cursor_fields = None
+    """Ключ курсора, если порядок не (pub_date, id)."""
+
+    @property
+    def cursor_pagination(self):
+        """Режим читается при каждом запросе, как в async_views."""
+        return settings.BLOG_CURSOR_PAGINATION
+
+    def get_count_cache_key(self):
+        """Ключ кэша для общего числа постов; None — не считать."""
+        return None
+
+    def paginate_posts(self, queryset):
+        return paginate(
+            self.request, queryset,
+            cursor=self.cursor_pagination,
+            count_cache_key=self.get_count_cache_key(),
+            fields=self.cursor_fields,
+        )
+
+    def paginate_listing(self, kind, owner_id):
+        """Страница материализованного списка постов (blog.listings)."""
+        page = paginate(
+            self.request, listing(kind, owner_id),
+            cursor=self.cursor_pagination,
+            fields=LISTING_FIELDS,
+        )
+        return attach_posts(page)
+
+
+class AuthorRequiredMixin(LoginRequiredMixin):
+    """
+    Доступ только к объектам текущего пользователя.
+    Объект загружается одним запросом с условием author=request.user —
+    это и проверка прав, и выборка — и запоминается на представлении:
+    повторные get_object() в UpdateView/DeleteView и в шаблонных
+    миксинах к базе не обращаются.
+    Чужой или несуществующий объект передаётся в handle_not_author().
+    """
+
+    author_related = ()
+    """Связанные объекты, загружаемые вместе с объектом (select_related)."""
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return self.handle_no_permission()
+        try:
+            self.get_object()
+        except Http404:
+            return self.handle_not_author()
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_queryset(self):
+        queryset = super().get_queryset().filter(author=self.request.user)
+        if self.author_related:
+            queryset = queryset.select_related(*self.author_related)
+        return queryset
+
+    def get_object(self, queryset=None):
+        if queryset is not None:
+            return super().get_object(queryset)
+        if not hasattr(self, '_author_object'):
+            self._author_object = super().get_object()
+        return self._author_object
+
+    def handle_not_author(self):
+        return self.handle_no_permission()
+
+
 class CommentContextMixin:
     """Миксин для добавления комментария в контекст шаблона."""
 
@@ -32,7 +134,8 @@ class CommentContextMixin:
         return context
 
 
-class IndexView(ListView):
+@method_decorator(cache_shared_page, name='dispatch')
+class IndexView(CursorPaginationMixin, ListView):
     """
     Главная страница с последними опубликованными постами,
     отсортированными по дате публикации (от новых к старым).
@@ -45,18 +148,50 @@ class IndexView(ListView):
 
     def get_queryset(self):
         """
-        Получить опубликованные посты
-        с аннотацией количества комментариев,
+        Получить опубликованные посты,
         отсортированные по убыванию даты публикации.
+        Количество комментариев хранится в поле Post.comment_count.
+        """
+        return Post.published.order_by('-pub_date')
+
+    def get_count_cache_key(self):
+        return 'blog:index:count'
+
+    def paginate_queryset(self, queryset, page_size):
         """
-        return Post.published.annotate(
-            comment_count=Count('comments')).order_by('-pub_date')
+        В курсорном режиме обходим Paginator с его COUNT(*) и OFFSET.
+        Вместо списка объектов отдаём саму страницу, чтобы в шаблоне
+        под именем page_obj были доступны курсоры.
+        """
+        if not self.cursor_pagination:
+            return super().paginate_queryset(queryset, page_size)
+        page = self.paginate_posts(queryset)
+        return page.paginator, page, page, page.has_other_pages()
+
+
+class PopularView(IndexView):
+    """
+    Популярные посты: по убыванию рейтинга Post.hot_score,
+    который обновляется при добавлении и удалении комментариев.
+    Страница читает готовый индекс и стоит столько же, сколько лента.
+    Кэш страниц унаследован от IndexView.dispatch.
+    """
+
+    template_name = 'blog/popular.html'
+    cursor_fields = ('hot_score', 'id')
+
+    def get_queryset(self):
+        return Post.published.order_by('-hot_score', '-id')
+
+    def get_count_cache_key(self):
+        return None
 
 
 # =================================
 # Все, связанное с пользователем.
 # =================================
-class UserProfileView(View):
+@method_decorator(cache_shared_page(vary=profile_owner), name='dispatch')
+class UserProfileView(CursorPaginationMixin, View):
     """
     Профиль пользователя с его постами.
     Если текущий пользователь — владелец профиля, показываем все посты,
@@ -67,18 +202,15 @@ class UserProfileView(View):
         profile_user = get_object_or_404(User, username=username)
 
         if request.user == profile_user:
-            queryset = Post.objects
+            page_obj = self.paginate_posts(
+                Post.objects
+                .select_related('author', 'category', 'location')
+                .filter(author=profile_user)
+                .order_by('-pub_date')
+            )
         else:
-            queryset = Post.published
-
-        post_list = (
-            queryset
-            .filter(author=profile_user)
-            .annotate(comment_count=Count('comments'))
-            .order_by('-pub_date')
-        )
-
-        page_obj = paginate(request, post_list)
+            page_obj = self.paginate_listing(
+                PostListing.Kind.AUTHOR, profile_user.pk)
 
         full_name = profile_user.get_full_name()
         profile_user.get_full_name = (
@@ -93,6 +225,7 @@ class UserProfileView(View):
         })
 
 
+@method_decorator(serialized_write, name='post')
 class EditProfileView(LoginRequiredMixin, UpdateView):
     """
     Представление для редактирования профиля пользователя.
@@ -113,11 +246,15 @@ class EditProfileView(LoginRequiredMixin, UpdateView):
             'blog:profile', kwargs={'username': self.request.user.username})
 
 
+@method_decorator(count_views, name='dispatch')
+@method_decorator(cache_shared_page, name='dispatch')
 class PostDetailView(DetailView):
     """
     Страница с подробной информацией о посте и его комментариями.
     Показывает все посты автора, если пользователь — автор,
-    иначе — только опубликованные.
+    иначе — только видимые в ленте: отложенный пост до даты
+    публикации и пост скрытой категории отвечают 404.
+    Просмотры считаются и для ответов из кэша (blog.counters).
     """
 
     model = Post
@@ -130,28 +267,45 @@ class PostDetailView(DetailView):
         Возвращает QuerySet
         в зависимости от аутентификации пользователя.
         """
-        qs = super().get_queryset()
+        qs = (
+            super().get_queryset()
+            .select_related('author', 'category', 'location')
+            .prefetch_related(Prefetch(
+                'comments',
+                queryset=Comment.objects.select_related('author')
+            ))
+        )
         user = self.request.user
         if user.is_authenticated:
-            return qs.filter(Q(is_published=True) | Q(author=user))
-        return qs.filter(is_published=True)
+            return qs.filter(Q(is_visible=True) | Q(author=user))
+        return qs.filter(is_visible=True)
 
     def get_context_data(self, **kwargs):
         """
-        Добавляет в контекст форму
-        для комментариев и список комментариев поста.
+        Добавляет в контекст список комментариев поста.
+        Комментарии с авторами уже загружены одним запросом
+        в get_queryset, повторно пост не запрашивается.
+        Форму комментария рендерит дыра comment_form (blog.holes).
         """
         context = super().get_context_data(**kwargs)
-        post = self.get_object()
-        context['comments'] = post.comments.all()
-        context['form'] = CommentForm()
+        context['comments'] = self.object.comments.all()
         return context
 
+    def render_to_response(self, context, **response_kwargs):
+        response = super().render_to_response(context, **response_kwargs)
+        if not self.object.is_visible:
+            # Невидимый в ленте пост (снятый с публикации, отложенный,
+            # в скрытой категории) видит только автор: не кэшируем,
+            # иначе общий кэш отдаст страницу всем.
+            patch_cache_control(response, private=True)
+        return response
+
 
 # =================================
 # Списки постов.
 # =================================
-class CategoryPostListView(View):
+@method_decorator(cache_shared_page, name='dispatch')
+class CategoryPostListView(CursorPaginationMixin, View):
     """
     Список опубликованных постов
     выбранной категории.
@@ -160,37 +314,65 @@ class CategoryPostListView(View):
     def get(self, request, category_slug):
         category = get_object_or_404(
             Category, slug=category_slug, is_published=True)
-        post_list = Post.published.filter(category=category)
-        page_obj = paginate(request, post_list)
+        page_obj = self.paginate_listing(
+            PostListing.Kind.CATEGORY, category.pk)
         return render(request, 'blog/category.html', {
             'category': category,
             'page_obj': page_obj
         })
 
 
-class UserPostListView(View):
+class UserPostListView(CursorPaginationMixin, View):
     """
-    Список опубликованных постов
-    пользователя с подсчётом комментариев.
+    Список опубликованных постов пользователя.
     """
 
     def get(self, request, username):
-        post_list = (
-            Post.published
-            .filter(author__username=username)
-            .annotate(comment_count=Count('comments'))
+        profile_user = get_object_or_404(User, username=username)
+        page_obj = self.paginate_listing(
+            PostListing.Kind.AUTHOR, profile_user.pk)
+        return render(request, 'blog/profile.html', {
+            'profile': profile_user,
+            'page_obj': page_obj,
+            'is_owner': request.user == profile_user,
+            'now': timezone.now(),
+        })
+
+
+class SearchView(View):
+    """
+    Поиск по заголовкам и текстам постов и по комментариям.
+    Выдача упорядочена по релевантности, показываются только
+    видимые в ленте посты.
+    """
+
+    def get(self, request):
+        query = request.GET.get('q', '').strip()
+        found_ids = search_post_ids(query, SearchLimits.MAX_RESULTS)
+        visible_ids = set(
+            Post.published.filter(pk__in=found_ids)
+            .values_list('pk', flat=True)
         )
-        page_obj = paginate(request, post_list)
-        return render(request, 'blog/user.html', {'page_obj': page_obj})
+        page_obj = paginate(
+            request, [pk for pk in found_ids if pk in visible_ids])
+        posts = Post.published.in_bulk(page_obj.object_list)
+        page_obj.object_list = [posts[pk] for pk in page_obj.object_list]
+        return render(request, 'blog/search.html', {
+            'query': query,
+            'page_obj': page_obj,
+            'extra_query': urlencode({'q': query}) + '&',
+        })
 
 
 # =================================
 # Вьюхи для постов пользователя.
 # =================================
+@method_decorator(serialized_write, name='post')
 class CreatePostView(LoginRequiredMixin, CreateView):
     """
     Создание нового поста. Автором становится текущий пользователь.
-    Если дата публикации в будущем — пост автоматически не публикуется.
+    Пост с датой публикации в будущем появится в ленте,
+    когда планировщик publish_scheduled включит его видимость.
     """
 
     model = Post
@@ -200,13 +382,12 @@ class CreatePostView(LoginRequiredMixin, CreateView):
     def form_valid(self, form):
         post = form.save(commit=False)
         post.author = self.request.user
-        if post.pub_date > timezone.now():
-            post.is_published = False
         post.save()
         return redirect('blog:profile', username=self.request.user.username)
 
 
-class PostEditView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
+@method_decorator(serialized_write, name='post')
+class PostEditView(AuthorRequiredMixin, UpdateView):
     """
     Редактирование поста.
     Только автор может редактировать свой пост.
@@ -217,21 +398,24 @@ class PostEditView(LoginRequiredMixin, UserPassesTestMixin, UpdateView):
     template_name = 'blog/create.html'
     pk_url_kwarg = 'post_id'
 
-    def test_func(self):
-        """Проверяет, является ли текущий пользователь автором поста."""
-        post = self.get_object()
-        return post.author == self.request.user
-
-    def handle_no_permission(self):
+    def handle_not_author(self):
         """Редирект на страницу поста, если доступ запрещён."""
         return redirect('blog:post_detail', post_id=self.kwargs['post_id'])
 
+    def form_valid(self, form):
+        """Новая дата публикации переносит вес поста в рейтинге."""
+        response = super().form_valid(form)
+        move_publication(
+            self.object.pk, form.original_pub_date, self.object.pub_date)
+        return response
+
     def get_success_url(self):
         """URL для редиректа после успешного редактирования поста."""
         return reverse('blog:post_detail', kwargs={'post_id': self.object.pk})
 
 
-class DeletePostView(LoginRequiredMixin, DeleteView):
+@method_decorator(serialized_write, name='post')
+class DeletePostView(AuthorRequiredMixin, DeleteView):
     """
     Удаление поста.
     Только автор поста может удалить.
@@ -245,14 +429,15 @@ class DeletePostView(LoginRequiredMixin, DeleteView):
         """URL для редиректа после успешного удаления поста."""
         return reverse('blog:index')
 
-    def get_queryset(self):
-        """Ограничиваем выборку постов только постами текущего пользователя."""
-        return self.request.user.posts.all()
+    def handle_not_author(self):
+        """Чужой пост для пользователя не существует."""
+        raise Http404
 
 
 # =================================
 # Вьюхи для комментариев.
 # =================================
+@method_decorator(serialized_write, name='post')
 class AddCommentView(LoginRequiredMixin, View):
     """Добавление комментария к посту."""
 
@@ -263,14 +448,15 @@ class AddCommentView(LoginRequiredMixin, View):
             comment = form.save(commit=False)
             comment.post = post
             comment.author = request.user
-            comment.save()
+            with transaction.atomic():
+                comment.save()
+                change_comment_count(
+                    post.id, 1, with_event(comment.created_at))
         return redirect('blog:post_detail', post_id=post.id)
 
 
-class EditCommentView(LoginRequiredMixin,
-                      UserPassesTestMixin,
-                      CommentContextMixin,
-                      UpdateView):
+@method_decorator(serialized_write, name='post')
+class EditCommentView(AuthorRequiredMixin, CommentContextMixin, UpdateView):
     """
     Редактирование комментария.
     Только автор комментария имеет доступ.
@@ -281,24 +467,14 @@ class EditCommentView(LoginRequiredMixin,
     template_name = 'blog/comment.html'
     pk_url_kwarg = 'comment_id'
 
-    def test_func(self):
-        """Проверяет, является ли текущий пользователь автором комментария."""
-        comment = self.get_object()
-        return comment.author == self.request.user
-
     def form_valid(self, form):
         """Сохраняет изменённый комментарий."""
-        comment = form.save(commit=False)
-        comment.author = self.request.user
-        comment.post = self.get_object().post
-        comment.save()
-        return redirect('blog:post_detail', post_id=comment.post.id)
+        comment = form.save()
+        return redirect('blog:post_detail', post_id=comment.post_id)
 
 
-class DeleteCommentView(LoginRequiredMixin,
-                        UserPassesTestMixin,
-                        CommentContextMixin,
-                        DeleteView):
+@method_decorator(serialized_write, name='post')
+class DeleteCommentView(AuthorRequiredMixin, CommentContextMixin, DeleteView):
     """
     Удаление комментария.
     Только автор комментария имеет доступ.
@@ -307,14 +483,42 @@ class DeleteCommentView(LoginRequiredMixin,
     model = Comment
     template_name = 'blog/comment.html'
     pk_url_kwarg = 'comment_id'
-
-    def test_func(self):
-        """Проверяет, является ли текущий пользователь автором комментария."""
-        comment = self.get_object()
-        return comment.author == self.request.user
+    # Дата публикации поста нужна для пересчёта рейтинга.
+    author_related = ('post',)
 
     def form_valid(self, form):
         """Удаляет комментарий и перенаправляет на страницу поста."""
-        post_id = self.object.post.id
-        self.object.delete()
+        post_id = self.object.post_id
+        with transaction.atomic():
+            self.object.delete()
+            change_comment_count(post_id, -1, without_event(
+                self.object.created_at, self.object.post.pub_date))
         return redirect('blog:post_detail', post_id=post_id)
+
+
+# =================================
+# Медиафайлы.
+# =================================
+def serve_media(request, path):
+    """
+    Отдаёт файлы из MEDIA_ROOT.
+    Файлы контентно-адресуемого хранилища не меняются никогда,
+    поэтому отдаются с ETag по хэшу и кэшем immutable на год.
+    """
+    digest = content_digest(path)
+    if digest is None:
+        return serve(request, path, document_root=settings.MEDIA_ROOT)
+
+    etag = quote_etag(digest)
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = serve(request, path, document_root=settings.MEDIA_ROOT)
+    response['ETag'] = etag
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=settings.BLOG_MEDIA_MAX_AGE,
+        immutable=True,
+    )
+    return response
@@ -0,0 +1,107 @@
+"""
+Сериализация записи в SQLite.
+
+SQLite допускает одного писателя. Транзакции открываются как
+BEGIN IMMEDIATE (settings.DATABASES), поэтому блокировка берётся
+до первого чтения и ожидание укладывается в busy timeout.
+Внутри процесса писатели дополнительно выстраиваются в очередь
+на threading.Lock, а «database is locked», если всё же случился,
+приводит к повтору транзакции с экспоненциальной паузой.
+
+Повторяется только сама транзакция. Побочные эффекты записи
+(версии в кэше, задачи в режиме BLOG_TASKS_EAGER) регистрируются
+через on_commit из этого модуля и выполняются после коммита,
+когда блокировка снята: их ошибка не повторяет уже зафиксированную
+запись. Вызов run_write внутри открытой транзакции (в том числе
+вложенный) выполняется в точке сохранения без блокировки и повторов:
+повторять можно только внешнюю транзакцию целиком.
+"""
+
+import random
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+from django.db import transaction
+
+from .constants import WriteRetries
+
+_locks = {}
+_locks_guard = threading.Lock()
+_deferred = threading.local()
+
+
+def is_locked_error(error):
+    message = str(error).lower()
+    return 'database is locked' in message or 'database is busy' in message
+
+
+def backoff(attempt):
+    """Пауза перед повтором attempt (с нуля), сек., со случайным разбросом."""
+    delay = min(WriteRetries.BASE_DELAY * 2 ** attempt, WriteRetries.MAX_DELAY)
+    return delay * random.uniform(0.5, 1.5)
+
+
+def write_lock(using):
+    """Блокировка писателей процесса для базы SQLite, иначе None."""
+    if connections[using].vendor != 'sqlite':
+        return None
+    with _locks_guard:
+        return _locks.setdefault(using, threading.Lock())
+
+
+def on_commit(func, using=None):
+    """
+    transaction.on_commit для побочных эффектов записи.
+    Внутри run_write func выполняется после коммита и снятия
+    блокировки, вне повторяемой части.
+    """
+    using = using or DEFAULT_DB_ALIAS
+    callbacks = getattr(_deferred, 'callbacks', {}).get(using)
+    if callbacks is None:
+        transaction.on_commit(func, using)
+    else:
+        # Обработчики из отменённой точки сохранения Django отбросит сам.
+        transaction.on_commit(lambda: callbacks.append(func), using)
+
+
+def run_write(func, *args, using=None, attempts=WriteRetries.ATTEMPTS,
+              **kwargs):
+    """
+    Выполняет func в транзакции базы using. При блокировке базы
+    транзакция откатывается и повторяется до attempts раз.
+    """
+    using = using or DEFAULT_DB_ALIAS
+    if connections[using].in_atomic_block:
+        with transaction.atomic(using=using):
+            return func(*args, **kwargs)
+    lock = write_lock(using) or nullcontext()
+    registry = _deferred.__dict__.setdefault('callbacks', {})
+    for attempt in range(attempts):
+        callbacks = registry[using] = []
+        try:
+            with lock, transaction.atomic(using=using):
+                result = func(*args, **kwargs)
+        except OperationalError as error:
+            if not is_locked_error(error) or attempt == attempts - 1:
+                raise
+        else:
+            break
+        finally:
+            del registry[using]
+        time.sleep(backoff(attempt))
+    for callback in callbacks:
+        callback()
+    return result
+
+
+def serialized_write(view):
+    """Декоратор изменяющего представления: запись через run_write."""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return run_write(view, *args, **kwargs)
+
+    return wrapper
@@ -0,0 +1,278 @@
+"""
+Измерения отдельного запроса: время в базе, число и повторы SQL,
+время рендера шаблонов и общее время ответа.
+
+RequestMetricsMiddleware собирает их, отдаёт в заголовке Server-Timing,
+пишет в лог и копит гистограммы по представлениям, которые показывает
+страница для персонала. При BLOG_INSTRUMENTATION = False middleware
+исключается из цепочки, а шаблонный бэкенд сводится к одной проверке.
+"""
+
+import logging
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.contrib.admin.views.decorators import staff_member_required
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.http import JsonResponse
+from django.template.backends.django import DjangoTemplates, Template
+
+from blogicum.middleware import HybridMiddleware
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, float('inf'))
+"""Верхние границы корзин гистограммы времени ответа, мс."""
+
+TRANSACTION_STATEMENTS = ('BEGIN', 'SAVEPOINT', 'RELEASE', 'ROLLBACK')
+"""Управление транзакциями повторяется законно и в дубли не попадает."""
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class RequestMetrics:
+    """Счётчики одного запроса."""
+
+    def __init__(self):
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.statements = Counter()
+
+    def execute(self, execute, sql, params, many, context):
+        """Время и текст запроса."""
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - started
+            self.statements[sql, repr(params)] += 1
+
+    @property
+    def queries(self):
+        return sum(self.statements.values())
+
+    def duplicates(self):
+        """Запросы, выполненные несколько раз с теми же параметрами."""
+        return {
+            sql: count
+            for (sql, _), count in self.statements.items()
+            if count > 1 and not sql.startswith(TRANSACTION_STATEMENTS)
+        }
+
+    def similar(self):
+        """
+        Один и тот же SQL с разными параметрами — признак N+1.
+        Возвращает запросы, повторённые не меньше BLOG_SIMILAR_QUERIES раз.
+        """
+        templates = Counter()
+        for sql, _ in self.statements:
+            templates[sql] += 1
+        return {
+            sql: count for sql, count in templates.items()
+            if count >= settings.BLOG_SIMILAR_QUERIES
+        }
+
+
+# =================================
+# Время рендера шаблонов.
+# =================================
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        metrics = current_metrics.get()
+        if metrics is None:
+            return super().render(context, request)
+        # Вложенные render_to_string учитываются во внешнем замере.
+        metrics.template_depth += 1
+        started = time.perf_counter()
+        try:
+            return super().render(context, request)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_time += time.perf_counter() - started
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Бэкенд шаблонов Django, который замеряет время рендера."""
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        template = super().get_template(template_name)
+        return TimedTemplate(template.template, self)
+
+
+# =================================
+# Накопленная статистика.
+# =================================
+class ViewStats:
+    def __init__(self):
+        self.count = 0
+        self.histogram = [0] * len(BUCKETS)
+        self.total_ms = 0.0
+        self.db_ms = 0.0
+        self.template_ms = 0.0
+        self.queries = 0
+        self.max_queries = 0
+        self.with_duplicates = 0
+
+    def add(self, total_ms, db_ms, template_ms, queries, duplicates):
+        self.count += 1
+        self.histogram[next(
+            index for index, bound in enumerate(BUCKETS)
+            if total_ms <= bound)] += 1
+        self.total_ms += total_ms
+        self.db_ms += db_ms
+        self.template_ms += template_ms
+        self.queries += queries
+        self.max_queries = max(self.max_queries, queries)
+        self.with_duplicates += bool(duplicates)
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total_ms / self.count, 3),
+            'mean_db_ms': round(self.db_ms / self.count, 3),
+            'mean_template_ms': round(self.template_ms / self.count, 3),
+            'mean_queries': round(self.queries / self.count, 2),
+            'max_queries': self.max_queries,
+            'with_duplicates': self.with_duplicates,
+            'histogram_ms': {
+                str(bound): count
+                for bound, count in zip(BUCKETS, self.histogram)
+            },
+        }
+
+
+class RequestStats:
+    """Статистика по представлениям в памяти процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.views = {}
+
+    def record(self, view_name, *values):
+        with self.lock:
+            if view_name not in self.views:
+                self.views[view_name] = ViewStats()
+            self.views[view_name].add(*values)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                view_name: stats.as_dict()
+                for view_name, stats in sorted(self.views.items())
+            }
+
+    def reset(self):
+        with self.lock:
+            self.views.clear()
+
+
+stats = RequestStats()
+
+
+# =================================
+# Middleware и страница статистики.
+# =================================
+def instrument(execute, sql, params, many, context):
+    """
+    Обёртка запросов, постоянно установленная на соединения.
+    Метрики берутся из контекста, поэтому учитываются и запросы
+    асинхронного ORM, выполняемые в потоках sync_to_async.
+    """
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    return metrics.execute(execute, sql, params, many, context)
+
+
+def install_wrapper(connection, **kwargs):
+    if instrument not in connection.execute_wrappers:
+        connection.execute_wrappers.append(instrument)
+
+
+class RequestMetricsMiddleware(HybridMiddleware):
+    """
+    Замеряет запрос и добавляет заголовок Server-Timing:
+    db — время в базе, tpl — рендер шаблонов, total — весь ответ.
+    Работает и под WSGI, и под ASGI.
+    """
+
+    def __init__(self, get_response):
+        if not settings.BLOG_INSTRUMENTATION:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        connection_created.connect(install_wrapper)
+        # Соединения, открытые до создания middleware.
+        for connection in connections.all(initialized_only=True):
+            install_wrapper(connection)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token, started = self.start()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    async def __acall__(self, request):
+        metrics, token, started = self.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        return self.finish(request, response, metrics, started)
+
+    def start(self):
+        metrics = RequestMetrics()
+        return metrics, current_metrics.set(metrics), time.perf_counter()
+
+    def finish(self, request, response, metrics, started):
+        total_ms = (time.perf_counter() - started) * 1000
+        db_ms = metrics.db_time * 1000
+        template_ms = metrics.template_time * 1000
+        duplicates = metrics.duplicates()
+
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={db_ms:.2f};desc="{metrics.queries} queries"',
+            f'tpl;dur={template_ms:.2f}',
+            f'total;dur={total_ms:.2f}',
+        ))
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        stats.record(
+            view_name, total_ms, db_ms, template_ms,
+            metrics.queries, duplicates)
+        logger.debug(
+            '%s %s: %.1f мс, БД %.1f мс (%s запросов), шаблоны %.1f мс',
+            request.method, view_name, total_ms, db_ms,
+            metrics.queries, template_ms)
+        for sql, count in duplicates.items():
+            logger.warning(
+                '%s: повтор запроса с теми же параметрами (выполнений: %s): %s',
+                view_name, count, sql)
+        for sql, count in metrics.similar().items():
+            logger.warning(
+                '%s: похожие запросы с разными параметрами (выполнений: %s): %s',
+                view_name, count, sql)
+        return response
+
+
+@staff_member_required
+def request_stats(request):
+    """Гистограммы по представлениям; POST с reset=1 обнуляет их."""
+    if request.method == 'POST' and request.POST.get('reset'):
+        stats.reset()
+    return JsonResponse(
+        stats.snapshot(), json_dumps_params={'ensure_ascii': False})
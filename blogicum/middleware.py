@@ -0,0 +1,175 @@
+import mimetypes
+import os
+import re
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, parse_etags, quote_etag
+
+from blogicum.routers import replica_reads
+
+# app.3f2a9c1d04be.css — имя, выданное ManifestStaticFilesStorage.
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def accepted_encodings(header):
+    """
+    Кодировки из заголовка Accept-Encoding с их q (по умолчанию 1).
+    q=0 или неразборчивое значение — кодировка неприемлема.
+    """
+    weights = {}
+    for item in header.split(','):
+        coding, *params = (part.strip() for part in item.split(';'))
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition('=')
+            if key.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[coding.lower()] = quality
+    return weights
+
+
+class HybridMiddleware:
+    """
+    Основа middleware, работающего и в синхронной, и в асинхронной
+    цепочке: под ASGI Django не оборачивает его в sync_to_async.
+    Наследник реализует __call__ и __acall__.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+
+class PrecompressedStaticMiddleware(HybridMiddleware):
+    """
+    Раздаёт файлы из STATIC_ROOT без отдельного веб-сервера.
+    Если клиент принимает br или gzip (с q больше нуля) и рядом лежит
+    заранее сжатая копия, отдаётся она. Файлы с хэшем в имени
+    кэшируются навсегда. Работает и под WSGI, и под ASGI.
+    При DEBUG не включается: статику из исходных каталогов
+    раздаёт django.contrib.staticfiles, а не устаревшая сборка.
+    """
+
+    def __init__(self, get_response):
+        if settings.DEBUG or not (
+                settings.BLOG_SERVE_STATIC and settings.STATIC_ROOT
+                and os.path.isdir(settings.STATIC_ROOT)):
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.prefix = settings.STATIC_URL
+        self.root = os.fspath(settings.STATIC_ROOT)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.serve_static(request) or self.get_response(request)
+
+    async def __acall__(self, request):
+        return self.serve_static(request) or await self.get_response(request)
+
+    def serve_static(self, request):
+        if (request.method in ('GET', 'HEAD')
+                and request.path.startswith(self.prefix)):
+            return self.serve(request, request.path[len(self.prefix):])
+        return None
+
+    def find(self, name):
+        try:
+            path = safe_join(self.root, name)
+        except ValueError:
+            return None
+        return path if os.path.isfile(path) else None
+
+    def serve(self, request, name):
+        path = self.find(name)
+        if path is None:
+            return None
+        hashed = bool(HASHED_NAME_RE.search(name))
+        accepted = accepted_encodings(
+            request.headers.get('Accept-Encoding', ''))
+        encoding, weight = None, 0
+        for candidate, extension in ENCODINGS:
+            # «*» — любая кодировка, не названная явно.
+            quality = accepted.get(candidate, accepted.get('*', 0))
+            if quality > weight and os.path.isfile(path + extension):
+                encoding, weight = candidate, quality
+        if encoding:
+            path += dict(ENCODINGS)[encoding]
+
+        stat = os.stat(path)
+        etag = quote_etag(f'{int(stat.st_mtime)}-{stat.st_size}')
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            content_type, _ = mimetypes.guess_type(name)
+            response = FileResponse(
+                open(path, 'rb'),
+                content_type=content_type or 'application/octet-stream')
+            response['Content-Length'] = stat.st_size
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        patch_vary_headers(response, ('Accept-Encoding',))
+        if hashed:
+            patch_cache_control(
+                response, public=True,
+                max_age=settings.BLOG_STATIC_MAX_AGE, immutable=True)
+        else:
+            patch_cache_control(response, public=True, no_cache=True)
+        return response
+
+
+class ReplicaStickinessMiddleware(HybridMiddleware):
+    """
+    Разрешает чтения из реплик на время запроса и направляет их
+    в основную базу, если пользователь недавно что-то записал: после
+    запроса с записью ставится cookie на BLOG_REPLICA_STICKY_SECONDS —
+    с запасом на отставание реплик.
+    """
+
+    def __init__(self, get_response):
+        if not settings.BLOG_READ_REPLICAS:
+            raise MiddlewareNotUsed
+        super().__init__(get_response)
+        self.cookie = settings.BLOG_REPLICA_STICKY_COOKIE
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with replica_reads(self.pinned(request)) as flag:
+            response = self.get_response(request)
+        return self.finish(response, flag)
+
+    async def __acall__(self, request):
+        with replica_reads(self.pinned(request)) as flag:
+            response = await self.get_response(request)
+        return self.finish(response, flag)
+
+    def pinned(self, request):
+        return self.cookie in request.COOKIES or request.method not in (
+            'GET', 'HEAD', 'OPTIONS')
+
+    def finish(self, response, flag):
+        if flag:
+            response.set_cookie(
+                self.cookie, '1',
+                max_age=settings.BLOG_REPLICA_STICKY_SECONDS,
+                httponly=True, samesite='Lax')
+            patch_vary_headers(response, ('Cookie',))
+        return response
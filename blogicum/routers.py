@@ -0,0 +1,81 @@
+"""
+Чтение с реплик, запись в основную базу.
+
+Реплики перечислены в settings.BLOG_READ_REPLICAS. Читать из реплик
+можно только внутри replica_reads() — его открывает на время запроса
+ReplicaStickinessMiddleware; команды, воркер задач и прочий код вне
+запроса читают из основной базы. Чтобы пользователь сразу видел свои
+изменения, запрос «прилипает» к основной базе:
+- после первой записи в рамках запроса;
+- внутри транзакции основной базы;
+- в течение BLOG_REPLICA_STICKY_SECONDS после запроса с записью
+  (cookie ставит ReplicaStickinessMiddleware).
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+pinned = ContextVar('pinned_to_primary', default=False)
+"""Читать из основной базы до конца текущего контекста."""
+
+wrote = ContextVar('wrote_to_primary', default=None)
+"""Список-флаг, отмечающий запись в текущем запросе."""
+
+
+@contextmanager
+def replica_reads(pin=False):
+    """
+    Область, в которой чтения идут в реплики; pin — сразу читать
+    из основной базы. Запись внутри области направляет в основную
+    базу все чтения до её конца. Возвращает список-флаг записи.
+    """
+    flag = []
+    wrote_token = wrote.set(flag)
+    pinned_token = pinned.set(pin)
+    try:
+        yield flag
+    finally:
+        pinned.reset(pinned_token)
+        wrote.reset(wrote_token)
+
+
+@contextmanager
+def use_primary():
+    """Все чтения внутри блока идут в основную базу."""
+    token = pinned.set(True)
+    try:
+        yield
+    finally:
+        pinned.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        replicas = settings.BLOG_READ_REPLICAS
+        if (not replicas or wrote.get() is None or pinned.get()
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        flag = wrote.get()
+        if flag is not None:
+            # Последующие чтения этой области должны видеть запись.
+            # Вне replica_reads() чтения и так идут в основную базу.
+            pinned.set(True)
+            flag.append(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики содержат те же данные, что и основная база.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
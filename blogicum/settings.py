@@ -17,6 +17,7 @@ import os
 BASE_DIR = Path(__file__).resolve().parent.parent
 STATIC_URL = '/static/'
 STATICFILES_DIRS = [os.path.join(BASE_DIR, 'static')]
+STATIC_ROOT = BASE_DIR / 'staticfiles'
 
 
 # Quick-start development settings - unsuitable for production
@@ -49,6 +50,9 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'blogicum.middleware.PrecompressedStaticMiddleware',
+    'blogicum.instrumentation.RequestMetricsMiddleware',
+    'blogicum.middleware.ReplicaStickinessMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -61,7 +65,8 @@ ROOT_URLCONF = 'blogicum.urls'
 TEMPLATES_DIR = BASE_DIR / 'templates'
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates с замером времени рендера для Server-Timing.
+        'BACKEND': 'blogicum.instrumentation.TimedDjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -80,13 +85,83 @@ WSGI_APPLICATION = 'blogicum.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# SQLite для нескольких потоков и процессов: журнал WAL (читатели
+# не блокируют писателя), synchronous=NORMAL (в WAL это безопасно),
+# отображение файла в память и увеличенный кэш страниц. Транзакции
+# начинаются с BEGIN IMMEDIATE, чтобы писатель ждал блокировку в пределах
+# timeout, а не получал «database is locked» посреди транзакции.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Соединение переиспользуется между запросами и проверяется
+        # перед использованием.
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'init_command': ';'.join(
+                f'PRAGMA {name}={value}'
+                for name, value in SQLITE_PRAGMAS.items()
+            ),
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
+# Реплики только для чтения: пути к копиям базы SQLite через запятую
+# в переменной окружения BLOG_REPLICA_DATABASES. Локально их обновляет
+# команда sync_replicas, которая играет роль репликации.
+for number, name in enumerate(filter(None, (
+        name.strip() for name in
+        os.environ.get('BLOG_REPLICA_DATABASES', '').split(','))), 1):
+    DATABASES[f'replica_{number}'] = {
+        **DATABASES['default'],
+        'NAME': name,
+        'TEST': {'MIRROR': 'default'},
+    }
+BLOG_READ_REPLICAS = [
+    alias for alias in DATABASES if alias.startswith('replica_')]
+# После записи пользователь читает из основной базы столько секунд.
+# Должно быть больше интервала синхронизации реплик.
+BLOG_REPLICA_STICKY_SECONDS = 15
+BLOG_REPLICA_STICKY_COOKIE = 'read_primary'
+DATABASE_ROUTERS = ['blogicum.routers.ReplicaRouter']
+
+
+# Замеры запросов: заголовок Server-Timing, предупреждения о повторных
+# SQL-запросах в логе и статистика по представлениям на /stats/requests/.
+BLOG_INSTRUMENTATION = False
+# С какого числа повторов одного SQL с разными параметрами предупреждать.
+BLOG_SIMILAR_QUERIES = 5
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'blogicum.instrumentation': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
 
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
@@ -124,6 +199,22 @@ USE_TZ = True
 # Static files (CSS, JavaScript, Images)
 # https://docs.djangoproject.com/en/3.2/howto/static-files/
 
+# Без DEBUG collectstatic добавляет в имена файлов хэш содержимого,
+# пишет манифест и сжатые копии .gz/.br, а PrecompressedStaticMiddleware
+# раздаёт их из STATIC_ROOT. С DEBUG middleware отключается.
+if not DEBUG:
+    STORAGES = {
+        'default': {
+            'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        },
+        'staticfiles': {
+            'BACKEND': (
+                'blogicum.staticfiles.CompressedManifestStaticFilesStorage'),
+        },
+    }
+BLOG_SERVE_STATIC = True
+BLOG_STATIC_MAX_AGE = 60 * 60 * 24 * 365
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -144,3 +235,42 @@ REST_FRAMEWORK = {
         # 'rest_framework.authentication.TokenAuthentication',
     ],
 }
+
+# Курсорная пагинация лент (pub_date, id) вместо ?page=.
+BLOG_CURSOR_PAGINATION = False
+
+# Асинхронные представления для ленты, поста, категории и профиля
+# (blog/async_views.py). Имеет смысл при запуске под ASGI
+# (blogicum.asgi:application); переменная окружения BLOG_ASYNC_VIEWS=1.
+BLOG_ASYNC_VIEWS = os.environ.get('BLOG_ASYNC_VIEWS') == '1'
+
+# Кэш отрендеренных карточек постов: алиас из CACHES и время жизни (сек.).
+BLOG_FRAGMENT_CACHE = 'default'
+BLOG_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Кэш страниц (персональные части заполняются при каждом запросе):
+# алиас из CACHES и максимальное время жизни (сек.); оно сокращается
+# до момента ближайшей отложенной публикации.
+BLOG_PAGE_CACHE = 'default'
+BLOG_PAGE_CACHE_TIMEOUT = 60 * 5
+
+# Просмотры постов копятся в памяти процесса (blog/counters.py)
+# и записываются в базу раз в столько секунд.
+# None — без фонового потока: по порогу и при завершении процесса.
+BLOG_VIEW_FLUSH_INTERVAL = 10
+
+# Бэкенд полнотекстового поиска. Для СУБД без FTS5:
+# 'blog.search.backends.DatabaseSearchBackend'.
+BLOG_SEARCH_BACKEND = 'blog.search.backends.SQLiteFTSBackend'
+
+# Поля, которые не отдаются в списке /api/posts/ (например, ['Текст']).
+BLOG_API_LIST_OMIT: list[str] = []
+
+# Фоновые задачи выполняет воркер `manage.py run_tasks`.
+# True — выполнять их сразу после коммита, без воркера.
+BLOG_TASKS_EAGER = False
+
+# Раздавать MEDIA_ROOT самим приложением (без отдельного веб-сервера).
+# Файлы с именем по хэшу содержимого кэшируются на BLOG_MEDIA_MAX_AGE сек.
+BLOG_SERVE_MEDIA = True
+BLOG_MEDIA_MAX_AGE = 60 * 60 * 24 * 365
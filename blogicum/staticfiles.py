@@ -0,0 +1,65 @@
+"""
+Хранилище статики для collectstatic: имена с хэшем содержимого,
+манифест staticfiles.json и заранее сжатые копии .gz и .br
+(последняя — если установлен пакет brotli).
+"""
+
+import gzip
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.map', '.svg', '.ico', '.txt', '.json', '.xml', '.html',
+)
+# Файлы меньше этого размера сжимать бессмысленно.
+MIN_COMPRESS_SIZE = 256
+
+
+def compress(data):
+    """Возвращает пары (расширение, сжатые байты)."""
+    variants = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        variants.append(('.br', brotli.compress(data)))
+    return variants
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """ManifestStaticFilesStorage, который рядом с файлами кладёт .gz/.br."""
+
+    # Ссылки sourceMappingURL не переписываются: в вендорных файлах
+    # (например, bootstrap.min.css) они указывают на .map, которых нет.
+    patterns = tuple(
+        (extension, tuple(
+            pattern for pattern in extension_patterns
+            if 'sourceMappingURL' not in str(pattern)
+        ))
+        for extension, extension_patterns in (
+            ManifestStaticFilesStorage.patterns)
+    )
+
+    def post_process(self, paths, dry_run=False, **options):
+        for name, hashed_name, processed in super().post_process(
+                paths, dry_run, **options):
+            if (not dry_run and hashed_name
+                    and not isinstance(processed, Exception)):
+                self.write_compressed(name)
+                self.write_compressed(hashed_name)
+            yield name, hashed_name, processed
+
+    def write_compressed(self, name):
+        if not name.lower().endswith(COMPRESSIBLE_EXTENSIONS):
+            return
+        path = self.path(name)
+        with open(path, 'rb') as file:
+            data = file.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        for extension, compressed in compress(data):
+            if len(compressed) < len(data):
+                with open(path + extension, 'wb') as file:
+                    file.write(compressed)
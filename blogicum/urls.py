@@ -17,21 +17,25 @@ Including another URLconf
 
 from django.contrib import admin
 
-from django.urls import path, include, reverse_lazy
+from django.urls import path, include, re_path, reverse_lazy
 
 from django.contrib.auth.forms import UserCreationForm
 
-from django.conf.urls.static import static
 from django.conf import settings
 
 from django.views.generic.edit import CreateView
 
+from blog.views import serve_media
+
+from blogicum.instrumentation import request_stats
+
 urlpatterns = [
     path('auth/', include('django.contrib.auth.urls')),
     path('admin/', admin.site.urls),
     path('', include('blog.urls')),
     path('pages/', include('pages.urls')),
     path('api-auth/', include('rest_framework.urls')),
+    path('stats/requests/', request_stats, name='request_stats'),
     path(
         'auth/registration/',
         CreateView.as_view(
@@ -41,7 +45,13 @@ urlpatterns = [
         ),
         name='registration',
     ),
-] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+]
+
+if settings.BLOG_SERVE_MEDIA:
+    urlpatterns.append(re_path(
+        r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'),
+        serve_media,
+    ))
 
 handler403 = 'pages.views.handler403_csrf'
 handler404 = 'pages.views.handler404'